@@ -307,72 +307,80 @@ export default function Report(){
         const message = JSON.parse(event.data)
 
         if (message.event === 'step') {
-          const nodeName = message.node
+          // A slow connection gets several steps folded into one; the state is the
+          // newest, but every folded node still needs its panel filled.
+          const nodeNames = [...(message.coalesced_nodes || []), message.node]
           try {
             const jsonData = JSON.parse(message.data)
             setJsonState(jsonData)
-            if (nodeName === 'planner_agent') {
-              const plannerFields = {
-                goal: jsonData.goal || null,
-                topic: jsonData.topic || null,
-                target_audience: jsonData.target_audience || null,
-                source_docs_url: jsonData.source_docs_url || null,
-                campaign_date: jsonData.campaign_date || null
+            for (const nodeName of nodeNames) {
+              if (nodeName === 'planner_agent') {
+                const plannerFields = {
+                  goal: jsonData.goal || null,
+                  topic: jsonData.topic || null,
+                  target_audience: jsonData.target_audience || null,
+                  source_docs_url: jsonData.source_docs_url || null,
+                  campaign_date: jsonData.campaign_date || null
+                }
+                setPlannerData(plannerFields)
               }
-              setPlannerData(plannerFields)
-            }
 
-            if (nodeName === 'research_agent') {
-              const researchFields = {
-                audience_persona: jsonData.audience_persona || {},
-                core_messaging: jsonData.core_messaging || {}
+              if (nodeName === 'research_agent') {
+                const researchFields = {
+                  audience_persona: jsonData.audience_persona || {},
+                  core_messaging: jsonData.core_messaging || {}
+                }
+                setResearchData(researchFields)
               }
-              setResearchData(researchFields)
-            }
 
-            if (nodeName === 'content_agent') {
-              const contentFields = {
-                webinar_details: jsonData.webinar_details || {},
-                social_posts: jsonData.social_posts || []
+              if (nodeName === 'content_agent') {
+                const contentFields = {
+                  webinar_details: jsonData.webinar_details || {},
+                  social_posts: jsonData.social_posts || []
+                }
+                setContentData(contentFields)
               }
-              setContentData(contentFields)
-            }
 
-            if (nodeName === 'design_agent') {
-              if (jsonData.generated_assets) {
-                setGeneratedAssets(jsonData.generated_assets)
+              if (nodeName === 'design_agent') {
+                if (jsonData.generated_assets) {
+                  setGeneratedAssets(jsonData.generated_assets)
+                }
               }
-            }
 
-            if (nodeName === 'web_agent') {
-              if (jsonData.landing_page_code) {
-                setLandingPageCode(jsonData.landing_page_code)
+              if (nodeName === 'web_agent') {
+                if (jsonData.landing_page_code) {
+                  setLandingPageCode(jsonData.landing_page_code)
+                }
               }
-            }
 
-            if (nodeName === 'brd_agent') {
-              if (jsonData.brd_url) {
-                setBrdUrl(jsonData.brd_url)
+              if (nodeName === 'brd_agent') {
+                if (jsonData.brd_url) {
+                  setBrdUrl(jsonData.brd_url)
+                }
               }
-            }
 
-            if (nodeName === 'strategy_agent') {
-              if (jsonData.strategy_markdown) {
-                setStrategyMarkdown(jsonData.strategy_markdown)
+              if (nodeName === 'strategy_agent') {
+                if (jsonData.strategy_markdown) {
+                  setStrategyMarkdown(jsonData.strategy_markdown)
+                }
               }
-            }
 
-            let snippet = `Updated landing_page_url: ${jsonData.landing_page_url}`
-            if (nodeName === 'planner_agent') snippet = `Planned topic: ${jsonData.topic}`
-            if (nodeName === 'research_agent') snippet = `Found pain point: ${jsonData.audience_persona?.pain_point || 'N/A'}`
-            if (nodeName === 'content_agent') snippet = `Wrote ${jsonData.email_sequence?.length || 0} emails.`
-            if (nodeName === 'design_agent') snippet = `Created logo prompt: ${jsonData.brand_kit?.logo_prompt || 'N/A'}`
+              let snippet = `Updated landing_page_url: ${jsonData.landing_page_url}`
+              if (nodeName === 'planner_agent') snippet = `Planned topic: ${jsonData.topic}`
+              if (nodeName === 'research_agent') snippet = `Found pain point: ${jsonData.audience_persona?.pain_point || 'N/A'}`
+              if (nodeName === 'content_agent') snippet = `Wrote ${jsonData.email_sequence?.length || 0} emails.`
+              if (nodeName === 'design_agent') snippet = `Created logo prompt: ${jsonData.brand_kit?.logo_prompt || 'N/A'}`
 
-            addOutputMessage(`<strong>${nodeName.toUpperCase()}</strong><br>${snippet}`)
+              addOutputMessage(`<strong>${nodeName.toUpperCase()}</strong><br>${snippet}`)
+            }
           } catch (e) {
             addOutputMessage(`<strong>ERROR:</strong> Failed to parse server JSON: ${e}`)
           }
 
+        } else if (message.event === 'ping') {
+          // The server drops connections that stop answering its heartbeat.
+          ws.send(JSON.stringify({ event: 'pong', ts: message.ts }))
+
         } else if (message.event === 'done') {
           addOutputMessage('<strong>STATUS:</strong> Campaign Complete!')
           setRunning(false)
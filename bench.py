@@ -0,0 +1,74 @@
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+
+# --- End-to-end campaign latency benchmark ---
+# Runs the full foundry graph N times per mode and prints latency percentiles.
+#   python bench.py --runs 3 --modes unfused fused
+import foundry_server
+
+DEFAULT_BRIEF = (
+    "Launch a webinar about \"Agentic-Fix\", our AI tool that repairs flaky CI builds, "
+    "for VPs of Engineering at mid-size SaaS companies. Target date: next month."
+)
+
+# Research reuse would skip the very calls being compared, so it is off in every mode.
+MODES = {
+    "unfused": {"FUSED_AGENTS": False, "RESEARCH_REUSE": False},
+    "fused": {"FUSED_AGENTS": True, "RESEARCH_REUSE": False},
+}
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+async def run_once(brief: str) -> float:
+    run_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    try:
+        await foundry_server.foundry_app.ainvoke({"initial_prompt": brief, "run_id": run_id})
+    finally:
+        foundry_server.release_run_scratch(run_id)
+    return time.perf_counter() - started
+
+async def bench_mode(mode: str, brief: str, runs: int, concurrency: int):
+    for name, value in MODES[mode].items():
+        setattr(foundry_server, name, value)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded():
+        async with semaphore:
+            latencies.append(await run_once(brief))
+
+    await asyncio.gather(*(guarded() for _ in range(runs)))
+    return latencies
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end campaign latency")
+    parser.add_argument("--brief", default=DEFAULT_BRIEF)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in args.modes:
+        print(f"--- ⏱️ Benchmarking mode '{mode}' ({args.runs} runs, concurrency {args.concurrency}) ---")
+        results[mode] = await bench_mode(mode, args.brief, args.runs, args.concurrency)
+
+    print("\nmode        runs   mean(s)   p50(s)   p95(s)")
+    for mode, latencies in results.items():
+        print(
+            f"{mode:<10} {len(latencies):>5} {statistics.mean(latencies):>9.2f} "
+            f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f}"
+        )
+    if "fused" in results and "unfused" in results:
+        saved = statistics.mean(results["unfused"]) - statistics.mean(results["fused"])
+        print(f"\nfused saves {saved:.2f}s per campaign on average")
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import urllib.request
+
+# --- Gateway vs. three-process footprint ---
+# Starts the services as three uvicorn processes, then as the single gateway,
+# and reports time until each answers GET / and resident memory once idle.
+#   python bench_gateway.py --repeat 3
+THREE_PROCESS = [
+    ("foundry_server:app", 18000),
+    ("prompt:app", 18003),
+    ("sch:app", 18004),
+]
+GATEWAY = [("gateway:app", 18100)]
+STARTUP_TIMEOUT = 180
+
+def rss_mb(pid: int) -> float:
+    """Resident set size from /proc (Linux), falling back to psutil if it is installed."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    import psutil
+    return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+
+def wait_ready(port: int, process: subprocess.Popen, started: float) -> float:
+    while time.perf_counter() - started < STARTUP_TIMEOUT:
+        if process.poll() is not None:
+            raise RuntimeError(f"process on port {port} exited with {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"port {port} not ready after {STARTUP_TIMEOUT}s")
+
+def measure(layout):
+    """Starts every process of a layout at once; returns (seconds until all ready, total RSS MB, per-app rows)."""
+    started = time.perf_counter()
+    processes = [
+        (target, port, subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"],
+            stdout=subprocess.DEVNULL,
+            env=os.environ.copy(),
+        ))
+        for target, port in layout
+    ]
+    try:
+        rows = []
+        for target, port, process in processes:
+            ready = wait_ready(port, process, started)
+            rows.append((target, ready))
+        time.sleep(1) # let allocations settle
+        rows = [(target, ready, rss_mb(process.pid)) for (target, ready), (_, _, process) in zip(rows, processes)]
+        return max(r[1] for r in rows), sum(r[2] for r in rows), rows
+    finally:
+        for _, _, process in processes:
+            process.terminate()
+        for _, _, process in processes:
+            process.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare startup time and RSS of the gateway against three processes")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    results = {"three-process": [], "gateway": []}
+    for i in range(args.repeat):
+        for name, layout in (("three-process", THREE_PROCESS), ("gateway", GATEWAY)):
+            print(f"--- ⏱️ Starting {name} layout (run {i + 1}/{args.repeat}) ---")
+            ready, rss, rows = measure(layout)
+            for target, target_ready, target_rss in rows:
+                print(f"    {target:<20} ready {target_ready:6.2f}s   rss {target_rss:7.1f} MB")
+            results[name].append((ready, rss))
+
+    print("\nlayout          startup(s)   rss(MB)")
+    for name, runs in results.items():
+        ready = sum(r[0] for r in runs) / len(runs)
+        rss = sum(r[1] for r in runs) / len(runs)
+        print(f"{name:<15} {ready:>10.2f} {rss:>9.1f}")
+    three, gateway = (sum(r[1] for r in results[n]) / len(results[n]) for n in ("three-process", "gateway"))
+    print(f"\ngateway saves {three - gateway:.1f} MB resident ({(1 - gateway / three) * 100:.0f}%)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional
+
+# --- 1. Configuration ---
+HISTORY_PATH = os.getenv("FOUNDRY_HISTORY_STORE", os.path.join("campaign_outputs", "history.db"))
+# 0 keeps every campaign; otherwise the oldest are pruned past this many. This
+# only bounds the file on disk: memory stays flat either way, since reads are
+# paginated in SQL. With the default the database grows without limit.
+HISTORY_MAX_CAMPAIGNS = int(os.getenv("FOUNDRY_HISTORY_MAX_CAMPAIGNS", "0"))
+MAX_PAGE_SIZE = 100
+SQLITE_CACHE_KB = 8192 # per connection; page cache is the only memory that grows with queries
+
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def html_to_text(html: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", _TAG_RE.sub(" ", html or "")).strip()
+
+def fts_query(query: str) -> Optional[str]:
+    """User text -> safe FTS5 query: every word must match, the last one as a prefix."""
+    words = _WORD_RE.findall(query or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+# --- 2. The store ---
+class CampaignHistory:
+    """
+    Completed campaigns in SQLite: one row per run with the final CampaignState
+    as JSON, plus an FTS5 index over the brief, topic, audience, strategy
+    markdown and landing page text. Lists and searches are paginated in SQL and
+    return summaries only, so memory stays flat however long the history gets.
+    """
+
+    def __init__(self, path: str = HISTORY_PATH, max_campaigns: int = HISTORY_MAX_CAMPAIGNS):
+        self.path = path
+        self.max_campaigns = max_campaigns
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS campaigns (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL UNIQUE,
+                created_at REAL NOT NULL,
+                initial_prompt TEXT NOT NULL,
+                goal TEXT,
+                topic TEXT,
+                target_audience TEXT,
+                landing_page_url TEXT,
+                brd_url TEXT,
+                state TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS campaigns_fts USING fts5(
+                initial_prompt, topic, target_audience, strategy_markdown, landing_page,
+                tokenize='porter unicode61'
+            );
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+    def save(self, run_id: str, state: Dict[str, Any]):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                """
+                INSERT INTO campaigns (run_id, created_at, initial_prompt, goal, topic, target_audience, landing_page_url, brd_url, state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run_id, time.time(), state.get("initial_prompt") or "", state.get("goal"), state.get("topic"),
+                    state.get("target_audience"), state.get("landing_page_url"), state.get("brd_url"), json.dumps(state),
+                ),
+            )
+            conn.execute(
+                "INSERT INTO campaigns_fts (rowid, initial_prompt, topic, target_audience, strategy_markdown, landing_page) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    cursor.lastrowid, state.get("initial_prompt") or "", state.get("topic") or "", state.get("target_audience") or "",
+                    state.get("strategy_markdown") or "", html_to_text(state.get("landing_page_code")),
+                ),
+            )
+            if self.max_campaigns:
+                self._prune(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _prune(self, conn: sqlite3.Connection):
+        stale = [row["seq"] for row in conn.execute(
+            "SELECT seq FROM campaigns ORDER BY seq DESC LIMIT -1 OFFSET ?", (self.max_campaigns,)
+        )]
+        for seq in stale:
+            conn.execute("DELETE FROM campaigns_fts WHERE rowid = ?", (seq,))
+            conn.execute("DELETE FROM campaigns WHERE seq = ?", (seq,))
+
+    # --- Reads ---
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+        summary = {key: row[key] for key in ("run_id", "created_at", "initial_prompt", "goal", "topic", "target_audience", "landing_page_url", "brd_url")}
+        if "snippet" in row.keys():
+            summary["snippet"] = row["snippet"]
+        return summary
+
+    def list(self, limit: int = 20, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """Newest first. Pass the returned next_cursor to get the following page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        rows = self._conn().execute(
+            """
+            SELECT seq, run_id, created_at, initial_prompt, goal, topic, target_audience, landing_page_url, brd_url
+            FROM campaigns WHERE seq < ? ORDER BY seq DESC LIMIT ?
+            """,
+            (cursor if cursor is not None else 2 ** 63 - 1, limit + 1),
+        ).fetchall()
+        page = rows[:limit]
+        return {
+            "items": [self._summary(row) for row in page],
+            "next_cursor": page[-1]["seq"] if len(rows) > limit else None,
+        }
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Best matches first (bm25), with a highlighted snippet of where the query hit."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        match = fts_query(query)
+        if match is None:
+            return {"items": [], "next_offset": None}
+        rows = self._conn().execute(
+            """
+            SELECT c.seq, c.run_id, c.created_at, c.initial_prompt, c.goal, c.topic, c.target_audience,
+                   c.landing_page_url, c.brd_url,
+                   snippet(campaigns_fts, -1, '[', ']', ' … ', 12) AS snippet
+            FROM campaigns_fts JOIN campaigns c ON c.seq = campaigns_fts.rowid
+            WHERE campaigns_fts MATCH ?
+            ORDER BY bm25(campaigns_fts, 2.0, 4.0, 4.0, 1.0, 0.5)
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit + 1, max(0, offset)),
+        ).fetchall()
+        page = rows[:limit]
+        return {
+            "items": [self._summary(row) for row in page],
+            "next_offset": offset + limit if len(rows) > limit else None,
+        }
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT run_id, created_at, state FROM campaigns WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"run_id": row["run_id"], "created_at": row["created_at"], "state": json.loads(row["state"])}
@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+
+# --- 1. Configuration ---
+# FOUNDRY_CASSETTE_MODE=record captures every outbound HTTP exchange (Groq, Tavily,
+# Unsplash, WebBaseLoader, Slack, Telegram, Vercel, Calendly) of a real run;
+# FOUNDRY_CASSETTE_MODE=replay serves them back offline. Both the `requests` and the
+# `httpx` transports are hooked, which covers every SDK these servers use.
+CASSETTE_MODE = os.getenv("FOUNDRY_CASSETTE_MODE", "off").lower()
+CASSETTE_DIR = os.getenv("FOUNDRY_CASSETTE_DIR", os.path.join("campaign_outputs", "cassettes"))
+CASSETTE_NAME = os.getenv("FOUNDRY_CASSETTE", "default")
+# 1.0 replays the recorded latencies, 0 replays instantly, 0.5 at half the recorded latency.
+REPLAY_LATENCY_SCALE = float(os.getenv("FOUNDRY_REPLAY_LATENCY_SCALE", "1.0"))
+
+# Credentials never reach the cassette file or the match key.
+SECRET_HEADERS = {"authorization", "x-api-key", "api-key", "cookie"}
+SECRET_FIELDS = {"api_key", "apikey", "token", "access_token", "client_id"}
+# Telegram bot tokens and Slack webhook secrets live in the URL path.
+_SECRET_PATH_RES = [(re.compile(r"/bot[^/]+/"), "/bot<redacted>/"), (re.compile(r"/services/.+$"), "/services/<redacted>")]
+# Prompts embed today's date (the planner's system message does); it is masked in
+# match keys so a cassette still matches on a later day.
+_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+# Headers that no longer describe the body once it has been read and decoded.
+DROP_RESPONSE_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "set-cookie"}
+
+
+class CassetteMiss(ConnectionError):
+    """Raised in replay mode for a request the cassette never saw; callers treat it as a network failure."""
+
+
+# --- 2. Request normalization ---
+def redact_url(url: str) -> str:
+    for pattern, replacement in _SECRET_PATH_RES:
+        url = pattern.sub(replacement, url)
+    parts = urlsplit(url)
+    query = [(k, "<redacted>" if k.lower() in SECRET_FIELDS else v) for k, v in parse_qsl(parts.query)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ""))
+
+def _json_body(body: Any) -> Any:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray)):
+        return None
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def _is_chat(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("messages"), list)
+
+def normalize_body(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray)):
+        return b"<stream>"
+    data = _json_body(body)
+    if data is None:
+        return bytes(body)
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k.lower() not in SECRET_FIELDS}
+    normalized = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    if _is_chat(data):
+        normalized = _DATE_RE.sub("<date>", normalized)
+    return normalized.encode("utf-8")
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:16]
+
+def request_key(method: str, url: str, body: Any) -> Tuple[str, str, str]:
+    """
+    (route, fuzzy, exact). route is method + redacted URL and exact adds the
+    normalized body. fuzzy is the fallback when nothing matches exactly: the
+    route, except for LLM chat calls, which all share one route; those also
+    match on model and system prompt, so one chain is never served another
+    chain's completion.
+    """
+    route = f"{method.upper()} {redact_url(url)}"
+    exact = f"{route} {_digest(normalize_body(body))}"
+    data = _json_body(body)
+    if not _is_chat(data):
+        return route, route, exact
+    system = next((m.get("content") for m in data["messages"] if isinstance(m, dict) and m.get("role") == "system"), "")
+    system = _DATE_RE.sub("<date>", json.dumps(system, sort_keys=True))
+    return route, f"{route} {data.get('model')} {_digest(system.encode('utf-8'))}", exact
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+# --- 3. The cassette file ---
+class Cassette:
+    """
+    One JSON line per recorded exchange. On replay, requests are matched on the
+    exact key (method, URL, body) first and on the fuzzy key second; repeated
+    identical requests are served the recorded responses in order, cycling, so a
+    single recording can back any number of concurrent replays.
+    """
+
+    def __init__(self, name: str = CASSETTE_NAME, directory: str = CASSETTE_DIR):
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self._lock = threading.Lock()
+        self._exact: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._fuzzy: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.stats = {"recorded": 0, "replayed": 0, "fuzzy": 0, "missed": 0}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            print(f"--- ⚠️ Cassette {self.path} not found, every request will miss ---")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exact[entry["key"]].append(entry)
+                    # Recordings from before fuzzy keys existed still match non-LLM routes.
+                    self._fuzzy[entry.get("fuzzy", entry["route"])].append(entry)
+        print(f"--- 📼 Replaying {sum(len(v) for v in self._exact.values())} interactions from {self.path} ---")
+
+    def record(self, method: str, url: str, body: Any, status: int, reason: str,
+               headers: Dict[str, str], content: bytes, latency: float):
+        route, fuzzy, key = request_key(method, url, body)
+        entry = {
+            "key": key,
+            "route": route,
+            "fuzzy": fuzzy,
+            "recorded_at": time.time(),
+            "latency_s": round(latency, 4),
+            "request": {"method": method.upper(), "url": redact_url(url), "body_preview": normalize_body(body)[:500].decode("utf-8", "replace")},
+            "response": {
+                "status": status,
+                "reason": reason,
+                "headers": {k: v for k, v in headers.items() if k.lower() not in DROP_RESPONSE_HEADERS},
+                **_encode_body(content),
+            },
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.stats["recorded"] += 1
+
+    def lookup(self, method: str, url: str, body: Any) -> Dict[str, Any]:
+        route, fuzzy, key = request_key(method, url, body)
+        with self._lock:
+            for index, lookup_key, stat in ((self._exact, key, "replayed"), (self._fuzzy, fuzzy, "fuzzy")):
+                entries = index.get(lookup_key)
+                if entries:
+                    entry = entries[self._cursor[lookup_key] % len(entries)]
+                    self._cursor[lookup_key] += 1
+                    self.stats[stat] += 1
+                    return entry
+            self.stats["missed"] += 1
+        raise CassetteMiss(f"No recorded interaction for {route}")
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        return entry["latency_s"] * REPLAY_LATENCY_SCALE
+
+
+# --- 4. Transport hooks ---
+_cassette: Optional[Cassette] = None
+
+def _strip_secrets(headers) -> Dict[str, str]:
+    return {k: v for k, v in dict(headers).items() if k.lower() not in SECRET_HEADERS}
+
+def _install_requests(cassette: Cassette):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    original_send = HTTPAdapter.send
+
+    def send(self, request, **kwargs):
+        if CASSETTE_MODE == "replay":
+            entry = cassette.lookup(request.method, request.url, request.body)
+            time.sleep(cassette.replay_delay(entry))
+            response = requests.Response()
+            response.status_code = entry["response"]["status"]
+            response.reason = entry["response"]["reason"]
+            response.headers = CaseInsensitiveDict(entry["response"]["headers"])
+            response._content = _decode_body(entry["response"])
+            response.encoding = get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            response.connection = self
+            return response
+        started = time.perf_counter()
+        response = original_send(self, request, **kwargs)
+        content = response.content # reads the body so it can be stored
+        cassette.record(request.method, request.url, request.body, response.status_code, response.reason or "",
+                        _strip_secrets(response.headers), content, time.perf_counter() - started)
+        return response
+
+    HTTPAdapter.send = send
+
+def _install_httpx(cassette: Cassette):
+    import httpx
+
+    original_sync = httpx.HTTPTransport.handle_request
+    original_async = httpx.AsyncHTTPTransport.handle_async_request
+
+    def replayed(request, entry) -> "httpx.Response":
+        return httpx.Response(
+            entry["response"]["status"],
+            headers=entry["response"]["headers"],
+            content=_decode_body(entry["response"]),
+            request=request,
+        )
+
+    def recorded(request, response, content: bytes, latency: float) -> "httpx.Response":
+        headers = _strip_secrets(response.headers)
+        cassette.record(request.method, str(request.url), request.content, response.status_code,
+                        response.reason_phrase, headers, content, latency)
+        return httpx.Response(
+            response.status_code,
+            headers={k: v for k, v in headers.items() if k.lower() not in DROP_RESPONSE_HEADERS},
+            content=content,
+            request=request,
+        )
+
+    def handle_request(self, request):
+        if CASSETTE_MODE == "replay":
+            entry = cassette.lookup(request.method, str(request.url), request.read())
+            time.sleep(cassette.replay_delay(entry))
+            return replayed(request, entry)
+        started = time.perf_counter()
+        response = original_sync(self, request)
+        content = response.read()
+        response.close()
+        return recorded(request, response, content, time.perf_counter() - started)
+
+    async def handle_async_request(self, request):
+        if CASSETTE_MODE == "replay":
+            entry = cassette.lookup(request.method, str(request.url), await request.aread())
+            await asyncio.sleep(cassette.replay_delay(entry))
+            return replayed(request, entry)
+        started = time.perf_counter()
+        response = await original_async(self, request)
+        content = await response.aread()
+        await response.aclose()
+        return recorded(request, response, content, time.perf_counter() - started)
+
+    httpx.HTTPTransport.handle_request = handle_request
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+
+def install() -> Optional[Cassette]:
+    """Hooks the HTTP transports when record/replay is enabled; a no-op (and free) otherwise."""
+    global _cassette
+    if CASSETTE_MODE not in ("record", "replay") or _cassette is not None:
+        return _cassette
+    _cassette = Cassette()
+    if CASSETTE_MODE == "replay":
+        _cassette.load()
+    else:
+        print(f"--- 📼 Recording outbound HTTP to {_cassette.path} ---")
+    for hook in (_install_requests, _install_httpx):
+        try:
+            hook(_cassette)
+        except ImportError:
+            pass
+    return _cassette
+
+def cassette_stats() -> Dict[str, Any]:
+    if _cassette is None:
+        return {"mode": "off"}
+    return {"mode": CASSETTE_MODE, "path": _cassette.path, "latency_scale": REPLAY_LATENCY_SCALE, **_cassette.stats}
@@ -3,11 +3,20 @@ import sys
 import asyncio
 import uvicorn 
 import time 
+import json
+import statistics
+import re
+import hashlib
+import uuid
+import threading
+import contextvars
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Annotated, Callable, Tuple
 from datetime import datetime
+from html import escape as html_escape
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
@@ -15,6 +24,9 @@ from fastapi.middleware.cors import CORSMiddleware
 import pprint
 from dotenv import load_dotenv
 
+# Before the local modules below: they read their FOUNDRY_* settings at import time.
+load_dotenv()
+
 # --- Imports for Research Agent ---
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_tavily import TavilySearch
@@ -22,10 +34,40 @@ from langchain_core.runnables import RunnableParallel, RunnablePassthrough, Runn
 from langchain_core.output_parsers import StrOutputParser
 
 # --- NEW Imports for Design/BRD Agent ---
-import requests
+from http_pool import http # shared keep-alive pool with per-host limits and circuit breakers
 from fpdf import FPDF # <-- NEW IMPORT
 
-load_dotenv()
+# --- Per-agent model routing ---
+from model_router import ModelRouter
+
+# --- Shared run registry / step-event pub/sub ---
+from run_registry import RunRegistry, WORKER_ID, TERMINAL_EVENTS, RUN_LEASE_SECONDS
+
+# --- Landing page post-processing ---
+from html_optimizer import optimize_landing_page
+
+# --- Content-addressed Vercel deploys ---
+from vercel_deploy import DeployJobs
+
+# --- Opt-in per-run profiling ---
+from run_profiler import profiling, span, thread_scope, PROFILE_DIR
+
+# --- Prompt token budgeting ---
+from prompt_budget import budgeted, prompt_token_stats, PROMPT_BUDGETS
+
+# --- Semantic reuse of past research ---
+from research_index import ResearchIndex, RESEARCH_REUSE
+
+# --- Persistent, searchable campaign history ---
+from campaign_history import CampaignHistory
+
+# --- Per-run SLA budgets and graceful degradation ---
+from run_budget import run_budget, node_budget, node_seconds_left, current_budget, degrade, submit, wait_within, call_within, BudgetExceeded, RUN_SLA_SECONDS, MIN_NODE_SECONDS
+
+# --- Record/replay of outbound HTTP ---
+import cassette
+
+cassette.install()
 
 _grok_key = os.getenv("GROQ_API_KEY")
 if _grok_key:
@@ -46,8 +88,14 @@ else:
     print("--- ⚠️  UNSPLASH_ACCESS_KEY not found. Set UNSPLASH_ACCESS_KEY in your environment or .env file. ---")
 
 
-llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0)
-print(f"--- 🤖 Groq LLM Initialized (llama-3.1-8b-instant) ---") 
+model_router = ModelRouter(temperature=0)
+for _node, _route in model_router.routes.items():
+    print(f"--- 🤖 {_node}: {_route['model']} (timeout {_route['timeout']}s, fallbacks {_route.get('fallbacks', [])}) ---")
+print(f"--- 🤖 Groq Model Router Initialized ---") 
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """LangGraph reducer: merge per-node entries instead of overwriting them."""
+    return {**(left or {}), **(right or {})}
 
 class EmailStep(BaseModel):
     """A single email in the nurture sequence"""
@@ -74,6 +122,7 @@ class CampaignState(BaseModel):
     
     # --- 1. Filled by Planner_Agent ---
     initial_prompt: str = Field(description="The user's first natural language prompt")
+    run_id: Optional[str] = None # Keys this run's in-process scratch (speculation, fused output)
     goal: Optional[str] = None
     topic: Optional[str] = None
     target_audience: Optional[str] = None
@@ -98,6 +147,7 @@ class CampaignState(BaseModel):
     # --- 5. Filled by Web_Agent ---
     landing_page_code: Optional[str] = None
     landing_page_url: Optional[str] = None
+    landing_page_report: Dict[str, Any] = {} # Page weight vs. budget after post-processing
     
     # --- 6. Filled by BRD_Agent ---
     brd_url: Optional[str] = None
@@ -108,6 +158,21 @@ class CampaignState(BaseModel):
     # --- 8. Filled by Ops_Agent ---
     automation_status: Dict[str, Any] = {}  # Changed from Dict[str, str] to Dict[str, Any] to support complex data
     
+    # --- Filled by every LLM node: which model served it and why ---
+    model_routing: Annotated[Dict[str, Any], merge_dicts] = {}
+    
+    # --- Filled by Research_Agent when speculative prefetch is enabled ---
+    speculation: Dict[str, Any] = {}
+    
+    # --- Filled by Research_Agent: whether a past result for a similar topic/audience was reused ---
+    research_reuse: Dict[str, Any] = {}
+    
+    # --- Filled by every node: hash of the inputs its outputs were built from ---
+    node_input_hashes: Annotated[Dict[str, str], merge_dicts] = {}
+    
+    # --- Filled by nodes that ran out of their SLA share: which fallback fired ---
+    degradations: Annotated[Dict[str, Any], merge_dicts] = {}
+    
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
@@ -144,7 +209,7 @@ planner_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=planner_parser.get_format_instructions())
-planner_chain = planner_prompt | llm | planner_parser
+planner_chain = budgeted("planner_agent", planner_prompt) | model_router.for_node("planner_agent") | planner_parser
 print("--- 📋 Planner Agent LCEL Chain Compiled ---")
 
 
@@ -154,7 +219,18 @@ class ResearchOutput(BaseModel):
     core_messaging: Dict[str, str] = Field(description="A 3-key dictionary for the marketing strategy, with keys 'value_proposition', 'tone_of_voice', and 'call_to_action'.")
 
 research_parser = PydanticOutputParser(pydantic_object=ResearchOutput)
+
+def format_search_results(results: Any) -> Any:
+    """Tavily returns a dict full of scores and metadata; the prompt only needs title + snippet lines."""
+    if isinstance(results, dict) and isinstance(results.get("results"), list):
+        return "\n".join(f"- {r.get('title', '')}: {r.get('content', '')}" for r in results["results"])
+    return results
+
 tavily_tool = TavilySearch(max_results=3) 
+
+def search_audience(topic: Optional[str], target_audience: Optional[str]) -> Any:
+    with span("tavily:search", "http"):
+        return tavily_tool.invoke(f"common pain points for {target_audience} related to {topic}")
 research_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -176,17 +252,20 @@ research_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=research_parser.get_format_instructions())
+research_context = RunnablePassthrough.assign(
+    scraped_content=lambda x: "No document provided.", # Default content
+    search_results=lambda x: format_search_results(x.get("search_results") or search_audience(x["topic"], x["target_audience"]))
+)
 research_search_only_chain = (
-    RunnablePassthrough.assign(
-        scraped_content=lambda x: "No document provided.", # Default content
-        search_results=lambda x: tavily_tool.invoke(f"common pain points for {x['target_audience']} related to {x['topic']}")
-    )
-    | research_prompt
-    | llm
+    research_context
+    | budgeted("research_agent", research_prompt, "topic")
+    | model_router.for_node("research_agent")
     | research_parser
 )
 print("--- 🧠 Research Agent LCEL Chain Compiled (Search-Only) ---")
 
+research_index = ResearchIndex()
+
 
 # --- 3.3: CONTENT AGENT SCHEMA & CHAIN (MODIFIED) ---
 class WebinarDetails(BaseModel):
@@ -224,18 +303,22 @@ content_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=content_parser.get_format_instructions())
-content_chain = content_prompt | llm | content_parser
+content_chain = budgeted("content_agent", content_prompt, "topic") | model_router.for_node("content_agent") | content_parser
 print("--- ✍️  Content Agent LCEL Chain Compiled ---")
 
 
 # --- 3.4: DESIGN AGENT (Using Unsplash) ---
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
 UNSPLASH_HEADERS = {"Authorization": f"Client-ID {_unsplash_key}"}
-def get_unsplash_image(search_query: str) -> str:
+def placeholder_image(search_query: str) -> str:
+    return f"https://placehold.co/800x400/4F46E5/FFFFFF?text={search_query.replace(' ', '+')}"
+
+def get_unsplash_image(search_query: str, timeout: float = 10) -> str:
     print(f"--- 🎨 Querying Unsplash for: '{search_query}' ---")
     params = {"query": search_query, "per_page": 1, "orientation": "landscape"}
     try:
-        response = requests.get(UNSPLASH_API_URL, headers=UNSPLASH_HEADERS, params=params, timeout=10)
+        with span("unsplash:search", "http"):
+            response = http.get(UNSPLASH_API_URL, headers=UNSPLASH_HEADERS, params=params, timeout=timeout)
         response.raise_for_status() 
         data = response.json()
         if data["results"]:
@@ -276,7 +359,7 @@ web_agent_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
-web_agent_chain = web_agent_prompt | llm | StrOutputParser()
+web_agent_chain = budgeted("web_agent", web_agent_prompt, "topic") | model_router.for_node("web_agent") | StrOutputParser()
 print("--- 🕸️  Web Agent LCEL Chain Compiled ---")
 
 
@@ -326,7 +409,7 @@ brd_agent_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
-brd_agent_chain = brd_agent_prompt | llm | StrOutputParser()
+brd_agent_chain = budgeted("brd_agent", brd_agent_prompt, "topic") | model_router.for_node("brd_agent") | StrOutputParser()
 print("--- 📄 BRD Agent LCEL Chain Compiled ---")
 
 
@@ -348,10 +431,217 @@ strategy_agent_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
-strategy_agent_chain = strategy_agent_prompt | llm | StrOutputParser()
+strategy_agent_chain = budgeted("strategy_agent", strategy_agent_prompt, "topic") | model_router.for_node("strategy_agent") | StrOutputParser()
 print("--- 📈 Strategy Agent LCEL Chain Compiled ---")
 
 
+# --- 3.8: SPECULATIVE RESEARCH PREFETCH ---
+# While the planner parses the brief, guess topic/audience from the raw prompt and
+# start the Tavily search in the background. The research node adopts the result if
+# the planner agrees closely enough. Images aren't prefetched: their queries come
+# from the content agent, so nothing guessable from the brief would match them.
+SPECULATIVE_RESEARCH = os.getenv("FOUNDRY_SPECULATIVE_RESEARCH", "0") == "1"
+SPECULATION_MATCH_THRESHOLD = float(os.getenv("FOUNDRY_SPECULATION_MATCH", "0.6"))
+SPECULATION_TIMEOUT = float(os.getenv("FOUNDRY_SPECULATION_TIMEOUT_S", "15")) # longest the research node waits for it
+
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculate")
+_speculations: Dict[str, Tuple[Dict[str, Optional[str]], Future]] = {} # run_id -> (guess, search)
+_speculation_lock = threading.Lock()
+speculation_stats = {"started": 0, "hits": 0, "misses": 0, "discarded": 0, "timeouts": 0, "wasted_calls": 0}
+
+_AUDIENCE_PATTERNS = [
+    r"\b(?:targeting|aimed at|for|to)\s+((?:[A-Z][\w&-]*|of|and|the|in)(?:\s+(?:[A-Z][\w&-]*|of|and|the|in))*)",
+    r"\baudience(?: is|:)\s+([^.,;\n]+)",
+]
+_TOPIC_PATTERNS = [
+    r"[\"“']([^\"”']{3,60})[\"”']",
+    r"\b(?:launch(?:ing)?|promot(?:e|ing)|about|on|for our|for the)\s+(?:a |an |the |our |new )*([A-Z][\w-]*(?:\s+[A-Z][\w-]*)*)",
+]
+
+def _tokens(text: Optional[str]) -> set:
+    return set(re.findall(r"[a-z0-9]+", (text or "").lower())) - {"the", "of", "and", "a", "an", "for", "in", "to"}
+
+def _similarity(a: Optional[str], b: Optional[str]) -> float:
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+def guess_topic_and_audience(brief: str) -> Dict[str, Optional[str]]:
+    """Cheap regex extraction of topic / audience from a raw brief (no LLM call)."""
+    guess: Dict[str, Optional[str]] = {"topic": None, "target_audience": None}
+    for pattern in _AUDIENCE_PATTERNS:
+        match = re.search(pattern, brief)
+        if match:
+            guess["target_audience"] = re.sub(r"(\s+(?:of|and|the|in))+$", "", match.group(1).strip(" ."))
+            break
+    for pattern in _TOPIC_PATTERNS:
+        for match in re.finditer(pattern, brief):
+            candidate = match.group(1).strip(" .")
+            if candidate and candidate != guess["target_audience"]:
+                guess["topic"] = candidate
+                break
+        if guess["topic"]:
+            break
+    return guess
+
+def _run_speculation(guess: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    return {"search_results": search_audience(guess["topic"], guess["target_audience"])}
+
+def start_speculative_research(run_id: str, brief: str) -> Optional[Dict[str, Optional[str]]]:
+    """Kicks off the speculative search for a run's brief. Returns the guess, or None if skipped."""
+    if not SPECULATIVE_RESEARCH:
+        return None
+    guess = guess_topic_and_audience(brief)
+    if not guess["topic"] or not guess["target_audience"]:
+        print("--- 🔮 Speculation skipped: could not guess topic/audience from brief ---")
+        return None
+    print(f"--- 🔮 Speculating research for topic='{guess['topic']}', audience='{guess['target_audience']}' ---")
+    with _speculation_lock:
+        _speculations[run_id] = (guess, _speculation_pool.submit(_run_speculation, guess))
+        speculation_stats["started"] += 1
+    return guess
+
+def _count_wasted(future: Future):
+    """Once an unused speculation finishes, counts the calls it made as wasted."""
+    if future.cancel():
+        return
+    def count(done: Future):
+        if done.exception() is None:
+            with _speculation_lock:
+                speculation_stats["wasted_calls"] += 1
+    future.add_done_callback(count)
+
+def claim_speculative_research(run_id: str, topic: Optional[str], target_audience: Optional[str]) -> Dict[str, Any]:
+    """
+    Called by the research node once the planner has finished. The guess is
+    checked first, so a miss never waits on a search it would throw away; a
+    likely hit waits at most SPECULATION_TIMEOUT or what's left of the node's
+    share. Returns {"adopted": bool, ...} and, when adopted, the search results.
+    """
+    with _speculation_lock:
+        entry = _speculations.pop(run_id, None)
+    if entry is None:
+        return {"adopted": False, "reason": "no speculation"}
+    guess, future = entry
+    topic_score = _similarity(guess["topic"], topic)
+    audience_score = _similarity(guess["target_audience"], target_audience)
+    report = {
+        "guessed_topic": guess["topic"],
+        "guessed_audience": guess["target_audience"],
+        "topic_score": round(topic_score, 2),
+        "audience_score": round(audience_score, 2),
+    }
+    if min(topic_score, audience_score) < SPECULATION_MATCH_THRESHOLD:
+        with _speculation_lock:
+            speculation_stats["misses"] += 1
+        _count_wasted(future)
+        print(f"--- 🔮 Speculation MISS (topic {topic_score:.2f}, audience {audience_score:.2f}), discarding ---")
+        return {"adopted": False, "reason": "mismatch", **report}
+
+    wait_s = SPECULATION_TIMEOUT
+    seconds_left = node_seconds_left("research_agent")
+    if seconds_left is not None:
+        wait_s = min(wait_s, seconds_left)
+    try:
+        result = future.result(timeout=wait_s)
+    except FutureTimeout:
+        with _speculation_lock:
+            speculation_stats["misses"] += 1
+            speculation_stats["timeouts"] += 1
+        _count_wasted(future)
+        return {"adopted": False, "reason": f"speculation still running after {wait_s:.1f}s", **report}
+    except Exception as e:
+        with _speculation_lock:
+            speculation_stats["misses"] += 1
+        return {"adopted": False, "reason": f"speculation failed: {e}", **report}
+    with _speculation_lock:
+        speculation_stats["hits"] += 1
+    print(f"--- 🔮 Speculation HIT (topic {topic_score:.2f}, audience {audience_score:.2f}) ---")
+    return {"adopted": True, "search_results": result["search_results"], **report}
+
+def discard_speculative_research(run_id: str):
+    """Drops a speculation the research node won't use; its calls count as wasted once they finish."""
+    with _speculation_lock:
+        entry = _speculations.pop(run_id, None)
+        if entry is None:
+            return
+        speculation_stats["discarded"] += 1
+    _count_wasted(entry[1])
+
+def release_speculation(run_id: Optional[str]):
+    """Evicts an unclaimed search a finished run left behind."""
+    if run_id:
+        discard_speculative_research(run_id)
+
+
+# --- 3.9: FUSED RESEARCH + STRATEGY + CONTENT (Optional) ---
+# One structured call instead of three round-trips. The research node makes the
+# call; strategy and content nodes pick up their share, so the graph still emits
+# the same three step events. Nodes fall back to their own chains if nothing is stashed.
+FUSED_AGENTS = os.getenv("FOUNDRY_FUSED_AGENTS", "0") == "1"
+
+class FusedAgentOutput(BaseModel):
+    """Research, strategy and content for the campaign in a single response"""
+    research: ResearchOutput
+    strategy_markdown: str = Field(description="A Markdown strategic plan starting with '# Strategic Approach', with 3-5 phases and how to approach each.")
+    content: ContentAgentOutput
+
+fused_parser = PydanticOutputParser(pydantic_object=FusedAgentOutput)
+fused_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are a world-class marketing strategist, Chief Strategist and copywriter in one. "
+            "From the product context and audience research, produce the audience research, the "
+            "strategic plan and the campaign content together. "
+            "Respond ONLY with the required JSON object, with no other text."
+            "\n\n{format_instructions}"
+        ),
+        (
+            "human",
+            "--- PRODUCT CONTEXT ---\n"
+            "{scraped_content}\n\n"
+            "--- AUDIENCE RESEARCH ---\n"
+            "Goal: {goal}\nTopic: {topic}, Audience: {target_audience}\n"
+            "Research Results:\n{search_results}\n\n"
+            "--- TASK ---"
+            "\n1. research: the **audience_persona** (keys 'pain_point', 'motivation', 'preferred_channel') and **core_messaging** (keys 'value_proposition', 'tone_of_voice', 'call_to_action')."
+            "\n2. strategy_markdown: a strategic approach for the goal, broken into 3-5 key phases."
+            "\n3. content: webinar details (catchy title, 2-3 sentence abstract), *exactly 2* social posts, and a simple stock photo search query for the webinar banner."
+        ),
+    ]
+).partial(format_instructions=fused_parser.get_format_instructions())
+fused_agent_chain = (
+    research_context
+    | budgeted("fused_agent", fused_prompt, "topic")
+    | model_router.for_node("fused_agent")
+    | fused_parser
+)
+print("--- 🧬 Fused Research/Strategy/Content LCEL Chain Compiled ---")
+
+_fused_results: "OrderedDict[str, FusedAgentOutput]" = OrderedDict()
+_fused_lock = threading.Lock()
+
+def stash_fused_result(run_id: str, output: FusedAgentOutput):
+    with _fused_lock:
+        _fused_results[run_id] = output
+        while len(_fused_results) > 256: # backstop; finished runs release theirs
+            _fused_results.popitem(last=False)
+
+def peek_fused_result(run_id: Optional[str]) -> Optional[FusedAgentOutput]:
+    with _fused_lock:
+        return _fused_results.get(run_id)
+
+def drop_fused_result(run_id: Optional[str]):
+    with _fused_lock:
+        _fused_results.pop(run_id, None)
+
+def release_run_scratch(run_id: Optional[str]):
+    """Evicts a run's in-process scratch: unclaimed speculation and fused output nobody consumed."""
+    release_speculation(run_id)
+    drop_fused_result(run_id)
+
 # --- 4. AGENT "WORKSTATIONS" (The Nodes) ---
 
 # --- NEW PDF HELPER FUNCTION ---
@@ -371,55 +661,212 @@ def save_markdown_as_pdf(markdown_text: str, filename: str) -> str:
             print("--- ⚠️ Download it from https://github.com/dejavu-fonts/dejavu-fonts/blob/master/ttf/DejaVuSans.ttf?raw=true ---")
             pdf.set_font("Arial", size=12)
         
-        pdf.multi_cell(0, 5, markdown_text, markdown=True)
-        
-        pdf.output(filename)
+        with span("pdf:render", "render"):
+            pdf.multi_cell(0, 5, markdown_text, markdown=True)
+            
+            pdf.output(filename)
         print(f"--- 📄 PDF saved as: {filename} ---")
         return filename
     except Exception as e:
         print(f"--- ❌ ERROR saving PDF: {e} ---")
         return "error_saving_pdf.pdf"
 
+# --- SLA FALLBACKS ---
+# What a node returns instead when its share of the run's deadline runs out
+# (see run_budget.py). Every one is deterministic and makes no network calls.
+def run_within_share(node: str, rule: str, call: Callable[[], Any], fallback: Callable[[], Any]) -> Any:
+    """
+    Returns call() if it finishes within the node's share of the run's SLA.
+    If too little is left to start, or the share runs out first, records
+    `rule` as a degradation and returns fallback() instead.
+    """
+    seconds_left = node_seconds_left(node)
+    if seconds_left is not None and seconds_left < MIN_NODE_SECONDS.get(node, 0):
+        degrade(node, rule, f"skipped with {seconds_left:.1f}s left")
+        return fallback()
+    try:
+        return call_within(node, call)
+    except BudgetExceeded as e:
+        degrade(node, rule, str(e))
+        return fallback()
+
+def fallback_plan(brief: str) -> PlannerOutput:
+    """The regex guess the speculative prefetch already uses, in place of the planner LLM."""
+    guess = guess_topic_and_audience(brief)
+    url = re.search(r"https?://\S+", brief)
+    return PlannerOutput(
+        goal="Launch a webinar",
+        topic=guess["topic"] or " ".join(brief.split()[:6]),
+        target_audience=guess["target_audience"] or "Decision makers",
+        source_docs_url=url.group(0).rstrip(".,)") if url else None,
+        campaign_date=None,
+    )
+
+def default_research(state: CampaignState) -> ResearchOutput:
+    """Generic persona and messaging, used when research doesn't fit in the run's SLA."""
+    topic = state.topic or "the product"
+    audience = state.target_audience or "the target audience"
+    return ResearchOutput(
+        audience_persona={
+            "pain_point": f"Keeping up with {topic} without slowing the team down",
+            "motivation": f"Concrete results from {topic} they can show to leadership",
+            "preferred_channel": "LinkedIn",
+        },
+        core_messaging={
+            "value_proposition": f"{topic} for {audience}, without the overhead",
+            "tone_of_voice": "Professional and direct",
+            "call_to_action": "Register for the webinar",
+        },
+    )
+
+def fallback_strategy(state: CampaignState) -> str:
+    topic = state.topic or "the product"
+    audience = state.target_audience or "the target audience"
+    return (
+        "# Strategic Approach\n\n"
+        f"1. **Awareness**: Introduce {topic} to {audience} on LinkedIn and email.\n"
+        f"2. **Engagement**: Drive registrations for the webinar ({state.goal or 'campaign goal'}).\n"
+        "3. **Conversion**: Follow up with attendees within 48 hours with a tailored demo offer.\n"
+        "4. **Review**: Measure registrations, attendance and pipeline, then refine messaging.\n"
+    )
+
+def fallback_content(state: CampaignState) -> ContentAgentOutput:
+    topic = state.topic or "our product"
+    audience = state.target_audience or "your team"
+    messaging = state.core_messaging or {}
+    value = messaging.get("value_proposition") or f"{topic} for {audience}"
+    call_to_action = messaging.get("call_to_action") or "Register for the webinar"
+    return ContentAgentOutput(
+        webinar_details=WebinarDetails(
+            title=f"{topic}: What {audience} Need to Know",
+            abstract=f"{value}. Join a live walkthrough of {topic} and bring your questions for the team.",
+        ),
+        social_posts=[
+            SocialPost(platform="LinkedIn", content=f"{value}. {call_to_action}.", image_prompt="technology team"),
+            SocialPost(platform="X (Twitter)", content=f"{topic} for {audience}, live. {call_to_action}.", image_prompt="webinar"),
+        ],
+        webinar_image_prompt="webinar presentation",
+    )
+
+def fallback_landing_page(state: CampaignState) -> str:
+    details = state.webinar_details or {}
+    messaging = state.core_messaging or {}
+    title = html_escape(details.get("title") or state.topic or "Webinar")
+    abstract = html_escape(details.get("abstract") or messaging.get("value_proposition") or "")
+    call_to_action = html_escape(messaging.get("call_to_action") or "Register now")
+    banner = state.generated_assets.get("webinar_banner_url")
+    banner_html = f'<img src="{html_escape(banner)}" alt="{title}" width="800" height="400">' if banner else ""
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+        f"<title>{title}</title><style>"
+        "body{font-family:Inter,system-ui,sans-serif;margin:0;color:#0A0A0A;background:#FFFFFF}"
+        "main{max-width:800px;margin:0 auto;padding:48px 24px}"
+        "img{max-width:100%;height:auto;border-radius:12px}"
+        "a.cta{display:inline-block;margin-top:24px;padding:14px 28px;background:#4F46E5;color:#FFFFFF;border-radius:8px;text-decoration:none}"
+        "</style></head><body><main>"
+        f"<h1>{title}</h1>{banner_html}<p>{abstract}</p>"
+        f"<a class=\"cta\" href=\"#register\">{call_to_action}</a>"
+        "</main></body></html>"
+    )
+
 def planner_agent_node(state: CampaignState) -> dict:
     print("--- 1. 📋 Calling Planner Agent (REAL) ---")
     brief = state.initial_prompt
-    try:
-        planner_output: PlannerOutput = planner_chain.invoke({"brief": brief})
-        return planner_output.model_dump()
-    except Exception as e:
-        print(f"--- ❌ ERROR in Planner Agent: {e} ---")
-        return {}
+    # Callers that invoke the graph directly get a run ID here; scratch state is keyed by it.
+    run_id = state.run_id or uuid.uuid4().hex
+    start_speculative_research(run_id, brief)
+    with model_router.track() as routing:
+        try:
+            planner_output: PlannerOutput = run_within_share(
+                "planner_agent", "regex_plan",
+                lambda: planner_chain.invoke({"brief": brief}),
+                lambda: fallback_plan(brief),
+            )
+            return {**planner_output.model_dump(), "run_id": run_id, "model_routing": {"planner_agent": list(routing)}}
+        except Exception as e:
+            print(f"--- ❌ ERROR in Planner Agent: {e} ---")
+            return {"run_id": run_id, "model_routing": {"planner_agent": routing}}
+
+# Set while /regenerate_node re-runs a node; regenerating research must not be served from the index.
+_regeneration_target: contextvars.ContextVar = contextvars.ContextVar("regeneration_target", default=None)
 
 def research_agent_node(state: CampaignState) -> dict:
     print("--- 2. 🧠 Calling Research Agent (REAL) ---")
     inputs = {"topic": state.topic, "target_audience": state.target_audience}
-    try:
-        if state.source_docs_url:
-            print(f"--- ⚠️ source_docs_url provided, but IGNORING IT to avoid token limits. ---")
-        print("--- 🔎 Running search-only research chain... ---")
-        research_output: ResearchOutput = research_search_only_chain.invoke(inputs)
-        return research_output.model_dump()
-    except Exception as e:
-        print(f"--- ❌ ERROR in Research Agent: {e} ---")
-        pprint.pprint(e) 
-        return {} 
+    reuse = RESEARCH_REUSE and _regeneration_target.get() != "research_agent"
+    neighbor = research_index.nearest(state.topic, state.target_audience) if reuse else None
+    if neighbor:
+        print(f"--- ♻️ Reusing research for '{neighbor['topic']}' / '{neighbor['target_audience']}' (similarity {neighbor['score']:.2f}) ---")
+        discard_speculative_research(state.run_id)
+        research_output = ResearchOutput.model_validate(neighbor.pop("output"))
+        return {
+            **research_output.model_dump(),
+            "speculation": {"adopted": False, "reason": "research reused"},
+            "research_reuse": {"reused": True, **neighbor},
+        }
+    seconds_left = node_seconds_left("research_agent")
+    if seconds_left is not None and seconds_left < MIN_NODE_SECONDS["research_agent"]:
+        degrade("research_agent", "default_research", f"skipped research with {seconds_left:.1f}s left")
+        discard_speculative_research(state.run_id)
+        return {**default_research(state).model_dump(), "speculation": {"adopted": False, "reason": "research skipped"}}
+    speculation = claim_speculative_research(state.run_id, state.topic, state.target_audience)
+    if speculation["adopted"]:
+        inputs["search_results"] = speculation.pop("search_results")
+    with model_router.track() as routing:
+        try:
+            if state.source_docs_url:
+                print(f"--- ⚠️ source_docs_url provided, but IGNORING IT to avoid token limits. ---")
+            if FUSED_AGENTS:
+                print("--- 🧬 Running fused research/strategy/content chain... ---")
+                fused_output: FusedAgentOutput = call_within("research_agent", fused_agent_chain.invoke, {**inputs, "goal": state.goal})
+                stash_fused_result(state.run_id, fused_output)
+                research_output = fused_output.research
+            else:
+                print("--- 🔎 Running search-only research chain... ---")
+                research_output: ResearchOutput = call_within("research_agent", research_search_only_chain.invoke, inputs)
+            research_index.add(state.topic, state.target_audience, research_output.model_dump(mode="json"))
+            return {
+                **research_output.model_dump(),
+                "model_routing": {"research_agent": routing},
+                "speculation": speculation,
+                "research_reuse": {"reused": False},
+            }
+        except BudgetExceeded as e:
+            degrade("research_agent", "default_research", str(e))
+            # The abandoned call may still log to `routing`; hand the graph a copy.
+            return {**default_research(state).model_dump(), "model_routing": {"research_agent": list(routing)}, "speculation": speculation}
+        except Exception as e:
+            print(f"--- ❌ ERROR in Research Agent: {e} ---")
+            pprint.pprint(e) 
+            return {"model_routing": {"research_agent": routing}, "speculation": speculation} 
 
 def content_agent_node(state: CampaignState) -> dict:
     print("--- 4. ✍️ Calling Content Agent (REAL) ---")
-    try:
-        inputs = {
-            "goal": state.goal,
-            "topic": state.topic,
-            "target_audience": state.target_audience,
-            "persona": state.audience_persona,
-            "messaging": state.core_messaging,
-        }
-        content_output: ContentAgentOutput = content_chain.invoke(inputs)
-        return content_output.model_dump()
-    except Exception as e:
-        print(f"--- ❌ ERROR in Content Agent: {e} ---")
-        pprint.pprint(e)
-        return {}
+    fused_output = peek_fused_result(state.run_id)
+    drop_fused_result(state.run_id) # Content is the last consumer
+    if fused_output is not None:
+        print("--- 🧬 Using content from the fused call ---")
+        return fused_output.content.model_dump()
+    with model_router.track() as routing:
+        try:
+            inputs = {
+                "goal": state.goal,
+                "topic": state.topic,
+                "target_audience": state.target_audience,
+                "persona": state.audience_persona,
+                "messaging": state.core_messaging,
+            }
+            content_output: ContentAgentOutput = run_within_share(
+                "content_agent", "template_content",
+                lambda: content_chain.invoke(inputs),
+                lambda: fallback_content(state),
+            )
+            return {**content_output.model_dump(), "model_routing": {"content_agent": list(routing)}}
+        except Exception as e:
+            print(f"--- ❌ ERROR in Content Agent: {e} ---")
+            pprint.pprint(e)
+            return {"model_routing": {"content_agent": routing}}
 
 def design_agent_node(state: CampaignState) -> dict:
     print("--- 5. 🎨 Calling Design Agent (REAL) ---")
@@ -431,14 +878,25 @@ def design_agent_node(state: CampaignState) -> dict:
     )
     
     generated_assets = {}
+    placeholders = []
+    
+    def image_for(search_query: str) -> str:
+        seconds_left = node_seconds_left("design_agent")
+        if seconds_left is None:
+            return get_unsplash_image(search_query)
+        if seconds_left < MIN_NODE_SECONDS["design_agent"]:
+            placeholders.append(search_query)
+            return placeholder_image(search_query)
+        return get_unsplash_image(search_query, timeout=min(10, seconds_left))
     
     print("--- 🎨 Generating Webinar Banner... ---")
-    generated_assets["webinar_banner_url"] = get_unsplash_image(state.webinar_image_prompt)
+    generated_assets["webinar_banner_url"] = image_for(state.webinar_image_prompt)
     
     for i, post in enumerate(state.social_posts):
         print(f"--- 🎨 Generating image for social post {i+1} ({post.platform})... ---")
-        image_url = get_unsplash_image(post.image_prompt)
-        generated_assets[f"post_{i+1}_image_url"] = image_url
+        generated_assets[f"post_{i+1}_image_url"] = image_for(post.image_prompt)
+    if placeholders:
+        degrade("design_agent", "placeholder_images", f"{len(placeholders)} image(s) left as placeholders")
 
     print("--- ✅ Design Agent finished ---")
     
@@ -450,74 +908,108 @@ def design_agent_node(state: CampaignState) -> dict:
 def web_agent_node(state: CampaignState) -> dict:
     print("--- 6. 🕸️ Calling Web Agent (REAL) ---")
     
-    try:
-        inputs = {
-            "topic": state.topic,
-            "audience_persona": state.audience_persona,
-            "core_messaging": state.core_messaging,
-            "generated_assets": state.generated_assets
-        }
-        
-        print("--- 🕸️ Generating HTML code based on research (full autonomy)... ---")
-        html_code = web_agent_chain.invoke(inputs)
-        
-        return {
-            "landing_page_code": html_code,
-            "landing_page_url": "campaign_preview.html"
-        }
+    with model_router.track() as routing:
+        try:
+            inputs = {
+                "topic": state.topic,
+                "audience_persona": state.audience_persona,
+                "core_messaging": state.core_messaging,
+                "generated_assets": state.generated_assets
+            }
+            
+            print("--- 🕸️ Generating HTML code based on research (full autonomy)... ---")
+            html_code = run_within_share(
+                "web_agent", "template_landing_page",
+                lambda: web_agent_chain.invoke(inputs),
+                lambda: fallback_landing_page(state),
+            )
+            html_code, page_report = optimize_landing_page(html_code)
+            
+            return {
+                "landing_page_code": html_code,
+                "landing_page_url": "campaign_preview.html",
+                "landing_page_report": page_report,
+                "model_routing": {"web_agent": list(routing)}
+            }
 
-    except Exception as e:
-        print(f"--- ❌ ERROR in Web Agent: {e} ---")
-        pprint.pprint(e)
-        return {}
+        except Exception as e:
+            print(f"--- ❌ ERROR in Web Agent: {e} ---")
+            pprint.pprint(e)
+            return {"model_routing": {"web_agent": routing}}
 
 # --- NEW AGENT NODE (BRD) ---
 def brd_agent_node(state: CampaignState) -> dict:
     print("--- 7. 📄 Calling BRD Agent (REAL) ---")
-    try:
-        inputs = {
-            "topic": state.topic,
-            "goal": state.goal,
-            "audience_persona": state.audience_persona,
-            "core_messaging": state.core_messaging,
-        }
-        print("--- 📄 Generating BRD Markdown... ---")
-        brd_markdown = brd_agent_chain.invoke(inputs)
-        
-        # Create a directory for outputs if it doesn't exist
-        output_dir = "campaign_outputs"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+    seconds_left = node_seconds_left("brd_agent")
+    if seconds_left is None:
+        return generate_brd(state)
+    # Generate in the background; if it doesn't fit in the share, the run keeps
+    # going and the BRD is published in a follow-up step once it's ready.
+    future = submit(generate_brd, state)
+    if seconds_left >= MIN_NODE_SECONDS["brd_agent"]:
+        try:
+            return wait_within("brd_agent", future)
+        except BudgetExceeded:
+            pass
+    degrade("brd_agent", "deferred_brd", f"BRD deferred to a follow-up event with {seconds_left:.1f}s left in its share")
+    current_budget().defer("brd_agent", future, node_input_hash("brd_agent", state))
+    return {}
+
+def generate_brd(state: CampaignState) -> dict:
+    with model_router.track() as routing:
+        try:
+            inputs = {
+                "topic": state.topic,
+                "goal": state.goal,
+                "audience_persona": state.audience_persona,
+                "core_messaging": state.core_messaging,
+            }
+            print("--- 📄 Generating BRD Markdown... ---")
+            brd_markdown = brd_agent_chain.invoke(inputs)
             
-        filename = f"{output_dir}/{state.topic.lower().replace(' ', '_')}_brd.pdf"
-        pdf_path = save_markdown_as_pdf(brd_markdown, filename)
-        
-        return {"brd_url": pdf_path}
+            # Create a directory for outputs if it doesn't exist
+            output_dir = "campaign_outputs"
+            if not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+                
+            filename = f"{output_dir}/{state.topic.lower().replace(' ', '_')}_brd.pdf"
+            pdf_path = save_markdown_as_pdf(brd_markdown, filename)
+            
+            return {"brd_url": pdf_path, "model_routing": {"brd_agent": routing}}
 
-    except Exception as e:
-        print(f"--- ❌ ERROR in BRD Agent: {e} ---")
-        pprint.pprint(e)
-        return {}
+        except Exception as e:
+            print(f"--- ❌ ERROR in BRD Agent: {e} ---")
+            pprint.pprint(e)
+            return {"model_routing": {"brd_agent": routing}}
 
 # --- MODIFIED STRATEGY AGENT ---
 def strategy_agent_node(state: CampaignState) -> dict:
     print("--- 3. 📈 Calling Strategy Agent (REAL) ---")
-    try:
-        inputs = {
-            "topic": state.topic,
-            "goal": state.goal,
-        }
-        print("--- 📈 Generating Strategy Markdown... ---")
-        strategy_markdown = strategy_agent_chain.invoke(inputs)
-        
-        # --- NO PDF CONVERSION ---
-        
-        return {"strategy_markdown": strategy_markdown} # <-- Save the raw text
+    fused_output = peek_fused_result(state.run_id)
+    if fused_output is not None:
+        print("--- 🧬 Using strategy from the fused call ---")
+        return {"strategy_markdown": fused_output.strategy_markdown}
+    with model_router.track() as routing:
+        try:
+            inputs = {
+                "topic": state.topic,
+                "goal": state.goal,
+            }
+            print("--- 📈 Generating Strategy Markdown... ---")
+            strategy_markdown = run_within_share(
+                "strategy_agent", "template_strategy",
+                lambda: strategy_agent_chain.invoke(inputs),
+                lambda: fallback_strategy(state),
+            )
+            
+            # --- NO PDF CONVERSION ---
+            
+            return {"strategy_markdown": strategy_markdown, "model_routing": {"strategy_agent": list(routing)}} # <-- Save the raw text
 
-    except Exception as e:
-        print(f"--- ❌ ERROR in Strategy Agent: {e} ---")
-        pprint.pprint(e)
-        return {}
+        except Exception as e:
+            print(f"--- ❌ ERROR in Strategy Agent: {e} ---")
+            pprint.pprint(e)
+            return {"model_routing": {"strategy_agent": routing}}
 
 
 def ops_agent_node(state: CampaignState) -> dict:
@@ -567,7 +1059,7 @@ def ops_agent_node(state: CampaignState) -> dict:
                 else:
                     slack_payload = {"text": text}
 
-                resp = requests.post(
+                resp = http.post(
                     SLACK_WEBHOOK,
                     json=slack_payload,
                     timeout=10
@@ -591,13 +1083,13 @@ def ops_agent_node(state: CampaignState) -> dict:
                 print(f"📤 Sending post {i+1} to Telegram...")
 
                 if image_url:
-                    tg_resp = requests.post(
+                    tg_resp = http.post(
                         f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto",
                         data={"chat_id": CHAT_ID, "caption": text, "photo": image_url},
                         timeout=10
                     ).json()
                 else:
-                    tg_resp = requests.post(
+                    tg_resp = http.post(
                         f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
                         data={"chat_id": CHAT_ID, "text": text},
                         timeout=10
@@ -626,19 +1118,104 @@ def ops_agent_node(state: CampaignState) -> dict:
 
 
 
+# --- 4.1: NODE INPUT HASHING & MEMOIZATION ---
+# Execution order of the graph below, and the state fields each node reads / writes.
+NODE_ORDER = [
+    "planner_agent", "research_agent", "strategy_agent", "content_agent",
+    "design_agent", "web_agent", "brd_agent", "ops_agent",
+]
+NODE_FUNCTIONS = {
+    "planner_agent": planner_agent_node,
+    "research_agent": research_agent_node,
+    "strategy_agent": strategy_agent_node,
+    "content_agent": content_agent_node,
+    "design_agent": design_agent_node,
+    "web_agent": web_agent_node,
+    "brd_agent": brd_agent_node,
+    "ops_agent": ops_agent_node,
+}
+NODE_INPUTS = {
+    "planner_agent": ["initial_prompt"],
+    "research_agent": ["topic", "target_audience"],
+    "strategy_agent": ["topic", "goal"],
+    "content_agent": ["goal", "topic", "target_audience", "audience_persona", "core_messaging"],
+    "design_agent": ["topic", "webinar_image_prompt", "social_posts"],
+    "web_agent": ["topic", "audience_persona", "core_messaging", "generated_assets"],
+    "brd_agent": ["topic", "goal", "audience_persona", "core_messaging"],
+    "ops_agent": ["social_posts", "generated_assets"],
+}
+NODE_OUTPUTS = {
+    "planner_agent": ["goal", "topic", "target_audience", "source_docs_url", "campaign_date"],
+    "research_agent": ["audience_persona", "core_messaging"],
+    "strategy_agent": ["strategy_markdown"],
+    "content_agent": ["webinar_details", "social_posts", "webinar_image_prompt"],
+    "design_agent": ["brand_kit", "generated_assets"],
+    "web_agent": ["landing_page_code", "landing_page_url", "landing_page_report"],
+    "brd_agent": ["brd_url"],
+    "ops_agent": ["automation_status"],
+}
+# Nodes with external side effects are never re-run implicitly during regeneration.
+SIDE_EFFECT_NODES = {"ops_agent"}
+BOOKKEEPING_FIELDS = {"run_id", "model_routing", "speculation", "research_reuse", "node_input_hashes", "degradations"}
+NODE_MEMO_SIZE = int(os.getenv("FOUNDRY_NODE_MEMO_SIZE", "256"))
+DEGRADED_HASH_PREFIX = "degraded:"
+
+_node_memo: "OrderedDict[tuple, dict]" = OrderedDict()
+_node_memo_lock = threading.Lock()
+
+def node_input_hash(node: str, state: CampaignState) -> str:
+    payload = state.model_dump(include=set(NODE_INPUTS[node]), mode="json")
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def memo_get(node: str, input_hash: str) -> Optional[dict]:
+    with _node_memo_lock:
+        update = _node_memo.get((node, input_hash))
+        if update is not None:
+            _node_memo.move_to_end((node, input_hash))
+        return update
+
+def memo_put(node: str, input_hash: str, update: dict):
+    # Nodes swallow their own errors and return only bookkeeping; don't memoize those.
+    if not set(update) - BOOKKEEPING_FIELDS:
+        return
+    with _node_memo_lock:
+        _node_memo[(node, input_hash)] = {k: v for k, v in update.items() if k not in BOOKKEEPING_FIELDS}
+        _node_memo.move_to_end((node, input_hash))
+        while len(_node_memo) > NODE_MEMO_SIZE:
+            _node_memo.popitem(last=False)
+
+def memoized_node(node: str):
+    """Wraps a node so every run records its input hash and memoizes its output."""
+    fn = NODE_FUNCTIONS[node]
+    def run(state: CampaignState) -> dict:
+        input_hash = node_input_hash(node, state)
+        with thread_scope(node), span(node, "node"), node_budget(node):
+            update = fn(state)
+        budget = current_budget()
+        fired = budget.fired(node) if budget is not None else []
+        if fired:
+            # Fallback outputs are never memoized, and the recorded hash never matches
+            # the inputs, so /regenerate_node treats them as stale and redoes the work.
+            return {**update, "degradations": {node: fired}, "node_input_hashes": {node: DEGRADED_HASH_PREFIX + input_hash}}
+        memo_put(node, input_hash, update)
+        return {**update, "node_input_hashes": {node: input_hash}}
+    run.__name__ = fn.__name__
+    return run
+
+
 # --- 5. LANGGRAPH "FACTORY FLOOR" (The Graph) ---
 
 graph_builder = StateGraph(CampaignState)
 
 # Add all nodes
-graph_builder.add_node("planner_agent", planner_agent_node)
-graph_builder.add_node("research_agent", research_agent_node)
-graph_builder.add_node("content_agent", content_agent_node)
-graph_builder.add_node("design_agent", design_agent_node)
-graph_builder.add_node("web_agent", web_agent_node)
-graph_builder.add_node("brd_agent", brd_agent_node) 
-graph_builder.add_node("strategy_agent", strategy_agent_node) # <-- Name is the same
-graph_builder.add_node("ops_agent", ops_agent_node)
+graph_builder.add_node("planner_agent", memoized_node("planner_agent"))
+graph_builder.add_node("research_agent", memoized_node("research_agent"))
+graph_builder.add_node("content_agent", memoized_node("content_agent"))
+graph_builder.add_node("design_agent", memoized_node("design_agent"))
+graph_builder.add_node("web_agent", memoized_node("web_agent"))
+graph_builder.add_node("brd_agent", memoized_node("brd_agent")) 
+graph_builder.add_node("strategy_agent", memoized_node("strategy_agent")) # <-- Name is the same
+graph_builder.add_node("ops_agent", memoized_node("ops_agent"))
 
 # Add all edges (sequential flow)
 graph_builder.set_entry_point("planner_agent")
@@ -676,6 +1253,420 @@ app.add_middleware(
 
 class StreamRequest(BaseModel):
     initial_prompt: str
+    profile: bool = False # Attach the sampling profiler and span timeline to this run
+    sla_seconds: Optional[float] = None # Deadline for the whole run; defaults to FOUNDRY_RUN_SLA_S
+
+# --- Shared run registry (multi-worker deployments) ---
+# Runs and their step events live in a store every worker can read, so a run
+# can be executed by any worker and watched from any websocket by run ID.
+run_registry = RunRegistry()
+MULTI_WORKER = os.getenv("FOUNDRY_MULTI_WORKER", "0") == "1"
+_run_tasks: Dict[str, asyncio.Task] = {}
+campaign_history = CampaignHistory()
+
+async def save_campaign(run_id: str, state: Dict[str, Any]) -> bool:
+    """Stores the final state; history is best-effort and never fails the run."""
+    try:
+        await asyncio.to_thread(campaign_history.save, run_id, state)
+        return True
+    except Exception as e:
+        print(f"--- ⚠️ Could not save run {run_id} to campaign history: {e} ---")
+        return False
+
+async def execute_run(run_id: str, initial_prompt: str, options: Optional[Dict[str, Any]] = None):
+    """Runs the graph for a claimed run and publishes every step event to the registry."""
+    options = options or {}
+    sla_seconds = options.get("sla_seconds") or RUN_SLA_SECONDS
+    if options.get("profile"):
+        print(f"--- 🔥 Profiling run {run_id} ---")
+        with profiling(run_id) as profiler:
+            await _execute_run(run_id, initial_prompt, sla_seconds, finalize=lambda: profiler_artifacts(profiler))
+    else:
+        await _execute_run(run_id, initial_prompt, sla_seconds)
+
+async def profiler_artifacts(profiler) -> Dict[str, Any]:
+    # The profiler keeps sampling until profiling() exits; this writes what it has so far.
+    artifacts = await asyncio.to_thread(profiler.write)
+    return {
+        "event": "profile",
+        "flamegraph_url": f"/download_profile/{artifacts['flamegraph']}",
+        "timeline_url": f"/download_profile/{artifacts['timeline']}",
+    }
+
+def merge_step(current_state_dict: Dict[str, Any], state_snapshot_diff: Optional[dict]):
+    for key, value in (state_snapshot_diff or {}).items():
+        if isinstance(value, list) and key in current_state_dict:
+            current_state_dict[key].extend(value)
+        elif isinstance(value, dict) and key in current_state_dict:
+            current_state_dict[key].update(value)
+        else:
+            current_state_dict[key] = value
+
+async def publish_step(run_id: str, node_that_ran: str, current_state_dict: Dict[str, Any], state_snapshot_diff: Optional[dict], budget=None, **extra):
+    with span(f"serialize:{node_that_ran}", "serialize"):
+        state_json = CampaignState.model_validate(current_state_dict).model_dump_json(indent=2)
+    
+    with span(f"publish:{node_that_ran}", "io"):
+        await run_registry.apublish(run_id, {
+            "event": "step",
+            "node": node_that_ran,
+            "data": state_json,
+            "routing": (state_snapshot_diff or {}).get("model_routing", {}).get(node_that_ran),
+            "reuse": (state_snapshot_diff or {}).get("research_reuse") if node_that_ran == "research_agent" else None,
+            "budget": budget.report(node_that_ran) if budget is not None else None,
+            **extra,
+        })
+
+async def publish_deferred(run_id: str, current_state_dict: Dict[str, Any], budget):
+    """Once the graph is through: announce what was deferred, then publish each piece as it lands."""
+    await run_registry.apublish(run_id, {
+        "event": "deferred",
+        "nodes": list(budget.deferred),
+        "left_s": round(budget.left(), 2),
+    })
+    for node, (future, input_hash) in budget.deferred.items():
+        print(f"--- ⏳ Waiting for deferred {node} ---")
+        try:
+            update = await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget.left())
+        except asyncio.TimeoutError:
+            # Out of run time: publish the step without it, like any other fallback (never memoized).
+            budget.degrade(node, "deferred_timeout", "still not ready when the run's deadline passed")
+            state_snapshot_diff = {"degradations": {node: budget.fired(node)}}
+            merge_step(current_state_dict, state_snapshot_diff)
+            await publish_step(run_id, node, current_state_dict, state_snapshot_diff, budget, deferred=True)
+            continue
+        # Now that the real output exists, memoize it and record what it was built from.
+        memo_put(node, input_hash, update)
+        state_snapshot_diff = {**update, "node_input_hashes": {node: input_hash}}
+        merge_step(current_state_dict, state_snapshot_diff)
+        await publish_step(run_id, node, current_state_dict, state_snapshot_diff, budget, deferred=True)
+
+async def _execute_run(run_id: str, initial_prompt: str, sla_seconds: Optional[float] = None, finalize=None):
+    initial_input = {"initial_prompt": initial_prompt, "run_id": run_id}
+    current_state_dict = initial_input.copy()
+    print(f"--- 🚀 Worker {WORKER_ID} executing run {run_id} ---")
+    with run_budget(sla_seconds) as budget:
+        try:
+            async for s in foundry_app.astream(initial_input):
+                node_that_ran = list(s.keys())[0]
+                state_snapshot_diff = s[node_that_ran] # This is a dict
+                merge_step(current_state_dict, state_snapshot_diff)
+                await publish_step(run_id, node_that_ran, current_state_dict, state_snapshot_diff, budget)
+        
+            if budget is not None and budget.deferred:
+                await publish_deferred(run_id, current_state_dict, budget)
+            if finalize is not None:
+                await run_registry.apublish(run_id, await finalize())
+            final_state = CampaignState.model_validate(current_state_dict).model_dump(mode="json")
+            saved = await save_campaign(run_id, final_state)
+            await run_registry.apublish(run_id, {"event": "done", "history_id": run_id if saved else None})
+            await asyncio.to_thread(run_registry.finish_run, run_id, "done")
+            print(f"--- ✨ Run {run_id} Complete ---")
+    
+        except asyncio.CancelledError as e:
+            reason = "lost its lease" if e.args == (LEASE_LOST,) else "client disconnected"
+            print(f"--- 🛑 Run {run_id} Cancelled ({reason}) ---")
+            # Only the worker that ends the run publishes its terminal event: a
+            # run the reaper already failed has had its error event.
+            if await asyncio.to_thread(run_registry.finish_run, run_id, "cancelled"):
+                await run_registry.apublish(run_id, {"event": "error", "data": f"Run cancelled: {reason}"})
+            raise
+    
+        except Exception as e:
+            print(f"--- ❌ Run {run_id} Error: {e} ---")
+            if await asyncio.to_thread(run_registry.finish_run, run_id, "error"):
+                await run_registry.apublish(run_id, {"event": "error", "data": str(e)})
+        
+        finally:
+            release_run_scratch(run_id)
+
+# --- Admission control ---
+# At most MAX_CONCURRENT_RUNS campaigns execute per worker; the rest wait in a FIFO
+# queue and get "queued" events with their position. Beyond MAX_QUEUED_RUNS new
+# runs are rejected up front instead of piling onto Groq's rate limits.
+MAX_CONCURRENT_RUNS = int(os.getenv("FOUNDRY_MAX_CONCURRENT_RUNS", "4"))
+MAX_QUEUED_RUNS = int(os.getenv("FOUNDRY_MAX_QUEUED_RUNS", "20"))
+DEFAULT_RUN_SECONDS = 60.0 # ETA basis until real run durations are known
+
+class RunQueueFull(Exception):
+    pass
+
+class AdmissionController:
+    """FIFO admission with a cap on concurrently executing runs"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_RUNS, max_queued: int = MAX_QUEUED_RUNS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.running = 0
+        self.queue: deque = deque() # run_ids waiting, oldest first
+        self.durations: deque = deque(maxlen=20)
+        self._changed = asyncio.Event()
+
+    def is_full(self) -> bool:
+        return self.running >= self.max_concurrent and len(self.queue) >= self.max_queued
+
+    def estimate_wait(self, position: int) -> float:
+        """Seconds until a run at 1-based queue `position` should start."""
+        average = statistics.mean(self.durations) if self.durations else DEFAULT_RUN_SECONDS
+        return average * ((position - 1) // self.max_concurrent + 1)
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def acquire(self, run_id: str, on_queued):
+        """Waits for a slot in FIFO order, awaiting `on_queued(position, eta)` whenever the position changes."""
+        if self.running < self.max_concurrent and not self.queue:
+            self.running += 1
+            return
+        self.queue.append(run_id)
+        last_position = None
+        try:
+            while True:
+                if self.queue[0] == run_id and self.running < self.max_concurrent:
+                    self.queue.popleft()
+                    self.running += 1
+                    self._notify()
+                    return
+                changed = self._changed
+                position = self.queue.index(run_id) + 1
+                if position != last_position:
+                    last_position = position
+                    await on_queued(position, self.estimate_wait(position))
+                    continue
+                await changed.wait()
+        except asyncio.CancelledError:
+            if run_id in self.queue:
+                self.queue.remove(run_id)
+                self._notify()
+            raise
+
+    def release(self, duration: Optional[float] = None):
+        self.running -= 1
+        if duration is not None:
+            self.durations.append(duration)
+        self._notify()
+
+admission = AdmissionController()
+
+async def publish_queue_position(run_id: str, position: int, eta_seconds: float):
+    await run_registry.apublish(run_id, {
+        "event": "queued",
+        "position": position,
+        "eta_seconds": round(eta_seconds),
+        "estimated_start": datetime.fromtimestamp(time.time() + eta_seconds).isoformat(timespec="seconds"),
+    })
+
+async def run_with_admission(run_id: str, initial_prompt: str, options: Dict[str, Any], claimed: bool = False):
+    """Waits for a free slot (publishing queue position), then executes the run."""
+    try:
+        await admission.acquire(run_id, lambda position, eta: publish_queue_position(run_id, position, eta))
+    except asyncio.CancelledError:
+        if await asyncio.to_thread(run_registry.finish_run, run_id, "cancelled"):
+            await run_registry.apublish(run_id, {"event": "error", "data": "Run cancelled while queued"})
+        raise
+    started = time.monotonic()
+    lease = None
+    try:
+        if claimed or await asyncio.to_thread(run_registry.claim_run, run_id):
+            lease = asyncio.create_task(hold_run_lease(run_id, asyncio.current_task()))
+            await execute_run(run_id, initial_prompt, options)
+    finally:
+        if lease is not None:
+            lease.cancel()
+        admission.release(time.monotonic() - started)
+
+LEASE_LOST = "lease lost" # cancel message, so _execute_run doesn't report a client disconnect
+
+async def hold_run_lease(run_id: str, run_task: asyncio.Task):
+    """Renews the run's lease while it executes; stops the run if another worker already failed it."""
+    while True:
+        await asyncio.sleep(RUN_LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(run_registry.heartbeat, run_id):
+            print(f"--- 💔 Lost the lease on run {run_id}; stopping it ---")
+            run_task.cancel(LEASE_LOST)
+            return
+
+def start_run_task(run_id: str, initial_prompt: str, options: Dict[str, Any], claimed: bool = False):
+    task = asyncio.create_task(run_with_admission(run_id, initial_prompt, options, claimed))
+    _run_tasks[run_id] = task
+    task.add_done_callback(lambda _: _run_tasks.pop(run_id, None))
+
+async def follow_shared_queue(run_id: str):
+    """Multi-worker mode: publish this run's position in the shared queue until a worker claims it."""
+    last_position = None
+    while True:
+        position = await asyncio.to_thread(run_registry.queue_position, run_id)
+        if position is None:
+            return
+        if position != last_position:
+            last_position = position
+            await publish_queue_position(run_id, position, admission.estimate_wait(position))
+        await asyncio.sleep(1)
+
+async def submit_run(initial_prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Registers a run, or raises RunQueueFull when the queue is at capacity. Outside
+    multi-worker mode this worker admits and starts it; otherwise any worker may claim it.
+    """
+    if MULTI_WORKER:
+        if await asyncio.to_thread(run_registry.count_queued) >= MAX_QUEUED_RUNS:
+            raise RunQueueFull(f"{MAX_QUEUED_RUNS} campaigns already queued")
+        run_id = await asyncio.to_thread(run_registry.create_run, initial_prompt, options)
+        asyncio.create_task(follow_shared_queue(run_id))
+        return run_id
+    if admission.is_full():
+        raise RunQueueFull(f"{len(admission.queue)} campaigns already queued")
+    run_id = await asyncio.to_thread(run_registry.create_run, initial_prompt, options)
+    start_run_task(run_id, initial_prompt, options or {})
+    return run_id
+
+async def worker_loop():
+    """Multi-worker mode: claim queued runs from the shared registry while we have capacity."""
+    print(f"--- 🏭 Worker {WORKER_ID} polling run registry (concurrency {MAX_CONCURRENT_RUNS}) ---")
+    while True:
+        if admission.running + len(admission.queue) < admission.max_concurrent:
+            run = await asyncio.to_thread(run_registry.claim_run)
+            if run:
+                start_run_task(run["run_id"], run["initial_prompt"], run["options"], claimed=True)
+                await asyncio.sleep(0) # let the task take its slot before checking capacity again
+                continue
+        await asyncio.sleep(run_registry.poll_interval)
+
+async def maintain_run_registry():
+    """Fails runs whose worker died without finishing them, and trims old event logs."""
+    while True:
+        try:
+            lost = await asyncio.to_thread(run_registry.reap_stale_runs)
+            if lost:
+                print(f"--- 🧟 Failed {len(lost)} runs whose worker stopped responding: {lost} ---")
+            await asyncio.to_thread(run_registry.prune_events)
+        except Exception as e:
+            print(f"--- ⚠️ Run registry maintenance failed: {e} ---")
+        await asyncio.sleep(RUN_LEASE_SECONDS)
+
+@app.on_event("startup")
+async def start_worker_loop():
+    if MULTI_WORKER:
+        asyncio.create_task(worker_loop())
+    asyncio.create_task(maintain_run_registry())
+
+@app.get("/admission")
+async def admission_status():
+    return {
+        "running": admission.running,
+        "queued": len(admission.queue),
+        "max_concurrent": admission.max_concurrent,
+        "max_queued": admission.max_queued,
+    }
+
+# --- Per-connection outbox: backpressure, coalescing and heartbeats ---
+# The graph only ever writes to the registry; each websocket drains its own
+# bounded outbox, so a slow browser can never hold up a run.
+WS_SEND_QUEUE_SIZE = int(os.getenv("FOUNDRY_WS_QUEUE_SIZE", "8"))
+WS_SEND_TIMEOUT = float(os.getenv("FOUNDRY_WS_SEND_TIMEOUT", "30"))
+WS_HEARTBEAT_INTERVAL = float(os.getenv("FOUNDRY_WS_HEARTBEAT", "15"))
+WS_HEARTBEAT_TIMEOUT = float(os.getenv("FOUNDRY_WS_HEARTBEAT_TIMEOUT", "45"))
+ORPHAN_POLICY = os.getenv("FOUNDRY_ORPHAN_POLICY", "detach") # "detach" keeps the run going, "cancel" stops it
+
+class ClientChannel:
+    """
+    Bounded outbox for one websocket. Step events carry the full campaign state,
+    so once the outbox is full a new step replaces the newest queued step
+    (recording which nodes were folded into it) instead of growing the queue.
+    Only heartbeats and queue positions may sit between the two: folding past
+    any other event would reorder it.
+    """
+
+    def __init__(self, websocket: WebSocket, maxsize: int = WS_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.pending: deque = deque()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+        self.last_pong: Optional[float] = None
+
+    def put(self, event: Dict[str, Any]):
+        if event.get("event") == "step" and len(self.pending) >= self.maxsize:
+            for i in range(len(self.pending) - 1, -1, -1):
+                queued = self.pending[i]
+                if queued.get("event") in ("ping", "queued"):
+                    continue
+                if queued.get("event") == "step":
+                    folded = queued.get("coalesced_nodes", []) + [queued["node"]]
+                    self.pending[i] = {**event, "coalesced_nodes": folded}
+                    self.coalesced += 1
+                    return
+                break
+        if event.get("event") in ("ping", "queued"):
+            # Only the latest heartbeat / queue position is worth sending.
+            self.pending = deque(e for e in self.pending if e.get("event") != event["event"])
+        self.pending.append(event)
+        self.ready.set()
+
+    async def pump(self, run_id: str, from_seq: int):
+        async for event in run_registry.subscribe(run_id, from_seq):
+            self.put(event)
+
+    async def sender(self):
+        """Returns normally once a terminal event has been delivered."""
+        while True:
+            while not self.pending:
+                self.ready.clear()
+                await self.ready.wait()
+            event = self.pending.popleft()
+            await asyncio.wait_for(self.websocket.send_json(event), timeout=WS_SEND_TIMEOUT)
+            if event.get("event") in TERMINAL_EVENTS:
+                return
+
+    async def receiver(self):
+        """Returns when the client goes away; records pongs along the way."""
+        while True:
+            try:
+                message = await self.websocket.receive_text()
+            except WebSocketDisconnect:
+                return
+            try:
+                if json.loads(message).get("event") == "pong":
+                    self.last_pong = time.monotonic()
+            except Exception:
+                pass
+
+    async def heartbeat(self):
+        """Sends pings; returns if a client that answers pings stops answering."""
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            if self.last_pong is not None and time.monotonic() - self.last_pong > WS_HEARTBEAT_TIMEOUT:
+                print("--- 💔 WebSocket heartbeat timed out ---")
+                return
+            self.put({"event": "ping", "ts": time.time()})
+
+async def forward_run_events(websocket: WebSocket, run_id: str, from_seq: int = 0) -> bool:
+    """Streams a run's events to one client. Returns False if the client died first."""
+    channel = ClientChannel(websocket)
+    pump = asyncio.create_task(channel.pump(run_id, from_seq))
+    sender = asyncio.create_task(channel.sender())
+    watchers = [asyncio.create_task(channel.receiver()), asyncio.create_task(channel.heartbeat())]
+    try:
+        await asyncio.wait([sender, *watchers], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in [pump, sender, *watchers]:
+            task.cancel()
+        await asyncio.gather(pump, sender, *watchers, return_exceptions=True)
+    if channel.coalesced:
+        print(f"--- 🧺 Coalesced {channel.coalesced} step events for slow client on run {run_id} ---")
+    return sender.done() and not sender.cancelled() and sender.exception() is None
+
+def handle_orphaned_run(run_id: str):
+    """The client that started a run is gone: cancel it, or let it finish for watchers."""
+    task = _run_tasks.get(run_id)
+    if task is None:
+        return
+    if ORPHAN_POLICY == "cancel" and run_registry.local_subscribers(run_id) == 0:
+        print(f"--- 🛑 Cancelling orphaned run {run_id} ---")
+        task.cancel()
+    else:
+        print(f"--- 🪁 Detaching run {run_id} from dead client; still watchable ---")
 
 @app.websocket("/ws_stream_campaign")
 async def websocket_endpoint(websocket: WebSocket):
@@ -685,34 +1676,19 @@ async def websocket_endpoint(websocket: WebSocket):
         json_data = await websocket.receive_json()
         request_data = StreamRequest(**json_data)
         
-        initial_input = {"initial_prompt": request_data.initial_prompt}
-        
-        current_state_dict = initial_input.copy()
-        
         print(f"--- 🚀 Received input, starting stream... ---")
+        try:
+            run_id = await submit_run(request_data.initial_prompt, {"profile": request_data.profile, "sla_seconds": request_data.sla_seconds})
+        except RunQueueFull as e:
+            print(f"--- 🚦 Shedding load: {e} ---")
+            await websocket.send_json({"event": "error", "code": "overloaded", "data": f"Server is at capacity ({e}). Please try again shortly."})
+            await websocket.close()
+            return
+        await websocket.send_json({"event": "run", "run_id": run_id})
         
-        async for s in foundry_app.astream(initial_input):
-            node_that_ran = list(s.keys())[0]
-            state_snapshot_diff = s[node_that_ran] # This is a dict
-            
-            if state_snapshot_diff:
-                for key, value in state_snapshot_diff.items():
-                    if isinstance(value, list) and key in current_state_dict:
-                        current_state_dict[key].extend(value)
-                    elif isinstance(value, dict) and key in current_state_dict:
-                        current_state_dict[key].update(value)
-                    else:
-                        current_state_dict[key] = value
-            
-            state_json = CampaignState.model_validate(current_state_dict).model_dump_json(indent=2)
-            
-            await websocket.send_json({
-                "event": "step",
-                "node": node_that_ran,
-                "data": state_json
-            })
-            
-        await websocket.send_json({"event": "done"})
+        if not await forward_run_events(websocket, run_id):
+            handle_orphaned_run(run_id)
+            return
         print("--- ✨ Stream Complete ---")
         
         await websocket.close()
@@ -735,11 +1711,166 @@ async def websocket_endpoint(websocket: WebSocket):
     finally:
         pass
 
+@app.websocket("/ws_watch_campaign/{run_id}")
+async def watch_campaign(websocket: WebSocket, run_id: str, from_seq: int = 0):
+    """Replays and follows the step events of a run started on any worker"""
+    await websocket.accept()
+    try:
+        if not await asyncio.to_thread(run_registry.get_run, run_id):
+            await websocket.send_json({"event": "error", "data": f"Unknown run: {run_id}"})
+        else:
+            if not await forward_run_events(websocket, run_id, from_seq):
+                return
+        await websocket.close()
+    except WebSocketDisconnect:
+        print(f"--- 🔌 Watcher of run {run_id} Disconnected ---")
+
+@app.post("/runs")
+async def create_run(request: StreamRequest):
+    """Queue a campaign run; watch it via /ws_watch_campaign/{run_id}"""
+    try:
+        run_id = await submit_run(request.initial_prompt, {"profile": request.profile, "sla_seconds": request.sla_seconds})
+    except RunQueueFull as e:
+        return {"error": f"Server is at capacity ({e}). Please try again shortly.", "code": "overloaded"}
+    return {"run_id": run_id}
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    run = await asyncio.to_thread(run_registry.get_run, run_id)
+    if not run:
+        return {"error": "Run not found"}
+    return run
+
+
+# --- Campaign history ---
+@app.get("/campaigns")
+async def list_campaigns(limit: int = 20, cursor: Optional[int] = None):
+    """Completed campaigns, newest first; pass next_cursor back to page"""
+    return await asyncio.to_thread(campaign_history.list, limit, cursor)
+
+@app.get("/campaigns/search")
+async def search_campaigns(q: str, limit: int = 20, offset: int = 0):
+    """Full-text search over brief, topic, audience, strategy and landing page"""
+    return await asyncio.to_thread(campaign_history.search, q, limit, offset)
+
+@app.get("/campaigns/{run_id}")
+async def get_campaign(run_id: str):
+    """The final CampaignState of a completed run, without re-running any agent"""
+    campaign = await asyncio.to_thread(campaign_history.get, run_id)
+    if not campaign:
+        return {"error": "Campaign not found"}
+    return campaign
+
+
+# --- Incremental regeneration of a single agent ---
+class RegenerateRequest(BaseModel):
+    state: Dict[str, Any] # A CampaignState, e.g. the last "step" data of a finished run
+    target: str # e.g. "web_agent" or "brd_agent"
+    overrides: Dict[str, Any] = {} # Optional edits applied to the state before regenerating
+
+def apply_node_update(state: CampaignState, update: dict) -> CampaignState:
+    merged = state.model_dump()
+    for key, value in update.items():
+        if key in ("model_routing", "node_input_hashes"):
+            merged[key] = merge_dicts(merged.get(key), value)
+        else:
+            merged[key] = value
+    return CampaignState.model_validate(merged)
+
+def regenerate_node(state: CampaignState, target: str) -> Dict[str, Any]:
+    """
+    Re-runs `target` and whatever its changes invalidate. Every other node keeps its
+    outputs when the hash of its inputs still matches the one recorded in the state,
+    or is served from the in-process memo when that input hash was seen before.
+    """
+    report = {"ran": [], "reused": [], "memo_hits": [], "skipped": []}
+    token = _regeneration_target.set(target)
+    try:
+        state = _regenerate(state, target, report)
+    finally:
+        _regeneration_target.reset(token)
+        release_run_scratch(state.run_id)
+    return {"state": state, **report}
+
+def _regenerate(state: CampaignState, target: str, report: Dict[str, List[str]]) -> CampaignState:
+    for node in NODE_ORDER:
+        input_hash = node_input_hash(node, state)
+        recorded = state.node_input_hashes.get(node)
+        if node != target:
+            # States from before input hashes were recorded: trust outputs that are present.
+            legacy_output = recorded is None and bool(getattr(state, NODE_OUTPUTS[node][0]))
+            if recorded == input_hash or legacy_output:
+                report["reused"].append(node)
+                continue
+            if node in SIDE_EFFECT_NODES:
+                report["skipped"].append(node)
+                continue
+            cached = memo_get(node, input_hash)
+            if cached is not None:
+                state = apply_node_update(state, {**cached, "node_input_hashes": {node: input_hash}})
+                state.degradations.pop(node, None)
+                report["memo_hits"].append(node)
+                continue
+        print(f"--- ♻️ Regenerating {node} ---")
+        state = apply_node_update(state, memoized_node(node)(state))
+        state.degradations.pop(node, None) # regeneration has no deadline, so this is the real output
+        report["ran"].append(node)
+    return state
+
+@app.post("/regenerate_node")
+async def regenerate(request: RegenerateRequest):
+    """Regenerate one agent's output, reusing every upstream result whose inputs did not change"""
+    if request.target not in NODE_FUNCTIONS:
+        return {"error": f"Unknown node '{request.target}'. Expected one of {NODE_ORDER}"}
+    try:
+        state = CampaignState.model_validate({**request.state, **request.overrides})
+        result = await asyncio.to_thread(regenerate_node, state, request.target)
+        print(f"--- ♻️ Regenerate {request.target}: ran {result['ran']}, reused {len(result['reused'])} nodes ---")
+        return {**result, "state": result["state"].model_dump_json(indent=2)}
+    except Exception as e:
+        print(f"--- ❌ ERROR regenerating {request.target}: {e} ---")
+        return {"error": str(e)}
+
 
 @app.get("/")
 async def root():
     return {"message": "AI Campaign Foundry Server is running. Connect via WebSocket."}
 
+@app.get("/router_health")
+async def router_health():
+    """Rolling latency / error stats per model, as seen by the model router"""
+    return {"routes": model_router.routes, "models": model_router.health(), "hedging": model_router.hedger.snapshot()}
+
+@app.get("/prompt_stats")
+async def get_prompt_stats():
+    """Prompt tokens per chain before and after compaction"""
+    return {"budgets": PROMPT_BUDGETS, "chains": prompt_token_stats}
+
+@app.get("/speculation_stats")
+async def get_speculation_stats():
+    """Hit rate and wasted calls for speculative research prefetch"""
+    with _speculation_lock:
+        stats = dict(speculation_stats)
+    decided = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / decided, 3) if decided else None
+    stats["enabled"] = SPECULATIVE_RESEARCH
+    return stats
+
+@app.get("/research_index_stats")
+async def get_research_index_stats():
+    """Size and hit rate of the similar-topic research reuse index"""
+    return research_index.snapshot()
+
+@app.get("/http_stats")
+async def get_http_stats():
+    """Per-host latency, concurrency and circuit breaker state of the shared HTTP pool"""
+    return http.stats()
+
+@app.get("/cassette_stats")
+async def get_cassette_stats():
+    """Record/replay mode and how many interactions were recorded, replayed or missed"""
+    return cassette.cassette_stats()
+
 @app.get("/download_brd/{filename}")
 async def download_brd(filename: str):
     """Serve BRD PDF files for download"""
@@ -757,9 +1888,23 @@ async def download_brd(filename: str):
         }
     )
 
+@app.get("/download_profile/{filename}")
+async def download_profile(filename: str):
+    """Serve a run's flamegraph (SVG) or span timeline (Chrome trace JSON)"""
+    file_path = os.path.join(PROFILE_DIR, os.path.basename(filename))
+    
+    if not os.path.exists(file_path):
+        return {"error": "File not found"}
+    
+    media_type = "image/svg+xml" if filename.endswith(".svg") else "application/json"
+    return FileResponse(path=file_path, media_type=media_type, filename=os.path.basename(filename))
+
 class DeployRequest(BaseModel):
     html_content: str
     project_name: str
+    wait: bool = True # False: return a deploy_id right away and poll /deploy_status/{deploy_id}
+
+deploy_jobs = DeployJobs()
 
 @app.post("/deploy_to_vercel")
 async def deploy_to_vercel(request: DeployRequest):
@@ -771,58 +1916,27 @@ async def deploy_to_vercel(request: DeployRequest):
         return {"error": "VERCEL_TOKEN not found in environment variables"}
     
     try:
-        # Create deployment payload
-        deployment_payload = {
-            "name": request.project_name,
-            "files": [
-                {
-                    "file": "index.html",
-                    "data": request.html_content
-                }
-            ],
-            "projectSettings": {
-                "framework": None
-            }
-        }
-        
-        # Deploy to Vercel
-        headers = {
-            "Authorization": f"Bearer {VERCEL_TOKEN}",
-            "Content-Type": "application/json"
-        }
+        # Pages may have been edited in the web editor since generation; optimize again (idempotent)
+        html_content, page_report = optimize_landing_page(request.html_content)
         
-        response = requests.post(
-            "https://api.vercel.com/v13/deployments",
-            headers=headers,
-            json=deployment_payload,
-            timeout=30
-        )
+        deploy_id = deploy_jobs.submit(request.project_name, html_content, VERCEL_TOKEN)
+        if not request.wait:
+            return {"deploy_id": deploy_id, "status": "queued", "page_report": page_report}
         
-        if response.status_code in [200, 201]:
-            data = response.json()
-            deployment_url = data.get("url", "")
-            
-            # Vercel returns URL without protocol
-            if deployment_url and not deployment_url.startswith("http"):
-                deployment_url = f"https://{deployment_url}"
-            
-            return {
-                "success": True,
-                "url": deployment_url,
-                "id": data.get("id"),
-                "name": data.get("name")
-            }
-        else:
-            error_data = response.json()
-            return {
-                "error": error_data.get("error", {}).get("message", "Deployment failed"),
-                "status_code": response.status_code
-            }
+        result = await deploy_jobs.wait(deploy_id)
+        return {**result, "page_report": page_report}
             
     except Exception as e:
         print(f"--- ❌ ERROR deploying to Vercel: {e} ---")
         return {"error": str(e)}
 
+@app.get("/deploy_status/{deploy_id}")
+async def deploy_status(deploy_id: str):
+    job = deploy_jobs.status(deploy_id)
+    if not job:
+        return {"error": "Deployment not found"}
+    return job
+
 if __name__ == "__main__":
     print("--- 🚀 Starting FastAPI server on http://localhost:8000 ---")
     uvicorn.run(app, host="localhost", port=8000)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import time
+import uvicorn
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute, APIWebSocketRoute
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# --- Single-process gateway ---
+# Serves foundry_server (campaigns), prompt (sales prompt generator) and sch (call
+# analysis / scheduling) from one uvicorn process instead of three. langchain,
+# the Groq clients (llm_clients), the outbound HTTP pool (http_pool), prompt
+# stats and cassettes are module-level, so importing the three apps here makes
+# them share one copy of each.
+#
+# Every app is mounted under its own prefix (/foundry, /prompt, /sch), and the
+# original paths keep working at the root, so clients only need to point their
+# ports 8000/8003/8004 at the gateway port:
+#   python gateway.py                      (port 8000, or GATEWAY_PORT)
+_started = time.perf_counter()
+load_dotenv()
+
+import foundry_server
+import prompt
+import sch
+from llm_clients import client_stats
+from http_pool import http
+
+IMPORT_SECONDS = time.perf_counter() - _started
+SERVICES = {"foundry": foundry_server.app, "prompt": prompt.app, "sch": sch.app}
+
+app = FastAPI(title="Campaign Foundry Gateway")
+
+# (route, service) for every route re-registered at the root, filled in below.
+_root_routes: List[Tuple[BaseRoute, str]] = []
+
+
+def cors_options(service: FastAPI) -> Dict[str, Any]:
+    """The CORSMiddleware settings a service was built with; none means no cross-origin access."""
+    for middleware in service.user_middleware:
+        if middleware.cls is CORSMiddleware:
+            return dict(middleware.kwargs)
+    return {}
+
+
+class ServiceCORS:
+    """
+    Gives each root route the CORS policy of the service it came from, so
+    foundry stays localhost-only at the root just as it is under /foundry.
+    Mounted services apply their own middleware; the gateway's own endpoints
+    follow `default`'s policy.
+    """
+
+    def __init__(self, app: ASGIApp, default: str = "foundry"):
+        self.app = app
+        self.default = default
+        self.policies = {name: CORSMiddleware(app, **cors_options(service)) for name, service in SERVICES.items()}
+
+    def owner(self, scope: Scope) -> Optional[str]:
+        path = scope["path"]
+        if any(path == f"/{name}" or path.startswith(f"/{name}/") for name in SERVICES):
+            return None
+        for route, name in _root_routes:
+            if route.matches(scope)[0] != Match.NONE:
+                return name
+        return self.default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        name = self.owner(scope) if scope["type"] == "http" else None
+        await (self.policies[name] if name else self.app)(scope, receive, send)
+
+
+app.add_middleware(ServiceCORS)
+
+
+@app.get("/")
+async def root():
+    return {
+        "message": "Campaign Foundry Gateway is running.",
+        "services": {name: f"/{name}" for name in SERVICES},
+        "import_seconds": round(IMPORT_SECONDS, 2),
+    }
+
+@app.get("/gateway_stats")
+async def gateway_stats():
+    """Shared clients and pools, as seen by every mounted service"""
+    return {"llm_clients": client_stats(), "http": http.stats()}
+
+
+def include_root_routes(target: FastAPI, source: FastAPI, name: str):
+    """Re-registers a service's HTTP and websocket routes at the gateway root, first come first served."""
+    taken = {(route.path, tuple(sorted(getattr(route, "methods", None) or []))) for route in target.router.routes}
+    for route in source.router.routes:
+        if not isinstance(route, (APIRoute, APIWebSocketRoute)) or route.path == "/":
+            continue
+        key = (route.path, tuple(sorted(getattr(route, "methods", None) or [])))
+        if key not in taken:
+            target.router.routes.append(route)
+            taken.add(key)
+            _root_routes.append((route, name))
+
+
+for _name, _service in SERVICES.items():
+    include_root_routes(app, _service, _name)
+for _name, _service in SERVICES.items():
+    app.mount(f"/{_name}", _service)
+
+
+# Mounted sub-apps don't get lifespan events; run theirs from the gateway.
+@app.on_event("startup")
+async def start_services():
+    for service in SERVICES.values():
+        for handler in service.router.on_startup:
+            await handler()
+
+@app.on_event("shutdown")
+async def stop_services():
+    for service in SERVICES.values():
+        for handler in service.router.on_shutdown:
+            await handler()
+
+
+if __name__ == "__main__":
+    port = int(os.getenv("GATEWAY_PORT", "8000"))
+    print(f"--- 🚀 Starting Campaign Foundry Gateway on http://localhost:{port} (imports took {IMPORT_SECONDS:.1f}s) ---")
+    uvicorn.run(app, host="0.0.0.0", port=port)
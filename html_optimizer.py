@@ -0,0 +1,147 @@
+import os
+import re
+from typing import Dict, Any, List, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# --- 1. Configuration ---
+PAGE_BUDGET_KB = float(os.getenv("FOUNDRY_PAGE_BUDGET_KB", "60"))
+EAGER_IMAGES = int(os.getenv("FOUNDRY_EAGER_IMAGES", "1")) # images treated as above the fold
+SRCSET_WIDTHS = [480, 800, 1080, 1600]
+UNSPLASH_HOST = "images.unsplash.com"
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$")
+_PRESERVE_RE = re.compile(r"(<(pre|textarea|script)\b.*?</\2>)", re.IGNORECASE | re.DOTALL)
+_STYLE_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.IGNORECASE | re.DOTALL)
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_SRC_RE = re.compile(r"""(?<![\w-])src\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL) # not data-src
+_BETWEEN_TAGS_RE = re.compile(r"(<[^<>]+>)\s+(?=(<[^<>]+>))")
+_TAG_NAME_RE = re.compile(r"^</?\s*(!?[a-zA-Z][\w-]*)")
+# Whitespace next to these never renders, so it can go entirely; between inline
+# elements ("<strong>VPs</strong> <em>of</em>") it is a visible space and is kept.
+BLOCK_TAGS = {
+    "!doctype", "html", "head", "body", "title", "meta", "link", "style", "script", "noscript", "base",
+    "div", "section", "article", "header", "footer", "nav", "main", "aside", "figure", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "dl", "dt", "dd", "blockquote", "pre", "hr",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "caption", "colgroup", "col",
+    "form", "fieldset", "legend", "details", "summary", "address",
+}
+_CSS_URL_RE = re.compile(r"""url\(\s*(["']?)(https?://images\.unsplash\.com/[^"')\s]+)\1\s*\)""", re.IGNORECASE)
+
+
+# --- 2. Individual passes ---
+def strip_markdown_fences(html: str) -> str:
+    """Drops ```html fences and any chatter the LLM put around the document."""
+    html = _FENCE_RE.sub("", html.strip())
+    lowered = html.lower()
+    start = min([i for i in (lowered.find("<!doctype"), lowered.find("<html")) if i != -1], default=0)
+    end = lowered.rfind("</html>")
+    end = end + len("</html>") if end != -1 else len(html)
+    return html[start:end].strip()
+
+
+def unsplash_variant(url: str, width: int) -> str:
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    params.update({"w": str(width), "auto": "format", "fit": "crop", "q": "75"})
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), parts.fragment))
+
+
+def _set_attr(tag: str, name: str, value: str) -> str:
+    if re.search(rf"\b{name}\s*=", tag, re.IGNORECASE):
+        return tag
+    closing = "/>" if tag.rstrip().endswith("/>") else ">"
+    return tag.rstrip()[: -len(closing)].rstrip() + f' {name}="{value}"' + closing
+
+
+def rewrite_images(html: str) -> Tuple[str, Dict[str, int]]:
+    """Adds Unsplash srcset variants and lazy-loads every image after the first EAGER_IMAGES."""
+    stats = {"images": 0, "responsive": 0, "lazy": 0}
+
+    def rewrite(match: re.Match) -> str:
+        tag = match.group(0)
+        index = stats["images"]
+        stats["images"] += 1
+        src = _SRC_RE.search(tag)
+        if src and urlsplit(src.group(2)).netloc == UNSPLASH_HOST and "srcset" not in tag.lower():
+            url = src.group(2).replace("&amp;", "&")
+
+            def variant(width: int) -> str:
+                return unsplash_variant(url, width).replace("&", "&amp;")
+
+            srcset = ", ".join(f"{variant(w)} {w}w" for w in SRCSET_WIDTHS)
+            tag = tag.replace(src.group(0), f'src="{variant(1080)}"', 1)
+            tag = _set_attr(tag, "srcset", srcset)
+            tag = _set_attr(tag, "sizes", "100vw")
+            stats["responsive"] += 1
+        if index < EAGER_IMAGES:
+            tag = _set_attr(tag, "fetchpriority", "high")
+        else:
+            tag = _set_attr(tag, "loading", "lazy")
+            tag = _set_attr(tag, "decoding", "async")
+            stats["lazy"] += 1
+        return tag
+
+    html = _IMG_RE.sub(rewrite, html)
+    # CSS backgrounds can't take a srcset; at least let Unsplash pick format and size.
+    html = _CSS_URL_RE.sub(lambda m: f"url({m.group(1)}{unsplash_variant(m.group(2), 1600)}{m.group(1)})", html)
+    return html, stats
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Only after a colon: before one it may be a descendant selector (".a :hover").
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def _tag_name(tag: str) -> str:
+    match = _TAG_NAME_RE.match(tag)
+    return match.group(1).lower() if match else ""
+
+def _join_tags(match: re.Match) -> str:
+    if _tag_name(match.group(1)) in BLOCK_TAGS or _tag_name(match.group(2)) in BLOCK_TAGS:
+        return match.group(1)
+    return match.group(1) + " "
+
+
+def minify_html(html: str) -> str:
+    """Whitespace/comment minification that leaves <pre>, <textarea> and <script> bodies intact."""
+    preserved: List[str] = []
+
+    def stash(match: re.Match) -> str:
+        preserved.append(match.group(1))
+        return f"\x00{len(preserved) - 1}\x00"
+
+    html = _PRESERVE_RE.sub(stash, html)
+    html = _STYLE_RE.sub(lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), html)
+    html = re.sub(r"<!--(?!\[if).*?-->", "", html, flags=re.DOTALL)
+    html = _BETWEEN_TAGS_RE.sub(_join_tags, html)
+    html = re.sub(r"\s{2,}", " ", html)
+    return re.sub(r"\x00(\d+)\x00", lambda m: preserved[int(m.group(1))], html).strip()
+
+
+# --- 3. Pipeline ---
+def optimize_landing_page(html: str, budget_kb: float = PAGE_BUDGET_KB) -> Tuple[str, Dict[str, Any]]:
+    """
+    Runs every pass over LLM-generated landing page HTML and returns the optimized
+    page together with a weight report against the page budget.
+    """
+    original_bytes = len(html.encode("utf-8"))
+    html = strip_markdown_fences(html)
+    html, image_stats = rewrite_images(html)
+    html = minify_html(html)
+    final_bytes = len(html.encode("utf-8"))
+    report = {
+        "original_bytes": original_bytes,
+        "optimized_bytes": final_bytes,
+        "budget_bytes": int(budget_kb * 1024),
+        "over_budget": final_bytes > budget_kb * 1024,
+        **image_stats,
+    }
+    if report["over_budget"]:
+        print(f"--- ⚠️ Landing page is {final_bytes / 1024:.1f} KB, over the {budget_kb:.0f} KB budget ---")
+    else:
+        print(f"--- 🪶 Landing page optimized: {original_bytes / 1024:.1f} KB -> {final_bytes / 1024:.1f} KB ---")
+    return html, report
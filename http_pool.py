@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import threading
+import requests
+from collections import deque
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+# --- 1. Configuration ---
+# Per-host concurrency caps; override with FOUNDRY_HOST_LIMITS, e.g. '{"api.unsplash.com": 4}'.
+DEFAULT_HOST_LIMIT = int(os.getenv("FOUNDRY_HOST_CONCURRENCY", "8"))
+HOST_WAIT_TIMEOUT = float(os.getenv("FOUNDRY_HOST_WAIT_TIMEOUT", "10")) # seconds to wait for a host slot
+POOL_MAXSIZE = int(os.getenv("FOUNDRY_HTTP_POOL_SIZE", "32")) # keep-alive connections kept per host
+BREAKER_FAILURES = int(os.getenv("FOUNDRY_BREAKER_FAILURES", "5")) # consecutive failures that open a breaker
+BREAKER_COOLDOWN = float(os.getenv("FOUNDRY_BREAKER_COOLDOWN", "30")) # seconds before a half-open probe
+STATS_WINDOW = 200
+
+def load_host_limits() -> Dict[str, int]:
+    overrides = os.getenv("FOUNDRY_HOST_LIMITS")
+    if not overrides:
+        return {}
+    try:
+        return {host: int(limit) for host, limit in json.loads(overrides).items()}
+    except Exception as e:
+        print(f"--- ⚠️ Could not parse FOUNDRY_HOST_LIMITS, using defaults: {e} ---")
+        return {}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """The host's breaker is open; raised before any connection is attempted."""
+
+
+class HostBusyError(requests.ConnectionError):
+    """No concurrency slot for the host became free within HOST_WAIT_TIMEOUT."""
+
+
+# --- 2. Per-host state ---
+class HostState:
+    """Concurrency slot, circuit breaker and rolling latency stats for one host."""
+
+    def __init__(self, host: str, limit: int):
+        self.host = host
+        self.limit = limit
+        self.slots = threading.BoundedSemaphore(limit)
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Closed: always. Open: never. Half-open: one probe at a time."""
+        with self._lock:
+            state = self.state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def acquire(self) -> bool:
+        if not self.slots.acquire(timeout=HOST_WAIT_TIMEOUT):
+            with self._lock:
+                self.probing = False # saturation says nothing about upstream health
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def end_probe(self):
+        """For a request that ended without an outcome to record; lets the next probe through."""
+        with self._lock:
+            self.probing = False
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            self.probing = False
+            self.latencies.append(latency)
+            if ok:
+                self.consecutive_failures = 0
+                if self.opened_at is not None:
+                    print(f"--- ✅ Circuit closed for {self.host} ---")
+                self.opened_at = None
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= BREAKER_FAILURES:
+                if self.opened_at is None:
+                    print(f"--- 🔌 Circuit opened for {self.host} after {self.consecutive_failures} failures ---")
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self.latencies)
+            snapshot = {
+                "state": self.state(),
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+        if ordered:
+            snapshot["p50_ms"] = round(ordered[len(ordered) // 2] * 1000)
+            snapshot["p95_ms"] = round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000)
+        return snapshot
+
+
+# --- 3. The shared session ---
+class PooledSession(requests.Session):
+    """
+    A requests.Session that every outbound call shares: keep-alive connections
+    are pooled per host, each host has a concurrency cap, and a host that keeps
+    failing (connection errors, timeouts, 5xx, 429) is short-circuited with
+    CircuitOpenError so callers fall straight through to their fallback instead
+    of waiting out the full timeout. Because it is a Session, it can be handed
+    to libraries that accept one (e.g. WebBaseLoader).
+    """
+
+    def __init__(self, host_limits: Optional[Dict[str, int]] = None):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=POOL_MAXSIZE)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.host_limits = host_limits if host_limits is not None else load_host_limits()
+        self.hosts: Dict[str, HostState] = {}
+        self._hosts_lock = threading.Lock()
+
+    def host_state(self, host: str) -> HostState:
+        with self._hosts_lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(host, self.host_limits.get(host, DEFAULT_HOST_LIMIT))
+            return self.hosts[host]
+
+    def request(self, method, url, *args, **kwargs):
+        host = self.host_state(urlsplit(url).netloc)
+        if not host.allow():
+            raise CircuitOpenError(f"Circuit open for {host.host}, failing fast")
+        if not host.acquire():
+            raise HostBusyError(f"{host.host} is at its concurrency limit ({host.limit})")
+        started = time.perf_counter()
+        ok = None
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            ok = response.status_code < 500 and response.status_code != 429
+            return response
+        except requests.RequestException:
+            ok = False
+            raise
+        finally:
+            host.release()
+            if ok is None:
+                host.end_probe() # e.g. a bad argument: says nothing about upstream health
+            else:
+                host.record(time.perf_counter() - started, ok=ok)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._hosts_lock:
+            hosts = dict(self.hosts)
+        return {name: state.snapshot() for name, state in sorted(hosts.items())}
+
+
+# One pool per process, shared by every module that talks HTTP.
+http = PooledSession()
@@ -0,0 +1,143 @@
+import os
+import socket
+import threading
+import httpx
+import httpcore
+from typing import Dict, List, Any, Optional, Tuple
+from langchain_groq import ChatGroq
+
+# --- Shared Groq chat clients ---
+# Every ChatGroq built through chat_model() reuses one sync and one async httpx
+# client, so all models, temperatures and timeouts share a single keep-alive
+# pool per process. Identical (model, temperature, timeout, retries) requests
+# return the same ChatGroq instance. Run separately, each server gets its own;
+# under gateway.py all three share them.
+GROQ_MAX_CONNECTIONS = int(os.getenv("FOUNDRY_GROQ_MAX_CONNECTIONS", "64"))
+
+_limits = httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_CONNECTIONS // 2)
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+_models: Dict[Any, ChatGroq] = {}
+_abortable_clients: List["AbortableHttpClient"] = [] # idle, still holding their keep-alive connection
+_lock = threading.Lock()
+
+
+def _shared_http_clients():
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_limits)
+        _http_async_client = httpx.AsyncClient(limits=_limits)
+    return _http_client, _http_async_client
+
+
+def chat_model(model: str, temperature: float = 0, timeout: Optional[float] = None, max_retries: int = 2) -> ChatGroq:
+    key = (model, temperature, timeout, max_retries)
+    with _lock:
+        if key not in _models:
+            http_client, http_async_client = _shared_http_clients()
+            _models[key] = ChatGroq(
+                model_name=model,
+                temperature=temperature,
+                timeout=timeout,
+                max_retries=max_retries,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        return _models[key]
+
+
+# --- Abortable clients for hedged calls ---
+# The loser of a hedge has to give its connection back now, including while it is
+# still waiting for its first byte. Closing an httpx client doesn't interrupt a
+# thread blocked reading from it, so each attempt gets a private one-connection
+# client whose socket can be shut down from another thread. Clients that finished
+# normally go back on a free list and keep their keep-alive connection.
+class _TrackedStream(httpcore.NetworkStream):
+    """Passes through to the real stream, re-recording the socket after the TLS upgrade replaces it."""
+
+    def __init__(self, stream: httpcore.NetworkStream, backend: "_TrackingBackend"):
+        self._stream = stream
+        self._backend = backend
+        backend.socket = stream.get_extra_info("socket")
+
+    def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        self._stream.write(buffer, timeout)
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname: Optional[str] = None, timeout: Optional[float] = None) -> httpcore.NetworkStream:
+        return _TrackedStream(self._stream.start_tls(ssl_context, server_hostname, timeout), self._backend)
+
+    def get_extra_info(self, info: str) -> Any:
+        return self._stream.get_extra_info(info)
+
+
+class _TrackingBackend(httpcore.SyncBackend):
+    """Remembers the socket of the last connection it opened."""
+
+    def __init__(self):
+        super().__init__()
+        self.socket: Optional[socket.socket] = None
+
+    def connect_tcp(self, *args, **kwargs) -> httpcore.NetworkStream:
+        return _TrackedStream(super().connect_tcp(*args, **kwargs), self)
+
+
+class AbortableHttpClient:
+    def __init__(self):
+        self.backend = _TrackingBackend()
+        transport = httpx.HTTPTransport()
+        # httpx has no public hook for the network backend.
+        transport._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(), max_connections=1, keepalive_expiry=5.0, network_backend=self.backend,
+        )
+        self.http = httpx.Client(transport=transport)
+
+    def abort(self):
+        """Tears down the in-flight request: the thread blocked on it gets an error right away."""
+        if self.backend.socket is not None:
+            try:
+                # The plain-socket shutdown, also for a TLS socket: it must not touch
+                # the SSL state the blocked reader is using.
+                socket.socket.shutdown(self.backend.socket, socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.http.close()
+
+
+def lease_chat_model(model: str, temperature: float = 0, timeout: Optional[float] = None) -> Tuple[ChatGroq, AbortableHttpClient]:
+    """A ChatGroq on its own connection; hand the client back with release_abortable()."""
+    with _lock:
+        client = _abortable_clients.pop() if _abortable_clients else None
+        _, http_async_client = _shared_http_clients()
+    client = client or AbortableHttpClient()
+    llm = ChatGroq(
+        model_name=model,
+        temperature=temperature,
+        timeout=timeout,
+        max_retries=0,
+        http_client=client.http,
+        http_async_client=http_async_client,
+    )
+    return llm, client
+
+
+def release_abortable(client: AbortableHttpClient, reusable: bool):
+    with _lock:
+        if reusable and len(_abortable_clients) < GROQ_MAX_CONNECTIONS // 2:
+            _abortable_clients.append(client)
+            return
+    client.http.close()
+
+
+def client_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "chat_models": len(_models),
+            "models": sorted({key[0] for key in _models}),
+            "idle_abortable_clients": len(_abortable_clients),
+        }
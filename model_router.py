@@ -0,0 +1,415 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional
+from langchain_groq import ChatGroq
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableLambda
+from run_profiler import span
+from llm_clients import chat_model, lease_chat_model, release_abortable
+
+# --- 1. Per-Agent Model Configuration ---
+# Each node gets its own primary model, request timeout (seconds), p95 latency
+# threshold (seconds) and an ordered list of fallback models. Override any entry
+# with FOUNDRY_MODEL_ROUTES, e.g. '{"web_agent": {"model": "llama-3.1-8b-instant"}}'.
+FAST_MODEL = "llama-3.1-8b-instant"
+STRONG_MODEL = "llama-3.3-70b-versatile"
+
+DEFAULT_MODEL_ROUTES: Dict[str, Dict[str, Any]] = {
+    "planner_agent":  {"model": FAST_MODEL,   "timeout": 15, "p95_threshold": 6,  "fallbacks": [STRONG_MODEL]},
+    "research_agent": {"model": FAST_MODEL,   "timeout": 30, "p95_threshold": 12, "fallbacks": [STRONG_MODEL]},
+    "strategy_agent": {"model": FAST_MODEL,   "timeout": 30, "p95_threshold": 12, "fallbacks": [STRONG_MODEL]},
+    "content_agent":  {"model": FAST_MODEL,   "timeout": 30, "p95_threshold": 12, "fallbacks": [STRONG_MODEL]},
+    "web_agent":      {"model": STRONG_MODEL, "timeout": 90, "p95_threshold": 45, "fallbacks": [FAST_MODEL]},
+    "brd_agent":      {"model": STRONG_MODEL, "timeout": 90, "p95_threshold": 45, "fallbacks": [FAST_MODEL]},
+    "fused_agent":    {"model": STRONG_MODEL, "timeout": 60, "p95_threshold": 25, "fallbacks": [FAST_MODEL]},
+}
+
+ROUTER_WINDOW = int(os.getenv("FOUNDRY_ROUTER_WINDOW", "50"))
+ROUTER_MIN_SAMPLES = int(os.getenv("FOUNDRY_ROUTER_MIN_SAMPLES", "5"))
+ROUTER_ERROR_RATE_THRESHOLD = float(os.getenv("FOUNDRY_ROUTER_ERROR_RATE", "0.3"))
+# A model taken out of rotation gets one probe request after this many seconds;
+# if it answers within its threshold its window is reset and it's back in.
+ROUTER_PROBE_COOLDOWN = float(os.getenv("FOUNDRY_ROUTER_PROBE_COOLDOWN", "30"))
+
+# Hedging: if a call has no first token after the HEDGE_PERCENTILE of the model's
+# recent time-to-first-token, a duplicate is fired and the first answer wins. At most
+# HEDGE_MAX_RATE of calls in the rolling window may be hedged (plus a burst of 1).
+HEDGE_ENABLED = os.getenv("FOUNDRY_HEDGE", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("FOUNDRY_HEDGE_PERCENTILE", "0.9"))
+HEDGE_MAX_RATE = float(os.getenv("FOUNDRY_HEDGE_MAX_RATE", "0.1"))
+HEDGE_NODES = {n.strip() for n in os.getenv("FOUNDRY_HEDGE_NODES", "").split(",") if n.strip()} # empty = every node
+
+
+def load_model_routes() -> Dict[str, Dict[str, Any]]:
+    """Returns the default routes merged with any FOUNDRY_MODEL_ROUTES overrides."""
+    routes = {node: dict(cfg) for node, cfg in DEFAULT_MODEL_ROUTES.items()}
+    overrides = os.getenv("FOUNDRY_MODEL_ROUTES")
+    if overrides:
+        try:
+            for node, cfg in json.loads(overrides).items():
+                routes.setdefault(node, {"model": FAST_MODEL, "timeout": 30, "p95_threshold": 12, "fallbacks": []})
+                routes[node].update(cfg)
+        except Exception as e:
+            print(f"--- ⚠️ Could not parse FOUNDRY_MODEL_ROUTES, using defaults: {e} ---")
+    return routes
+
+
+# --- 2. Rolling Health Stats ---
+class ModelStats:
+    """Rolling window of latencies and error flags for a single model."""
+
+    def __init__(self, window: int = ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.first_token = deque(maxlen=window)
+        self.tripped_at: Optional[float] = None # when the router stopped sending it traffic
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float, error: bool):
+        with self._lock:
+            self.errors.append(error)
+            if not error:
+                self.latencies.append(latency_s)
+
+    def record_first_token(self, latency_s: float):
+        with self._lock:
+            self.first_token.append(latency_s)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def first_token_percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self.first_token) < ROUTER_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.first_token)
+        return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+    # --- Half-open probing ---
+    def trip(self):
+        with self._lock:
+            if self.tripped_at is None:
+                self.tripped_at = time.monotonic()
+
+    def untrip(self):
+        with self._lock:
+            self.tripped_at = None
+
+    def try_probe(self, cooldown: float) -> bool:
+        """True for exactly one caller once the model has been out of rotation for `cooldown` seconds."""
+        with self._lock:
+            if self.probing or self.tripped_at is None or time.monotonic() - self.tripped_at < cooldown:
+                return False
+            self.probing = True
+            return True
+
+    def finish_probe(self, healthy: Optional[bool]):
+        """healthy=None releases a probe that was never sent."""
+        with self._lock:
+            self.probing = False
+            if healthy is None:
+                return
+            if healthy:
+                # The old samples describe the outage, not the model as it is now.
+                self.latencies.clear()
+                self.errors.clear()
+                self.tripped_at = None
+            else:
+                self.tripped_at = time.monotonic()
+
+    def state(self) -> str:
+        with self._lock:
+            if self.tripped_at is None:
+                return "closed"
+            return "half_open" if self.probing else "open"
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.errors:
+                return 0.0
+            return sum(self.errors) / len(self.errors)
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self.errors)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "samples": self.samples(),
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "state": self.state(),
+        }
+
+
+# --- 3. Hedged Calls ---
+class HedgeCancelled(Exception):
+    """Raised inside the losing attempt once the other one has answered."""
+
+
+class _Attempt:
+    """One streamed call on its own connection, so the losing attempt can be torn down mid-request."""
+
+    def __init__(self, model: str, temperature: float, timeout: float):
+        self.llm, self.connection = lease_chat_model(model, temperature=temperature, timeout=timeout)
+        self.first_token = threading.Event()
+        self.cancelled = False
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self._finished:
+                return
+            self.cancelled = True
+        self.connection.abort()
+
+    def finish(self):
+        with self._lock:
+            self._finished = True
+            reusable = not self.cancelled
+        release_abortable(self.connection, reusable)
+
+
+class Hedger:
+    """
+    Runs a call as a stream so time-to-first-token is observable, fires one
+    duplicate when the first token is late, and returns whichever attempt
+    finishes first. The loser's connection is shut down on the spot, even if it
+    is still waiting for its first byte.
+    """
+
+    def __init__(self, window: int = ROUTER_WINDOW * 4):
+        self.pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        self.recent = deque(maxlen=window) # one slot per call; slot["hedged"] once it was hedged
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "rate_limited": 0, "no_baseline": 0}
+        self._lock = threading.Lock()
+
+    def _claim_hedge(self, slot: Dict[str, bool]) -> bool:
+        with self._lock:
+            hedged = sum(s["hedged"] for s in self.recent)
+            if hedged + 1 > HEDGE_MAX_RATE * len(self.recent) + 1:
+                self.stats["rate_limited"] += 1
+                return False
+            slot["hedged"] = True
+            self.stats["hedged"] += 1
+            return True
+
+    @staticmethod
+    def _stream(attempt: _Attempt, prompt_value: Any, stats: ModelStats):
+        started = time.perf_counter()
+        message = None
+        try:
+            for chunk in attempt.llm.stream(prompt_value):
+                if message is None:
+                    stats.record_first_token(time.perf_counter() - started)
+                    attempt.first_token.set()
+                    message = chunk
+                else:
+                    message = message + chunk
+                if attempt.cancelled:
+                    raise HedgeCancelled()
+        finally:
+            attempt.finish()
+        return message if message is not None else AIMessageChunk(content="")
+
+    def invoke(self, model: str, temperature: float, timeout: float, prompt_value: Any, stats: ModelStats, decision: Dict[str, Any]) -> Any:
+        slot = {"hedged": False}
+        with self._lock:
+            self.stats["calls"] += 1
+            self.recent.append(slot)
+        threshold = stats.first_token_percentile(HEDGE_PERCENTILE)
+        primary = _Attempt(model, temperature, timeout)
+        primary_future = self.pool.submit(self._stream, primary, prompt_value, stats)
+        if threshold is None:
+            with self._lock:
+                self.stats["no_baseline"] += 1
+            return primary_future.result()
+        if primary.first_token.wait(threshold) or primary_future.done() or not self._claim_hedge(slot):
+            return primary_future.result()
+
+        decision["hedged"] = True
+        decision["hedge_after_ms"] = round(threshold * 1000)
+        hedge = _Attempt(model, temperature, timeout)
+        hedge_future = self.pool.submit(self._stream, hedge, prompt_value, stats)
+        attempts = {primary_future: primary, hedge_future: hedge}
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for other in pending:
+                    attempts[other].cancel()
+                winner = "hedge" if future is hedge_future else "primary"
+                decision["hedge_winner"] = winner
+                with self._lock:
+                    self.stats[f"{winner}_wins"] += 1
+                return future.result()
+        raise error
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["enabled"] = HEDGE_ENABLED
+        stats["hedge_rate"] = round(stats["hedged"] / stats["calls"], 3) if stats["calls"] else 0.0
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else None
+        return stats
+
+
+# --- 4. The Router ---
+_routing_log: contextvars.ContextVar = contextvars.ContextVar("routing_log", default=None)
+
+
+class ModelRouter:
+    """
+    Routes each agent's LLM call to its configured model, moving traffic to the
+    next fallback while the primary's rolling p95 or error rate is over threshold.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None, temperature: float = 0):
+        self.routes = routes or load_model_routes()
+        self.temperature = temperature
+        self.stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self.hedger = Hedger()
+
+    def _stats_for(self, model: str) -> ModelStats:
+        with self._lock:
+            if model not in self.stats:
+                self.stats[model] = ModelStats()
+            return self.stats[model]
+
+    def client(self, model: str, timeout: float) -> ChatGroq:
+        # Retries are the router's job (fallbacks / hedges), not the client's.
+        return chat_model(model, temperature=self.temperature, timeout=timeout, max_retries=0)
+
+    def _unhealthy_reason(self, model: str, p95_threshold: float) -> Optional[str]:
+        stats = self._stats_for(model)
+        if stats.samples() < ROUTER_MIN_SAMPLES:
+            return None
+        if stats.error_rate() > ROUTER_ERROR_RATE_THRESHOLD:
+            return f"error_rate {stats.error_rate():.2f} > {ROUTER_ERROR_RATE_THRESHOLD}"
+        p95 = stats.p95()
+        if p95 is not None and p95 > p95_threshold:
+            return f"p95 {p95:.1f}s > {p95_threshold}s"
+        return None
+
+    def plan(self, node: str) -> Dict[str, Any]:
+        """Returns the ordered list of models to try for a node and why."""
+        route = self.routes[node]
+        candidates = [route["model"]] + [m for m in route.get("fallbacks", []) if m != route["model"]]
+        skipped = {}
+        healthy = []
+        probe = None
+        for model in candidates:
+            stats = self._stats_for(model)
+            reason = self._unhealthy_reason(model, route["p95_threshold"])
+            if not reason:
+                stats.untrip()
+                healthy.append(model)
+                continue
+            stats.trip()
+            if probe is None and stats.try_probe(ROUTER_PROBE_COOLDOWN):
+                # Half-open: this request goes to the model to see whether it has recovered.
+                probe = model
+                healthy.append(model)
+            else:
+                skipped[model] = reason
+        # If every model is over threshold, keep the configured order rather than refusing.
+        order = healthy + [m for m in candidates if m not in healthy]
+        return {"order": order, "skipped": skipped, "probe": probe}
+
+    def invoke(self, node: str, prompt_value: Any) -> Any:
+        route = self.routes[node]
+        plan = self.plan(node)
+        attempts: List[Dict[str, Any]] = []
+        last_error = None
+        probe_outcome = None
+        try:
+            for model in plan["order"]:
+                started = time.perf_counter()
+                attempt: Dict[str, Any] = {"model": model}
+                if model == plan["probe"]:
+                    attempt["probe"] = True
+                try:
+                    with span(f"llm:{model}", "llm"):
+                        if self.hedges(node):
+                            result = self.hedger.invoke(model, self.temperature, route["timeout"], prompt_value, self._stats_for(model), attempt)
+                        else:
+                            result = self.client(model, route["timeout"]).invoke(prompt_value)
+                except Exception as e:
+                    latency = time.perf_counter() - started
+                    self._stats_for(model).record(latency, error=True)
+                    attempts.append({**attempt, "error": str(e)[:200], "latency_ms": round(latency * 1000)})
+                    print(f"--- ⚠️ Router: {model} failed for {node} ({e}), trying next fallback ---")
+                    if model == plan["probe"]:
+                        probe_outcome = False
+                    last_error = e
+                    continue
+                latency = time.perf_counter() - started
+                self._stats_for(model).record(latency, error=False)
+                attempts.append({**attempt, "latency_ms": round(latency * 1000)})
+                if model == plan["probe"]:
+                    probe_outcome = latency <= route["p95_threshold"]
+                    print(f"--- 🩺 Router: probe of {model} for {node} {'succeeded, back in rotation' if probe_outcome else 'too slow, staying out'} ---")
+                if attempt.get("hedged"):
+                    print(f"--- 🏇 Router: {node} hedged after {attempt['hedge_after_ms']}ms, {attempt.get('hedge_winner')} answered first ---")
+                self._log(node, route, plan, attempts, model)
+                return result
+            self._log(node, route, plan, attempts, None)
+            raise last_error
+        finally:
+            if plan["probe"] is not None:
+                self._stats_for(plan["probe"]).finish_probe(probe_outcome)
+
+    def hedges(self, node: str) -> bool:
+        return HEDGE_ENABLED and (not HEDGE_NODES or node in HEDGE_NODES)
+
+    def _log(self, node: str, route: Dict[str, Any], plan: Dict[str, Any], attempts: List[Dict[str, Any]], model: Optional[str]):
+        decision = {
+            "node": node,
+            "primary": route["model"],
+            "model": model,
+            "fallback": model is not None and model != route["model"],
+            "skipped": plan["skipped"],
+            "attempts": attempts,
+        }
+        if decision["fallback"]:
+            print(f"--- 🔀 Router: {node} served by fallback {model} (primary {route['model']}) ---")
+        log = _routing_log.get()
+        if log is not None:
+            log.append(decision)
+
+    def for_node(self, node: str) -> RunnableLambda:
+        """A drop-in replacement for `llm` inside an LCEL chain."""
+        return RunnableLambda(lambda prompt_value: self.invoke(node, prompt_value), name=f"routed_llm[{node}]")
+
+    @contextmanager
+    def track(self):
+        """Collects the routing decisions made by chain calls inside the block."""
+        log: List[Dict[str, Any]] = []
+        token = _routing_log.set(log)
+        try:
+            yield log
+        finally:
+            _routing_log.reset(token)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            models = list(self.stats.keys())
+        return {model: self._stats_for(model).snapshot() for model in models}
@@ -3,23 +3,32 @@ import uvicorn
 import asyncio
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain_community.document_loaders import WebBaseLoader
-from langchain_groq import ChatGroq
+from langchain_community.document_loaders.web_base import default_header_template
+from llm_clients import chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- 1. Load Environment Variables ---
+# Before the local modules below: they read their FOUNDRY_* settings at import time.
 load_dotenv()
+
+from prompt_budget import trim_by_relevance, render_within_budget
+import cassette
+from http_pool import http
+from site_crawler import crawl_product_site
+
+cassette.install()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("❌ GROQ_API_KEY missing. Please set it in your .env file.")
 
 # --- 2. FastAPI App & LLM Setup ---
 app = FastAPI(title="Dynamic Prompt Generator API")
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.4)
+llm = chat_model("llama-3.1-8b-instant", temperature=0.4)
 
 # --- 3. Add CORS Middleware ---
 app.add_middleware(
@@ -32,11 +41,9 @@ app.add_middleware(
 
 # --- 4. The "Meta-Prompt" (A prompt that generates a prompt) ---
 # This is the core logic.
-async def create_system_prompt(product_name: str, product_url: str) -> str:
-    print(f"Generating system prompt for {product_name}...")
-    
-    # --- A. Scrape the website ---
-    loader = WebBaseLoader(product_url)
+async def scrape_single_page(product_name: str, product_url: str) -> str:
+    # Scrape through the shared pool so a dead site fails fast once its breaker opens
+    loader = WebBaseLoader(product_url, session=http, requests_kwargs={"headers": default_header_template, "timeout": 20})
     try:
         # Run the synchronous .load() in a separate thread
         docs = await asyncio.to_thread(loader.load)
@@ -48,7 +55,32 @@ async def create_system_prompt(product_name: str, product_url: str) -> str:
         print("Failed to load content.")
         raise HTTPException(status_code=404, detail="Could not load any content from the URL.")
         
-    content = "\n\n".join(d.page_content for d in docs)[:15000]
+    # Keep the lines most relevant to the product (minus repeated nav/footer text) within 15,000 characters
+    return trim_by_relevance("\n\n".join(d.page_content for d in docs), product_name, max_chars=15000)
+
+async def scrape_product_site(product_name: str, product_url: str, max_depth: Optional[int], max_pages: Optional[int]) -> str:
+    # Follow same-site links (pricing, features, FAQ...) concurrently within the crawl time budget,
+    # then rank the surviving paragraphs into the same 15,000 character budget
+    try:
+        content, _report = await crawl_product_site(product_url, product_name, max_chars=15000, max_depth=max_depth, max_pages=max_pages)
+    except Exception as e:
+        print(f"Error crawling {product_url}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to crawl URL: {e}")
+
+    if not content:
+        print("Failed to load content.")
+        raise HTTPException(status_code=404, detail="Could not load any content from the URL.")
+    return content
+
+async def create_system_prompt(product_name: str, product_url: str, crawl: bool = False,
+                               max_depth: Optional[int] = None, max_pages: Optional[int] = None) -> str:
+    print(f"Generating system prompt for {product_name}...")
+    
+    # --- A. Scrape the website (or crawl the product site) ---
+    if crawl:
+        content = await scrape_product_site(product_name, product_url, max_depth, max_pages)
+    else:
+        content = await scrape_single_page(product_name, product_url)
     
     # --- B. Generate the new system prompt using the content ---
     prompt_template = ChatPromptTemplate.from_messages([
@@ -75,13 +107,14 @@ async def create_system_prompt(product_name: str, product_url: str) -> str:
             """
         ),
     ])
-    chain = prompt_template | llm | StrOutputParser()
+    chain = llm | StrOutputParser()
 
     try:
-        system_prompt = await chain.ainvoke({
+        prompt_value = render_within_budget("prompt_generator", prompt_template, {
             "product_name": product_name,
             "content": content
-        })
+        }, query_field="product_name", keep=("content",)) # already ranked into 15,000 characters by the scraper/crawler
+        system_prompt = await chain.ainvoke(prompt_value)
         print(f"Generated system prompt: {system_prompt}")
         return system_prompt
     except Exception as e:
@@ -92,6 +125,9 @@ async def create_system_prompt(product_name: str, product_url: str) -> str:
 class PromptRequest(BaseModel):
     product_name: str
     product_url: str
+    crawl: bool = False # Also read same-site pages (pricing, features, FAQ) linked from product_url
+    max_depth: Optional[int] = None # Crawl depth; defaults to FOUNDRY_CRAWL_DEPTH
+    max_pages: Optional[int] = None # Crawl page cap; defaults to FOUNDRY_CRAWL_MAX_PAGES
 
 class PromptResponse(BaseModel):
     system_prompt: str
@@ -102,7 +138,10 @@ async def handle_generate_prompt(req: PromptRequest):
     print(f"Received API request for {req.product_name}")
     prompt_text = await create_system_prompt(
         product_name=req.product_name,
-        product_url=req.product_url
+        product_url=req.product_url,
+        crawl=req.crawl,
+        max_depth=req.max_depth,
+        max_pages=req.max_pages
     )
     return PromptResponse(system_prompt=prompt_text)
 
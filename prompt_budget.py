@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Any, List, Optional, Iterable
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableLambda
+
+# --- 1. Token Counting ---
+# Groq's Llama tokenizers average roughly one token per ~4 characters of English,
+# with punctuation and JSON syntax costing a token each. A word/punctuation count
+# tracks that closely enough to budget prompts without pulling in a tokenizer.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    pieces = _TOKEN_RE.findall(text or "")
+    return sum(max(1, (len(p) + 3) // 4) for p in pieces)
+
+
+# --- 2. Per-chain Budgets ---
+DEFAULT_PROMPT_BUDGETS = {
+    "planner_agent": 1500,
+    "research_agent": 2500,
+    "strategy_agent": 800,
+    "content_agent": 2000,
+    "web_agent": 2500,
+    "brd_agent": 2000,
+    "fused_agent": 3500,
+    "prompt_generator": 4500,
+}
+
+def load_prompt_budgets() -> Dict[str, int]:
+    budgets = dict(DEFAULT_PROMPT_BUDGETS)
+    overrides = os.getenv("FOUNDRY_PROMPT_BUDGETS")
+    if overrides:
+        try:
+            budgets.update({k: int(v) for k, v in json.loads(overrides).items()})
+        except Exception as e:
+            print(f"--- ⚠️ Could not parse FOUNDRY_PROMPT_BUDGETS, using defaults: {e} ---")
+    return budgets
+
+PROMPT_BUDGETS = load_prompt_budgets()
+
+
+# --- 3. Input Compaction ---
+# Keys that only add bulk when search results are pasted into a prompt.
+DROP_KEYS = {"raw_content", "score", "images", "response_time", "follow_up_questions", "request_id"}
+
+def _strip(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in DROP_KEYS and v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_strip(v) for v in value]
+    return value
+
+def compact_value(value: Any) -> Any:
+    """Serializes dicts / lists / models as minimal JSON instead of Python reprs."""
+    if value is None:
+        return "n/a"
+    if isinstance(value, (dict, list, tuple, BaseModel)):
+        return json.dumps(_strip(value), separators=(",", ":"), ensure_ascii=False, default=str)
+    if isinstance(value, str):
+        return re.sub(r"[ \t]+", " ", re.sub(r"\n{3,}", "\n\n", value)).strip()
+    return value
+
+def trim_by_relevance(text: str, query: str, max_tokens: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Keeps the lines of `text` that share the most terms with `query` (and drops
+    repeated boilerplate lines) until `max_tokens` / `max_chars` is reached,
+    in original order.
+    """
+    max_tokens = max_tokens if max_tokens is not None else float("inf")
+    max_chars = max_chars if max_chars is not None else float("inf")
+    if count_tokens(text) <= max_tokens and len(text) <= max_chars:
+        return text
+    terms = set(re.findall(r"[a-z0-9]{3,}", (query or "").lower()))
+    segments = []
+    for line in text.splitlines():
+        # Long single-line blobs (scraped paragraphs) are ranked sentence by sentence.
+        segments.extend(re.split(r"(?<=[.!?])\s+", line) if len(line) > 300 else [line])
+    seen = set()
+    scored = []
+    for position, line in enumerate(s.strip() for s in segments):
+        key = line.lower()
+        if not line or key in seen:
+            continue
+        seen.add(key)
+        words = re.findall(r"[a-z0-9]{3,}", key)
+        hits = sum(1 for w in words if w in terms)
+        # Prefer on-topic lines, then substantive ones over nav fragments.
+        scored.append((hits, min(len(words), 40), position, line))
+    ranked = sorted(scored, key=lambda s: (-s[0], -s[1], s[2]))
+    kept, used, chars = [], 0, 0
+    for hits, _, position, line in ranked:
+        cost = count_tokens(line)
+        if used + cost > max_tokens or chars + len(line) + 1 > max_chars:
+            continue
+        kept.append((position, line))
+        used += cost
+        chars += len(line) + 1
+    if not kept and ranked:
+        # Not even one line fits: keep the start of the best one rather than nothing.
+        return _truncate(ranked[0][3], max_tokens, max_chars)
+    return "\n".join(line for _, line in sorted(kept))
+
+def _truncate(line: str, max_tokens: float, max_chars: float) -> str:
+    words, used, chars = [], 0, 0
+    for word in line.split():
+        cost = count_tokens(word)
+        if used + cost > max_tokens or chars + len(word) + 1 > max_chars:
+            break
+        words.append(word)
+        used += cost
+        chars += len(word) + 1
+    return " ".join(words)
+
+
+# --- 4. Budgeted Prompt Rendering ---
+prompt_token_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+def _record(name: str, before: int, after: int):
+    with _stats_lock:
+        stats = prompt_token_stats.setdefault(name, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        stats["calls"] += 1
+        stats["tokens_before"] += before
+        stats["tokens_after"] += after
+
+def render_within_budget(name: str, prompt, inputs: Dict[str, Any], query_field: Optional[str] = None, budget: Optional[int] = None, keep: Iterable[str] = ()):
+    """
+    Renders `prompt` with compacted inputs, trimming the largest text inputs by
+    relevance to `inputs[query_field]` until the prompt fits the chain's budget.
+    Inputs named in `keep` are never trimmed (e.g. text already ranked to size).
+    Sizes are counted per input, so the full prompt is rendered only once.
+    Logs the token count of the raw and the compacted prompt.
+    """
+    budget = budget or PROMPT_BUDGETS.get(name, 4000)
+    variables = [k for k in prompt.input_variables if k in inputs]
+    fixed = count_tokens(prompt.invoke({k: "" for k in prompt.input_variables}).to_string())
+    compacted = {k: compact_value(v) if k in variables else v for k, v in inputs.items()}
+    field_tokens = {k: count_tokens(str(compacted[k])) for k in variables}
+    before = fixed + sum(count_tokens(str(inputs[k])) for k in variables)
+    after = fixed + sum(field_tokens.values())
+
+    query = str(inputs.get(query_field) or "") if query_field else ""
+    trimmable: List[str] = sorted(
+        (k for k in variables if k not in keep and isinstance(compacted[k], str)),
+        key=lambda k: field_tokens[k],
+        reverse=True,
+    )
+    for field in trimmable:
+        overflow = after - budget
+        if overflow <= 0:
+            break
+        if field_tokens[field] < 100:
+            break
+        compacted[field] = trim_by_relevance(compacted[field], query, max(50, field_tokens[field] - overflow))
+        trimmed = count_tokens(compacted[field])
+        after -= field_tokens[field] - trimmed
+        field_tokens[field] = trimmed
+
+    prompt_value = prompt.invoke(compacted)
+    after = count_tokens(prompt_value.to_string())
+
+    _record(name, before, after)
+    flag = " (OVER BUDGET)" if after > budget else ""
+    print(f"--- 🧮 {name} prompt: {before} -> {after} tokens (budget {budget}){flag} ---")
+    return prompt_value
+
+def budgeted(name: str, prompt, query_field: Optional[str] = None) -> RunnableLambda:
+    """A drop-in replacement for `prompt` at the head of an LCEL chain."""
+    return RunnableLambda(lambda inputs: render_within_budget(name, prompt, inputs, query_field), name=f"budgeted_prompt[{name}]")
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, Any, Optional
+
+# --- 1. Configuration ---
+RESEARCH_REUSE = os.getenv("FOUNDRY_RESEARCH_REUSE", "0").lower() in ("1", "true", "yes")
+RESEARCH_REUSE_THRESHOLD = float(os.getenv("FOUNDRY_RESEARCH_REUSE_THRESHOLD", "0.85"))
+# Results older than this are never reused (0 = no expiry).
+RESEARCH_REUSE_TTL = float(os.getenv("FOUNDRY_RESEARCH_REUSE_TTL_S", str(7 * 24 * 3600)))
+RESEARCH_INDEX_PATH = os.getenv("FOUNDRY_RESEARCH_INDEX", os.path.join("campaign_outputs", "research_index.db"))
+RESEARCH_INDEX_SIZE = int(os.getenv("FOUNDRY_RESEARCH_INDEX_SIZE", "2000"))
+EMBEDDING_DIM = 512
+
+_STOPWORDS = {"the", "of", "and", "a", "an", "for", "in", "to", "at", "on", "our", "with"}
+
+
+# --- 2. Hashed n-gram embeddings ---
+def _normalize_words(text: str) -> list:
+    words = [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in _STOPWORDS]
+    # Crude plural folding so "VPs" and "VP", "managers" and "manager" land together.
+    return sorted(w[:-1] if len(w) > 2 and w.endswith("s") and not w.endswith(("ss", "us", "is")) else w for w in words)
+
+def embed(text: str) -> np.ndarray:
+    """
+    Bag of word unigrams and character trigrams, hashed into EMBEDDING_DIM signed
+    buckets and L2-normalized. Word order is ignored, so "VPs of Engineering" and
+    "Engineering VPs" embed identically; small spelling variants share trigrams.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in _normalize_words(text):
+        features = [f"w:{word}"] + [f"c:{g}" for g in (f"<{word}>"[i:i + 3] for i in range(len(word)))]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % EMBEDDING_DIM] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# --- 3. The index ---
+class ResearchIndex:
+    """
+    Past ResearchOutput results keyed by (topic, target_audience). Embeddings live
+    in two fixed-size matrices searched with one matrix-vector product each; the
+    results are persisted in SQLite so the index survives restarts. Once full,
+    the oldest entry is overwritten.
+    """
+
+    def __init__(self, path: str = RESEARCH_INDEX_PATH, capacity: int = RESEARCH_INDEX_SIZE, ttl: float = RESEARCH_REUSE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.topics = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.audiences = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.entries: list = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stored": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS research (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                target_audience TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT id, topic, target_audience, output, created_at FROM research ORDER BY id DESC LIMIT ?", (self.capacity,)
+        ).fetchall()
+        for row_id, topic, audience, output, created_at in reversed(rows):
+            self._insert(row_id, topic, audience, json.loads(output), created_at)
+        if rows:
+            print(f"--- 🗂️ Research index loaded {len(rows)} past results ---")
+
+    def _insert(self, row_id: int, topic: str, audience: str, output: Dict[str, Any], created_at: float):
+        slot = self.next_slot
+        self.topics[slot] = embed(topic)
+        self.audiences[slot] = embed(audience)
+        self.created[slot] = created_at
+        self.entries[slot] = {"id": row_id, "topic": topic, "target_audience": audience, "output": output, "created_at": created_at}
+        self.next_slot = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add(self, topic: Optional[str], target_audience: Optional[str], output: Dict[str, Any]):
+        if not topic or not target_audience:
+            return
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO research (topic, target_audience, output, created_at) VALUES (?, ?, ?, ?)",
+                (topic, target_audience, json.dumps(output), now),
+            )
+            self._conn.execute(
+                "DELETE FROM research WHERE id <= ?", (cursor.lastrowid - self.capacity,)
+            )
+            self._insert(cursor.lastrowid, topic, target_audience, output, now)
+            self.stats["stored"] += 1
+
+    def nearest(self, topic: Optional[str], target_audience: Optional[str], threshold: float = RESEARCH_REUSE_THRESHOLD) -> Optional[Dict[str, Any]]:
+        """
+        Best match younger than the TTL where both the topic and the audience
+        similarity clear the threshold, as {"output", "topic", "target_audience", "topic_score",
+        "audience_score", "score"}; None otherwise.
+        """
+        if not topic or not target_audience:
+            return None
+        topic_vec, audience_vec = embed(topic), embed(target_audience)
+        with self._lock:
+            self.stats["lookups"] += 1
+            if self.size == 0:
+                self.stats["misses"] += 1
+                return None
+            topic_scores = self.topics[: self.size] @ topic_vec
+            audience_scores = self.audiences[: self.size] @ audience_vec
+            scores = np.minimum(topic_scores, audience_scores)
+            if self.ttl:
+                scores = np.where(self.created[: self.size] >= time.time() - self.ttl, scores, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            entry = self.entries[best]
+        return {
+            "output": entry["output"],
+            "topic": entry["topic"],
+            "target_audience": entry["target_audience"],
+            "topic_score": round(float(topic_scores[best]), 3),
+            "audience_score": round(float(audience_scores[best]), 3),
+            "score": round(float(scores[best]), 3),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = self.size
+        stats["enabled"] = RESEARCH_REUSE
+        stats["threshold"] = RESEARCH_REUSE_THRESHOLD
+        stats["ttl_s"] = self.ttl
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else None
+        return stats
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+# --- 1. Configuration ---
+# Wall-clock budget for a whole run, counted from when it starts executing (queue
+# time excluded). 0 disables deadlines: every node waits as long as it needs.
+RUN_SLA_SECONDS = float(os.getenv("FOUNDRY_RUN_SLA_S", "0"))
+
+# Each node gets (time left) * weight / (weights of the nodes still to run), so
+# time a fast node doesn't use rolls over to the ones after it. Every LLM node
+# has a fallback for when its share runs out. ops_agent is exempt: it makes no
+# LLM call, its Slack/Telegram posts are side effects that can't be replaced by
+# a default, and each request is already bounded by its HTTP timeout.
+NODE_WEIGHTS = {
+    "planner_agent": 1.0,
+    "research_agent": 2.0,
+    "strategy_agent": 1.5,
+    "content_agent": 2.0,
+    "design_agent": 1.0,
+    "web_agent": 3.0,
+    "brd_agent": 2.0,
+    "ops_agent": 0.5,
+}
+NODE_WEIGHTS.update(json.loads(os.getenv("FOUNDRY_NODE_SLA_WEIGHTS", "{}")))
+
+# With less than this left in its share a node degrades up front instead of starting the slow path.
+MIN_NODE_SECONDS = {
+    "planner_agent": 1.0,
+    "research_agent": 3.0,
+    "strategy_agent": 2.0,
+    "content_agent": 2.0,
+    "design_agent": 1.0,
+    "web_agent": 5.0,
+    "brd_agent": 5.0,
+}
+
+# Each run gets its own pool for deadline-bounded calls, so calls abandoned at
+# their deadline (threads can't be cancelled) only hold up their own run. One
+# worker per weighted node means a run never queues behind its own abandoned calls.
+RUN_SLA_WORKERS = int(os.getenv("FOUNDRY_RUN_SLA_WORKERS", str(len(NODE_WEIGHTS))))
+
+# The budget of the run executing in the current context. Like the profiler, it
+# reaches the node threads through LangChain's contextvar copy.
+_active_budget: contextvars.ContextVar = contextvars.ContextVar("active_budget", default=None)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class RunBudget:
+    """
+    Deadline bookkeeping for one run: each node's share of the time left, the
+    degradations that fired, and work deferred past the end of the graph.
+    """
+
+    def __init__(self, total_seconds: float, weights: Optional[Dict[str, float]] = None):
+        self.total = total_seconds
+        self.started = time.monotonic()
+        self.pending = dict(weights or NODE_WEIGHTS) # nodes that haven't started yet
+        self.shares: Dict[str, float] = {}
+        self.deadlines: Dict[str, float] = {}
+        self.used: Dict[str, float] = {}
+        self.degradations: Dict[str, List[Dict[str, Any]]] = {}
+        self.deferred: Dict[str, Tuple[Future, str]] = {} # node -> (future, input hash)
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=RUN_SLA_WORKERS, thread_name_prefix="sla")
+
+    def left(self) -> float:
+        return max(0.0, self.total - (time.monotonic() - self.started))
+
+    def start_node(self, node: str):
+        with self._lock:
+            weight = self.pending.pop(node, 1.0)
+            share = self.left() * weight / (weight + sum(self.pending.values()))
+            self.shares[node] = share
+            self.deadlines[node] = time.monotonic() + share
+
+    def finish_node(self, node: str):
+        with self._lock:
+            start = self.deadlines[node] - self.shares[node]
+            self.used[node] = time.monotonic() - start
+
+    def node_left(self, node: str) -> float:
+        deadline = self.deadlines.get(node)
+        if deadline is None:
+            return self.left()
+        return max(0.0, min(deadline - time.monotonic(), self.left()))
+
+    def excuse(self, node: str, seconds: float):
+        """Gives `node` back time it spent waiting for a worker rather than working."""
+        with self._lock:
+            if node in self.deadlines:
+                self.deadlines[node] += seconds
+                self.shares[node] += seconds
+
+    def degrade(self, node: str, rule: str, detail: str):
+        print(f"--- ⏱️ SLA: {node} degraded ({rule}): {detail} ---")
+        with self._lock:
+            self.degradations.setdefault(node, []).append({
+                "rule": rule,
+                "detail": detail,
+                "at_s": round(time.monotonic() - self.started, 2),
+            })
+
+    def defer(self, node: str, future: Future, input_hash: str):
+        """Hands work that missed its share to the end of the run, with the input hash it was built from."""
+        with self._lock:
+            self.deferred[node] = (future, input_hash)
+
+    def fired(self, node: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.degradations.get(node, []))
+
+    def report(self, node: str) -> Dict[str, Any]:
+        """What a step event carries: the node's share, what it used, what fired and what's left."""
+        return {
+            "sla_s": self.total,
+            "left_s": round(self.left(), 2),
+            "node_share_s": round(self.shares.get(node, 0.0), 2),
+            "node_used_s": round(self.used[node], 2) if node in self.used else None,
+            "degradations": self.fired(node),
+        }
+
+
+# --- 2. Hooks (no-ops unless the current run has an SLA) ---
+def current_budget() -> Optional[RunBudget]:
+    return _active_budget.get()
+
+def node_seconds_left(node: str) -> Optional[float]:
+    """Seconds left in `node`'s share, or None when the run has no deadline."""
+    budget = _active_budget.get()
+    return budget.node_left(node) if budget is not None else None
+
+def degrade(node: str, rule: str, detail: str):
+    budget = _active_budget.get()
+    if budget is not None:
+        budget.degrade(node, rule, detail)
+
+@contextmanager
+def _node_scope(budget: RunBudget, node: str):
+    budget.start_node(node)
+    try:
+        yield
+    finally:
+        budget.finish_node(node)
+
+def node_budget(node: str):
+    budget = _active_budget.get()
+    return _node_scope(budget, node) if budget is not None else nullcontext()
+
+def submit(fn: Callable, *args) -> Future:
+    """
+    Runs fn in the current run's SLA pool with the caller's context (routing
+    log, profiler, budget). `future.started` is set once fn leaves the queue.
+    """
+    started = threading.Event()
+    def run(*args):
+        started.set()
+        return fn(*args)
+    future = _active_budget.get().pool.submit(contextvars.copy_context().run, run, *args)
+    future.started = started
+    return future
+
+def wait_within(node: str, future: Future) -> Any:
+    """
+    Waits for a submitted call until `node`'s share runs out. Time the call
+    spent queued for a worker isn't charged to the node, though the run's
+    own deadline still bounds the wait.
+    """
+    budget = _active_budget.get()
+    queued_since = time.monotonic()
+    if not future.started.wait(budget.left()):
+        raise BudgetExceeded(f"{node} got no worker before the run's deadline")
+    budget.excuse(node, time.monotonic() - queued_since)
+    seconds = budget.node_left(node)
+    try:
+        return future.result(timeout=seconds)
+    except FutureTimeout:
+        raise BudgetExceeded(f"{node} ran past its {seconds:.1f}s share") from None
+
+def call_within(node: str, fn: Callable, *args) -> Any:
+    """
+    Calls fn, giving up once `node`'s share runs out. The abandoned call keeps
+    running in the background (threads can't be cancelled); its result is dropped.
+    """
+    if _active_budget.get() is None:
+        return fn(*args)
+    return wait_within(node, submit(fn, *args))
+
+@contextmanager
+def run_budget(total_seconds: Optional[float]):
+    if not total_seconds or total_seconds <= 0:
+        yield None
+        return
+    budget = RunBudget(total_seconds)
+    token = _active_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _active_budget.reset(token)
+        budget.pool.shutdown(wait=False) # abandoned calls finish on their own; nothing new is queued
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import html
+import time
+import threading
+import zlib
+import contextvars
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Any, Optional
+
+# --- 1. Configuration ---
+PROFILE_DIR = os.path.join("campaign_outputs", "profiles")
+SAMPLE_INTERVAL = float(os.getenv("FOUNDRY_PROFILE_INTERVAL_MS", "5")) / 1000
+
+# The profiler of the run executing in the current context, if that run opted in.
+# LangChain copies contextvars into the executor threads that run sync nodes, so
+# nodes and chains see it too. When no run is profiled every hook is a lookup + nullcontext.
+_active_profiler: contextvars.ContextVar = contextvars.ContextVar("active_profiler", default=None)
+
+
+class RunProfiler:
+    """
+    Sampling profiler + span timeline for a single campaign run. Only threads
+    registered with `thread_scope` (the run's node threads) and the event loop
+    thread are sampled. The event loop is shared, so its samples may include
+    other runs' coroutines.
+    """
+
+    def __init__(self, run_id: str, interval: float = SAMPLE_INTERVAL):
+        self.run_id = run_id
+        self.interval = interval
+        self.threads: Dict[int, str] = {}
+        self.samples: Counter = Counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._t0 = time.perf_counter()
+
+    # --- Sampling ---
+    def start(self):
+        self.threads[threading.get_ident()] = "event-loop"
+        self._t0 = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.run_id[:8]}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = dict(self.threads)
+            for ident, label in threads.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                with self._lock:
+                    self.samples[";".join([label] + stack[::-1])] += 1
+
+    @contextmanager
+    def thread_scope(self, label: str):
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] = label
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.threads.pop(ident, None)
+
+    # --- Spans ---
+    @contextmanager
+    def span(self, name: str, category: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            with self._lock:
+                self.spans.append({
+                    "name": name,
+                    "cat": category,
+                    "ts": (started - self._t0) * 1e6,
+                    "dur": (ended - started) * 1e6,
+                    "tid": threading.get_ident(),
+                    "thread": threading.current_thread().name,
+                })
+
+    # --- Artifacts ---
+    def write(self, directory: str = PROFILE_DIR) -> Dict[str, str]:
+        """Writes what was recorded so far; sampling goes on until `profiling()` stops it."""
+        with self._lock:
+            samples = Counter(self.samples)
+            spans = list(self.spans)
+        os.makedirs(directory, exist_ok=True)
+        flamegraph = f"{self.run_id}_flamegraph.svg"
+        timeline = f"{self.run_id}_timeline.json"
+        with open(os.path.join(directory, flamegraph), "w", encoding="utf-8") as f:
+            f.write(render_flamegraph(samples, title=f"Campaign run {self.run_id}"))
+        with open(os.path.join(directory, timeline), "w", encoding="utf-8") as f:
+            json.dump(self.trace_events(spans), f)
+        print(f"--- 🔥 Profile written: {flamegraph}, {timeline} ({sum(samples.values())} samples) ---")
+        return {"flamegraph": flamegraph, "timeline": timeline}
+
+    def trace_events(self, spans: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Chrome trace-event format; open in chrome://tracing or ui.perfetto.dev."""
+        spans = self.spans if spans is None else spans
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"run {self.run_id}"}}]
+        for tid, thread in {(s["tid"], s["thread"]) for s in spans}:
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}})
+        for span in spans:
+            events.append({"name": span["name"], "cat": span["cat"], "ph": "X", "pid": 1,
+                           "tid": span["tid"], "ts": round(span["ts"]), "dur": round(span["dur"])})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# --- 2. Hooks (no-ops unless the current run is profiled) ---
+def span(name: str, category: str = "app"):
+    profiler = _active_profiler.get()
+    return profiler.span(name, category) if profiler is not None else nullcontext()
+
+def thread_scope(label: str):
+    profiler = _active_profiler.get()
+    return profiler.thread_scope(label) if profiler is not None else nullcontext()
+
+@contextmanager
+def profiling(run_id: str):
+    profiler = RunProfiler(run_id)
+    token = _active_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active_profiler.reset(token)
+
+
+# --- 3. Flamegraph Rendering ---
+def render_flamegraph(samples: Counter, title: str = "Flamegraph", width: int = 1200, row: int = 16) -> str:
+    """Renders folded stacks as a standalone SVG icicle graph (root at the top)."""
+    root: Dict[str, Any] = {"count": 0, "children": {}}
+    for stack, count in samples.items():
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+
+    total = max(root["count"], 1)
+    rects: List[str] = []
+    max_depth = 0
+
+    def layout(node: Dict[str, Any], x: float, depth: int):
+        nonlocal max_depth
+        for name, child in sorted(node["children"].items()):
+            w = child["count"] / total * width
+            if w >= 0.5:
+                max_depth = max(max_depth, depth)
+                hue = 10 + (zlib.crc32(name.split(" (")[0].encode()) % 40)
+                label = html.escape(name)
+                pct = child["count"] / total * 100
+                chars = int(w / 7)
+                text = html.escape(name[:chars - 2] + "..") if len(name) > chars else label
+                rects.append(
+                    f'<g><title>{label} ({child["count"]} samples, {pct:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{depth * row + 30}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},85%,60%)"/>'
+                    + (f'<text x="{x + 3:.1f}" y="{depth * row + 30 + row - 4}">{text}</text>' if chars > 3 else "")
+                    + "</g>"
+                )
+                layout(child, x, depth + 1)
+            x += w
+
+    layout(root, 0.0, 0)
+    height = (max_depth + 1) * row + 40
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">'
+        f'<text x="5" y="18" font-size="14">{html.escape(title)} ({total} samples)</text>'
+        + "".join(rects)
+        + "</svg>"
+    )
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import threading
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+# --- 1. Configuration ---
+# Every uvicorn worker on the host opens the same SQLite file, so a run started by
+# one worker can be watched (or picked up from the queue) by any other worker.
+RUN_STORE_PATH = os.getenv("FOUNDRY_RUN_STORE", os.path.join("campaign_outputs", "runs.db"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+TERMINAL_EVENTS = {"done", "error"}
+# A running run's worker renews its lease every RUN_LEASE_SECONDS / 3; a run whose
+# lease lapses (the worker crashed or was killed) is failed by whichever worker notices.
+RUN_LEASE_SECONDS = float(os.getenv("FOUNDRY_RUN_LEASE_S", "60"))
+# Finished runs keep their full event log this long for late watchers, then only the terminal event.
+RUN_EVENT_RETENTION_SECONDS = float(os.getenv("FOUNDRY_RUN_EVENT_RETENTION_S", "3600"))
+
+
+class RunRegistry:
+    """
+    Shared run store + step-event pub/sub backed by SQLite.
+
+    Runs move queued -> running -> done/error. Events are appended with a
+    per-run sequence number; subscribers replay from any sequence and then
+    follow new events (woken immediately in-process, by polling otherwise).
+    A running run holds a lease its worker keeps renewing; expired leases and
+    old event logs are cleaned up by reap_stale_runs / prune_events.
+    """
+
+    def __init__(self, path: str = RUN_STORE_PATH, poll_interval: float = 0.25):
+        self.path = path
+        self.poll_interval = poll_interval
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._waiters: Dict[str, List[asyncio.Event]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        with self._conn() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    initial_prompt TEXT NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    heartbeat_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS run_events (
+                    run_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, seq)
+                );
+                CREATE INDEX IF NOT EXISTS runs_status_idx ON runs(status, created_at);
+                """
+            )
+            # Stores created before per-run options / leases existed.
+            for column in ("options TEXT NOT NULL DEFAULT '{}'", "heartbeat_at REAL"):
+                try:
+                    conn.execute(f"ALTER TABLE runs ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # --- 2. Run lifecycle ---
+    def create_run(self, initial_prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        run_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO runs (run_id, initial_prompt, options, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (run_id, initial_prompt, json.dumps(options or {}), now, now),
+        )
+        return run_id
+
+    def claim_run(self, run_id: Optional[str] = None, worker_id: str = WORKER_ID) -> Optional[Dict[str, Any]]:
+        """Atomically moves a queued run (a specific one, or the oldest) to running."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if run_id is None:
+                row = conn.execute("SELECT run_id FROM runs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                run_id = row["run_id"]
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE runs SET status = 'running', worker_id = ?, heartbeat_at = ?, updated_at = ? WHERE run_id = ? AND status = 'queued'",
+                (worker_id, now, now, run_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if cursor.rowcount != 1:
+            return None
+        return self.get_run(run_id)
+
+    def finish_run(self, run_id: str, status: str) -> bool:
+        """Moves a run that hasn't finished yet to `status`. False if it already ended (e.g. reaped by another worker)."""
+        cursor = self._conn().execute(
+            "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ? AND status IN ('queued', 'running')",
+            (status, time.time(), run_id),
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, run_id: str, worker_id: str = WORKER_ID) -> bool:
+        """Renews the lease on a run this worker is executing. False once the run is no longer ours."""
+        cursor = self._conn().execute(
+            "UPDATE runs SET heartbeat_at = ? WHERE run_id = ? AND status = 'running' AND worker_id = ?",
+            (time.time(), run_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def reap_stale_runs(self, lease_seconds: float = RUN_LEASE_SECONDS) -> List[str]:
+        """
+        Fails running runs whose lease lapsed. A run can't resume mid-graph, so
+        instead of being requeued it gets an error event that ends its watchers' streams.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT run_id, worker_id FROM runs WHERE status = 'running' AND COALESCE(heartbeat_at, updated_at) < ?",
+                (time.time() - lease_seconds,),
+            ).fetchall()
+            for row in rows:
+                conn.execute("UPDATE runs SET status = 'error', updated_at = ? WHERE run_id = ?", (time.time(), row["run_id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for row in rows:
+            self.publish(row["run_id"], {"event": "error", "data": f"Run lost: worker {row['worker_id']} stopped responding"})
+        return [row["run_id"] for row in rows]
+
+    def prune_events(self, retention_seconds: float = RUN_EVENT_RETENTION_SECONDS) -> int:
+        """
+        Drops the event logs of runs that finished more than `retention_seconds`
+        ago, keeping each run's last (terminal) event so a late watcher still gets
+        told how it ended. The full final state lives in the campaign history.
+        """
+        cursor = self._conn().execute(
+            """
+            DELETE FROM run_events
+            WHERE run_id IN (SELECT run_id FROM runs WHERE status NOT IN ('queued', 'running') AND updated_at < ?)
+              AND seq < (SELECT MAX(seq) FROM run_events AS last WHERE last.run_id = run_events.run_id)
+            """,
+            (time.time() - retention_seconds,),
+        )
+        return cursor.rowcount
+
+    def count_queued(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM runs WHERE status = 'queued'").fetchone()[0]
+
+    def queue_position(self, run_id: str) -> Optional[int]:
+        """1-based position among queued runs, or None once the run has left the queue."""
+        row = self._conn().execute("SELECT status, created_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None or row["status"] != "queued":
+            return None
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM runs WHERE status = 'queued' AND created_at <= ?", (row["created_at"],)
+        ).fetchone()[0]
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["options"] = json.loads(run["options"] or "{}")
+        return run
+
+    # --- 3. Pub/sub ---
+    def publish(self, run_id: str, event: Dict[str, Any]) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 AS next FROM run_events WHERE run_id = ?", (run_id,)).fetchone()
+            seq = row["next"]
+            conn.execute(
+                "INSERT INTO run_events (run_id, seq, payload, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, seq, json.dumps(event), time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._notify(run_id)
+        return seq
+
+    def events_since(self, run_id: str, seq: int = 0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT seq, payload FROM run_events WHERE run_id = ? AND seq > ? ORDER BY seq", (run_id, seq)
+        ).fetchall()
+        return [{"seq": row["seq"], **json.loads(row["payload"])} for row in rows]
+
+    def _notify(self, run_id: str):
+        # publish() may run in a worker thread; hand the wake-up to the event loop.
+        if self._loop is None:
+            return
+        for waiter in list(self._waiters.get(run_id, [])):
+            self._loop.call_soon_threadsafe(waiter.set)
+
+    def local_subscribers(self, run_id: str) -> int:
+        """Number of subscribers to this run inside the current process."""
+        return len(self._waiters.get(run_id, []))
+
+    async def apublish(self, run_id: str, event: Dict[str, Any]) -> int:
+        self._loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(self.publish, run_id, event)
+
+    async def subscribe(self, run_id: str, from_seq: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yields every event after `from_seq` until the run's terminal event."""
+        self._loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        self._waiters.setdefault(run_id, []).append(waiter)
+        seq = from_seq
+        try:
+            while True:
+                waiter.clear()
+                for event in await asyncio.to_thread(self.events_since, run_id, seq):
+                    seq = event["seq"]
+                    yield event
+                    if event.get("event") in TERMINAL_EVENTS:
+                        return
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters[run_id].remove(waiter)
+            if not self._waiters[run_id]:
+                del self._waiters[run_id]
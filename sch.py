@@ -1,19 +1,29 @@
 import os
+import re
+import time
+import asyncio
 import uvicorn
 import requests
 import pprint
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+
+# --- 1. Load Environment Variables ---
+# Before the local modules below: they read their FOUNDRY_* settings at import time.
+load_dotenv()
+
+from llm_clients import chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
+import cassette
+from http_pool import http
 
-# --- 1. Load Environment Variables ---
-load_dotenv()
+cassette.install()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 CALENDLY_API_KEY = os.getenv("CALENDLY_API_KEY")
 CALENDLY_EVENT_TYPE_URL = os.getenv("CALENDLY_EVENT_TYPE_URL") # e.g., https://api.calendly.com/event_types/AABBC...
@@ -27,7 +37,7 @@ if not CALENDLY_EVENT_TYPE_URL:
     
 # --- 2. Initialize LLM ---
 print("--- 🧠 Initializing Log Analysis LLM ---")
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = chat_model("llama-3.1-8b-instant", temperature=0)
 print("--- ✅ LLM Ready ---")
 
 
@@ -110,12 +120,12 @@ def schedule_calendly_meeting(name: str, email: str, start_time: str) -> Dict[st
     try:
         # This is a mock API call for demonstration.
         # The actual Calendly booking API is at 'https://api.calendly.com/scheduled_events'
-        # response = requests.post("https://api.calendly.com/scheduled_events", headers=headers, json=booking_payload)
+        # response = http.post("https://api.calendly.com/scheduled_events", headers=headers, json=booking_payload, timeout=15)
         # response.raise_for_status()
         
         # --- MOCKING THE CALL ---
         print("--- ⚠️ CALENDLY MOCK: Simulating successful booking. ---")
-        # In a real app, you would uncomment the 'requests.post' above.
+        # In a real app, you would uncomment the 'http.post' above (shared pool, breaker-protected).
         # We will simulate the response.
         mock_response = {
             "resource": {
@@ -157,6 +167,16 @@ async def handle_call_logs(request: CallLogRequest, background_tasks: Background
     """
     print(f"--- 🪵 Received logs for Call ID: {request.callId} ---")
     
+    call = live_calls.get(request.callId)
+    if call is not None and not await call.settle(LIVE_END_WAIT_SECONDS):
+        # The live call is still analyzing or booking: let it decide rather than booking a second time
+        return {"status": "meeting_booking_in_progress"}
+
+    if request.callId in live_bookings:
+        # Already booked while the call was in progress (see /ws/call/{call_id})
+        print(f"--- ♻️ Meeting for {request.callId} was already booked live, skipping. ---")
+        return {"status": "meeting_already_booked", "details": live_bookings[request.callId]}
+    
     try:
         # Format the transcript for the LLM
         transcript_msgs = request.logs.get("transcript", [])
@@ -174,6 +194,8 @@ async def handle_call_logs(request: CallLogRequest, background_tasks: Background
         
         if analysis.meeting_scheduled and analysis.email and analysis.name and analysis.time:
             print("--- ✅ Meeting detected! Booking in background... ---")
+            # Claimed before booking, so a live call that is still open won't book it too
+            remember_booking(request.callId, {"status": "booking_started", "source": "call-logs", "analysis": analysis.model_dump()})
             # Schedule the meeting in the background
             background_tasks.add_task(
                 schedule_calendly_meeting,
@@ -191,6 +213,197 @@ async def handle_call_logs(request: CallLogRequest, background_tasks: Background
         raise HTTPException(status_code=500, detail="Failed to analyze call logs.")
 
 
+# --- 7. Live Transcript Ingestion ---
+# The frontend streams transcript turns over /ws/call/{call_id} while the call is
+# running: {"role": "user"|"assistant", "transcript": "..."} per turn and
+# {"event": "end"} on hang-up. The transcript is only re-analyzed when a turn
+# carries a scheduling signal, and the booking starts as soon as the analysis
+# says the meeting is confirmed, so the assistant can confirm it on the call.
+LIVE_END_WAIT_SECONDS = float(os.getenv("LIVE_END_WAIT_SECONDS", "20"))
+MAX_LIVE_BOOKINGS = 1000
+
+EMAIL_SIGNAL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\b(?:at|@)\s+\w+\s+dot\s+(?:com|io|net|org|co)\b", re.IGNORECASE)
+TIME_SIGNAL = re.compile(
+    r"\b(?:\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}|noon|o'clock|tomorrow|today|tonight|next week"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday|morning|afternoon|evening"
+    r"|january|february|march|april|may|june|july|august|september|october|november|december)\b",
+    re.IGNORECASE,
+)
+CONFIRMATION_SIGNAL = re.compile(
+    r"\b(?:yes|yeah|yep|sure|sounds good|perfect|that works|works for me|book it|confirm(?:ed)?|let's do it|okay|ok)\b",
+    re.IGNORECASE,
+)
+
+# call_id -> booking details, so the post-call /call-logs POST doesn't book twice
+live_bookings: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# call_id -> the open live call, so /call-logs can wait for its analysis and booking
+live_calls: Dict[str, "LiveCall"] = {}
+
+def scheduling_signals(turn: Dict[str, Any]) -> List[str]:
+    text = turn.get("transcript") or ""
+    signals = []
+    if EMAIL_SIGNAL.search(text):
+        signals.append("email")
+    if TIME_SIGNAL.search(text):
+        signals.append("time")
+    # Only the caller can confirm a meeting
+    if turn.get("role") == "user" and CONFIRMATION_SIGNAL.search(text):
+        signals.append("confirmation")
+    return signals
+
+def remember_booking(call_id: str, details: Dict[str, Any]):
+    live_bookings[call_id] = details
+    while len(live_bookings) > MAX_LIVE_BOOKINGS:
+        live_bookings.popitem(last=False)
+
+
+class LiveCall:
+    """Incremental state for one in-progress call."""
+
+    def __init__(self, call_id: str, websocket: WebSocket):
+        self.call_id = call_id
+        self.websocket = websocket
+        self.turns: List[Dict[str, Any]] = []
+        self.signals: set = set()
+        self.analysis: Optional[MeetingAnalysis] = None
+        self.analyses = 0
+        self.analysis_task: Optional[asyncio.Task] = None
+        self.reanalyze = False # a signal arrived while an analysis was running
+        self.booking_task: Optional[asyncio.Task] = None
+        self.booking: Optional[Dict[str, Any]] = None
+        self.finishing = False # hang-up received; a last analysis may be about to start
+        self._send_lock = asyncio.Lock()
+
+    def transcript(self) -> str:
+        return "\n".join(f"{t['role']}: {t['transcript']}" for t in self.turns if t.get("transcript"))
+
+    async def send(self, message: Dict[str, Any]):
+        async with self._send_lock:
+            try:
+                await self.websocket.send_json(message)
+            except Exception:
+                pass # caller already hung up; the state is still finished server-side
+
+    def add_turn(self, turn: Dict[str, Any]):
+        self.turns.append(turn)
+        signals = scheduling_signals(turn)
+        if not signals or self.booking_task is not None:
+            return
+        self.signals.update(signals)
+        # Analysis needs at least a time and an email to ever say "scheduled"
+        if not {"time", "email"} <= self.signals:
+            return
+        if self.analysis_task is not None and not self.analysis_task.done():
+            self.reanalyze = True
+            return
+        self.analysis_task = asyncio.create_task(self.analyze())
+
+    async def analyze(self):
+        while True:
+            self.reanalyze = False
+            self.analyses += 1
+            print(f"--- 🧠 Live analysis #{self.analyses} for call {self.call_id} ({len(self.turns)} turns) ---")
+            try:
+                self.analysis = await log_analysis_chain.ainvoke({"transcript": self.transcript()})
+            except Exception as e:
+                print(f"--- ❌ Live analysis ERROR for {self.call_id}: {e} ---")
+                await self.send({"event": "analysis_error", "error": str(e)})
+                return
+            await self.send({"event": "analysis", "turns": len(self.turns), "details": self.analysis.model_dump()})
+            if self.maybe_book() or not self.reanalyze:
+                return
+
+    def maybe_book(self) -> bool:
+        a = self.analysis
+        if self.booking_task is not None or not (a and a.meeting_scheduled and a.email and a.name and a.time):
+            return self.booking_task is not None
+        if self.call_id in live_bookings:
+            print(f"--- ♻️ Meeting for {self.call_id} was already booked from the call logs, skipping. ---")
+            return True
+        print(f"--- ✅ Meeting confirmed live on call {self.call_id}, booking now ---")
+        self.booking_task = asyncio.create_task(self.book(a))
+        return True
+
+    async def settle(self, timeout: float) -> bool:
+        """Waits until no analysis or booking for this call is running or about to start. False on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = [t for t in (self.analysis_task, self.booking_task) if t is not None and not t.done()]
+            if not pending and not self.finishing:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if pending:
+                await asyncio.wait(pending, timeout=remaining)
+            else:
+                await asyncio.sleep(min(0.05, remaining))
+
+    async def book(self, analysis: MeetingAnalysis):
+        await self.send({"event": "meeting_detected", "details": analysis.model_dump()})
+        result = await asyncio.to_thread(schedule_calendly_meeting, analysis.name, analysis.email, analysis.time)
+        self.booking = {**result, "analysis": analysis.model_dump()}
+        if result.get("status") == "scheduled":
+            remember_booking(self.call_id, self.booking)
+            await self.send({
+                "event": "booking_confirmed",
+                "details": self.booking,
+                # Something the assistant can read out before the caller hangs up
+                "say": f"You're all set, {analysis.name}. I've booked the meeting for {analysis.time} and sent the invite to {analysis.email}.",
+            })
+        else:
+            await self.send({"event": "booking_failed", "details": self.booking})
+
+    async def finish(self):
+        """
+        On hang-up: wait for in-flight work and, unless a booking already started,
+        analyze the full transcript once more (the last turns may have confirmed it).
+        """
+        self.finishing = True
+        try:
+            pending = [t for t in (self.analysis_task, self.booking_task) if t is not None]
+            if pending:
+                await asyncio.wait(pending, timeout=LIVE_END_WAIT_SECONDS)
+            if self.booking_task is None and self.turns:
+                self.analysis_task = asyncio.create_task(self.analyze())
+                await asyncio.wait([self.analysis_task], timeout=LIVE_END_WAIT_SECONDS)
+                if self.booking_task is not None:
+                    await asyncio.wait([self.booking_task], timeout=LIVE_END_WAIT_SECONDS)
+        finally:
+            self.finishing = False
+        await self.send({
+            "event": "call_summary",
+            "turns": len(self.turns),
+            "analyses": self.analyses,
+            "booking": self.booking,
+            "status": "meeting_booked" if self.booking and self.booking.get("status") == "scheduled" else "no_meeting_detected",
+        })
+
+
+@app.websocket("/ws/call/{call_id}")
+async def live_call(websocket: WebSocket, call_id: str):
+    await websocket.accept()
+    call = LiveCall(call_id, websocket)
+    live_calls[call_id] = call
+    print(f"--- 📞 Live transcript stream opened for call {call_id} ---")
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if message.get("event") == "end":
+                await call.finish()
+                break
+            if message.get("transcript"):
+                call.add_turn({"role": message.get("role", "user"), "transcript": message["transcript"]})
+    except WebSocketDisconnect:
+        # The caller's client dropped without "end": still finish the analysis and any booking it confirms
+        await call.settle(LIVE_END_WAIT_SECONDS)
+        print(f"--- 📞 Live transcript stream for {call_id} disconnected ---")
+    finally:
+        if live_calls.get(call_id) is call:
+            del live_calls[call_id]
+        print(f"--- 📞 Call {call_id} closed after {len(call.turns)} turns, {call.analyses} analyses ---")
+
+
 if __name__ == "__main__":
     print("--- 🚀 Starting Log Analysis Server on http://localhost:8004 ---")
     uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
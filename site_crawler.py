@@ -0,0 +1,222 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from bs4 import BeautifulSoup
+from http_pool import http
+
+# --- 1. Configuration ---
+CRAWL_MAX_DEPTH = int(os.getenv("FOUNDRY_CRAWL_DEPTH", "1"))
+CRAWL_MAX_PAGES = int(os.getenv("FOUNDRY_CRAWL_MAX_PAGES", "12"))
+CRAWL_TIME_BUDGET = float(os.getenv("FOUNDRY_CRAWL_BUDGET_S", "8"))
+CRAWL_CONCURRENCY = int(os.getenv("FOUNDRY_CRAWL_CONCURRENCY", "6"))
+NEAR_DUPLICATE_BITS = 3 # simhash distance at or below which two pages count as the same page
+BOILERPLATE_MIN_PAGES = 3 # a block is site chrome only if it's on more than half the pages and at least this many
+
+# Pages that usually carry product knowledge are fetched first and weigh more when ranking.
+PRIORITY_TERMS = ("pricing", "price", "plans", "features", "product", "faq", "how-it-works", "solutions", "about", "docs")
+SKIP_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".zip", ".mp4", ".css", ".js", ".xml")
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe"]
+BLOCK_TAGS = ["h1", "h2", "h3", "h4", "p", "li", "td", "dd", "blockquote"]
+
+
+# --- 2. Page parsing ---
+def _site(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+def link_priority(url: str) -> int:
+    path = urlsplit(url).path.lower()
+    return 0 if any(term in path for term in PRIORITY_TERMS) else 1
+
+def parse_page(base_url: str, html: str) -> Tuple[List[str], List[str]]:
+    """Returns (text blocks, same-site links) with nav/header/footer chrome removed."""
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    site = _site(base_url)
+    for anchor in soup.find_all("a", href=True):
+        url = urljoin(base_url, anchor["href"])
+        if urlsplit(url).scheme in ("http", "https") and _site(url) == site and not urlsplit(url).path.lower().endswith(SKIP_EXTENSIONS):
+            links.append(canonical_url(url))
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    blocks = []
+    for element in soup.find_all(BLOCK_TAGS):
+        # Skip containers whose text is already captured by a nested block.
+        if element.find(BLOCK_TAGS):
+            continue
+        text = re.sub(r"\s+", " ", element.get_text(" ", strip=True))
+        if len(text) >= 25 or (element.name.startswith("h") and text):
+            blocks.append(text)
+    return blocks, links
+
+
+# --- 3. Near-duplicate fingerprints ---
+def simhash(text: str, bits: int = 64) -> int:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# --- 4. The crawl ---
+def _fetch(url: str) -> Optional[str]:
+    response = http.get(url, timeout=min(10, CRAWL_TIME_BUDGET))
+    if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+        return None
+    return response.text
+
+async def crawl_site(start_url: str, max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES,
+                     time_budget: float = CRAWL_TIME_BUDGET, concurrency: int = CRAWL_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Breadth-first crawl of start_url's site, level by level, fetching each level
+    concurrently. Stops at max_depth, max_pages or when time_budget runs out;
+    requests still in flight at the deadline are abandoned.
+    """
+    deadline = time.monotonic() + time_budget
+    semaphore = asyncio.Semaphore(concurrency)
+    seen = {canonical_url(start_url)}
+    frontier = [canonical_url(start_url)]
+    pages: List[Dict[str, Any]] = []
+
+    async def fetch(url: str, depth: int) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                html = await asyncio.to_thread(_fetch, url)
+            except Exception as e:
+                print(f"--- ⚠️ Crawl: {url} failed ({e}) ---")
+                return None
+        if not html:
+            return None
+        blocks, links = await asyncio.to_thread(parse_page, url, html)
+        return {"url": url, "depth": depth, "blocks": blocks, "links": links}
+
+    for depth in range(max_depth + 1):
+        batch = frontier[: max_pages - len(pages)]
+        remaining = deadline - time.monotonic()
+        if not batch or remaining <= 0:
+            break
+        tasks = [asyncio.create_task(fetch(url, depth)) for url in batch]
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+        for task in pending:
+            task.cancel()
+        frontier = []
+        for task in tasks:
+            if task not in done or task.result() is None:
+                continue
+            page = task.result()
+            pages.append(page)
+            for link in page["links"]:
+                if link not in seen:
+                    seen.add(link)
+                    frontier.append(link)
+        frontier.sort(key=link_priority)
+        if pending:
+            print(f"--- ⏱️ Crawl: time budget hit at depth {depth}, abandoned {len(pending)} pages ---")
+            break
+    return pages
+
+
+# --- 5. Cleaning and ranking ---
+def drop_boilerplate_and_duplicates(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drops blocks repeated across pages (menus, CTAs, cookie banners) and near-duplicate pages."""
+    if len(pages) >= BOILERPLATE_MIN_PAGES:
+        # Site chrome shows up on most pages; content shared by just a couple of pages is kept.
+        block_counts = Counter(block for page in pages for block in set(page["blocks"]))
+
+        def chrome(block: str) -> bool:
+            return block_counts[block] * 2 > len(pages) and block_counts[block] >= BOILERPLATE_MIN_PAGES
+
+        for page in pages:
+            page["blocks"] = [b for b in page["blocks"] if not chrome(b)]
+    kept: List[Dict[str, Any]] = []
+    for page in pages:
+        if not page["blocks"]:
+            continue
+        page["fingerprint"] = simhash(" ".join(page["blocks"]))
+        if any(hamming(page["fingerprint"], other["fingerprint"]) <= NEAR_DUPLICATE_BITS for other in kept):
+            print(f"--- 🧹 Crawl: dropping near-duplicate page {page['url']} ---")
+            continue
+        kept.append(page)
+    return kept
+
+def rank_paragraphs(pages: List[Dict[str, Any]], query: str, max_chars: int) -> str:
+    """
+    Scores every block by query-term hits, page priority and depth, keeps the best
+    that fit in max_chars, and returns them grouped by page in crawl order. The
+    "Source:" line of each page counts against max_chars too, so the result fits
+    without cutting a block.
+    """
+    terms = set(re.findall(r"[a-z0-9]{3,}", query.lower())) | {t for t in PRIORITY_TERMS if "-" not in t}
+    scored = []
+    seen = set()
+    for page_index, page in enumerate(pages):
+        page_bonus = (1.0 if link_priority(page["url"]) == 0 else 0.0) + 1.0 / (1 + page["depth"])
+        for position, block in enumerate(page["blocks"]):
+            if block.lower() in seen:
+                continue
+            seen.add(block.lower())
+            words = re.findall(r"[a-z0-9]{3,}", block.lower())
+            hits = sum(1 for w in words if w in terms)
+            score = hits + page_bonus + min(len(words), 60) / 60
+            scored.append((score, page_index, position, block))
+
+    kept, chars, sourced = [], 0, set()
+    for score, page_index, position, block in sorted(scored, key=lambda s: -s[0]):
+        cost = len(block) + 1
+        if page_index not in sourced:
+            cost += len(_source_line(pages[page_index])) + 2 # plus the blank line before it
+        if chars + cost > max_chars + 1: # the last line has no trailing newline
+            continue
+        kept.append((page_index, position, block))
+        sourced.add(page_index)
+        chars += cost
+
+    sections, current = [], None
+    for page_index, position, block in sorted(kept):
+        if page_index != current:
+            sections.append(("\n" if sections else "") + _source_line(pages[page_index]))
+            current = page_index
+        sections.append(block)
+    return "\n".join(sections)
+
+def _source_line(page: Dict[str, Any]) -> str:
+    return f"Source: {page['url']}"
+
+async def crawl_product_site(start_url: str, product_name: str, max_chars: int = 15000,
+                             max_depth: Optional[int] = None, max_pages: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """Crawls, cleans and ranks a product site; returns (content, crawl report)."""
+    started = time.perf_counter()
+    pages = await crawl_site(
+        start_url,
+        max_depth=CRAWL_MAX_DEPTH if max_depth is None else max_depth,
+        max_pages=CRAWL_MAX_PAGES if max_pages is None else max_pages,
+    )
+    fetched = len(pages)
+    pages = drop_boilerplate_and_duplicates(pages)
+    content = rank_paragraphs(pages, product_name, max_chars)
+    report = {
+        "pages_fetched": fetched,
+        "pages_used": len(pages),
+        "urls": [page["url"] for page in pages],
+        "chars": len(content),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"--- 🕸️ Crawled {fetched} pages ({len(pages)} kept, {len(content)} chars) in {report['seconds']}s ---")
+    return content, report
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The servers refuse to import without API keys; tests never reach the real services.
+for _key in ("GROQ_API_KEY", "TAVILY_API_KEY", "UNSPLASH_ACCESS_KEY", "CALENDLY_API_KEY", "CALENDLY_EVENT_TYPE_URL"):
+    os.environ.setdefault(_key, "test")
+
+# Stores default to paths under ./campaign_outputs; keep them out of the checkout.
+os.chdir(tempfile.mkdtemp(prefix="foundry-tests-"))
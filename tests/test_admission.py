@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+import foundry_server
+from foundry_server import AdmissionController, RunQueueFull, DEFAULT_RUN_SECONDS
+
+
+def queue_and_record(admission, run_id, positions, admitted):
+    async def on_queued(position, eta):
+        positions.setdefault(run_id, []).append(position)
+    async def acquire():
+        await admission.acquire(run_id, on_queued)
+        admitted.append(run_id)
+    return asyncio.create_task(acquire())
+
+
+def test_runs_are_admitted_in_fifo_order():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queued=5)
+        positions, admitted = {}, []
+        await admission.acquire("a", None)
+        tasks = [queue_and_record(admission, run_id, positions, admitted) for run_id in ("b", "c")]
+        await asyncio.sleep(0.01)
+        assert list(admission.queue) == ["b", "c"]
+        admission.release(1.0)
+        await asyncio.sleep(0.01)
+        assert admitted == ["b"]
+        admission.release(1.0)
+        await asyncio.gather(*tasks)
+        return positions, admitted
+    positions, admitted = asyncio.run(scenario())
+    assert admitted == ["b", "c"]
+    assert positions == {"b": [1], "c": [2, 1]}
+
+def test_full_queue_sheds_new_runs(monkeypatch):
+    admission = AdmissionController(max_concurrent=1, max_queued=1)
+    admission.running = 1
+    admission.queue.append("waiting")
+    monkeypatch.setattr(foundry_server, "admission", admission)
+    monkeypatch.setattr(foundry_server, "MULTI_WORKER", False)
+    def create_run(*args):
+        raise AssertionError("a shed run must not be registered")
+    monkeypatch.setattr(foundry_server.run_registry, "create_run", create_run)
+    with pytest.raises(RunQueueFull):
+        asyncio.run(foundry_server.submit_run("brief"))
+
+def test_estimate_wait_uses_recent_durations_per_batch_of_slots():
+    admission = AdmissionController(max_concurrent=2, max_queued=5)
+    assert admission.estimate_wait(1) == DEFAULT_RUN_SECONDS
+    admission.durations.extend([10.0, 20.0])
+    assert [admission.estimate_wait(p) for p in (1, 2, 3)] == [15.0, 15.0, 30.0]
+
+def test_cancelled_queued_run_leaves_the_queue():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queued=5)
+        positions, admitted = {}, []
+        await admission.acquire("a", None)
+        b = queue_and_record(admission, "b", positions, admitted)
+        c = queue_and_record(admission, "c", positions, admitted)
+        await asyncio.sleep(0.01)
+        b.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await b
+        await asyncio.sleep(0.01)
+        assert list(admission.queue) == ["c"]
+        assert admission.running == 1
+        admission.release()
+        await c
+        return positions, admitted
+    positions, admitted = asyncio.run(scenario())
+    assert admitted == ["c"]
+    assert positions["c"] == [2, 1]
@@ -0,0 +1,66 @@
+import pytest
+from campaign_history import CampaignHistory, fts_query
+
+
+@pytest.fixture
+def history(tmp_path):
+    return CampaignHistory(str(tmp_path / "history.db"))
+
+def campaign(topic, audience="VPs of Engineering", **extra):
+    return {
+        "initial_prompt": f"Webinar about {topic}", "topic": topic, "target_audience": audience, "goal": "Launch a webinar",
+        "strategy_markdown": f"# Strategy for {topic}", "landing_page_code": f"<html><script>var x = 1;</script><h1>{topic}</h1></html>",
+        **extra,
+    }
+
+
+def test_fts_query_quotes_every_word():
+    assert fts_query("flaky CI") == '"flaky" "CI"*'
+    assert fts_query('ci" OR topic:* NEAR(') == '"ci" "OR" "topic" "NEAR"*'
+    assert fts_query("") is None
+    assert fts_query("*:()") is None
+
+def test_save_and_get_round_trip(history):
+    state = campaign("Agentic-Fix", landing_page_url="https://fix.vercel.app")
+    history.save("run-1", state)
+    saved = history.get("run-1")
+    assert saved["state"] == state
+    assert history.get("missing") is None
+
+def test_list_pages_newest_first_by_cursor(history):
+    for i in range(5):
+        history.save(f"run-{i}", campaign(f"Topic {i}"))
+    first = history.list(limit=2)
+    assert [item["run_id"] for item in first["items"]] == ["run-4", "run-3"]
+    second = history.list(limit=2, cursor=first["next_cursor"])
+    assert [item["run_id"] for item in second["items"]] == ["run-2", "run-1"]
+    last = history.list(limit=2, cursor=second["next_cursor"])
+    assert [item["run_id"] for item in last["items"]] == ["run-0"]
+    assert last["next_cursor"] is None
+    assert "state" not in first["items"][0]
+
+def test_search_matches_prefixes_and_page_text(history):
+    history.save("run-ci", campaign("Flaky CI builds"))
+    history.save("run-db", campaign("Postgres tuning", audience="DBAs"))
+    assert [item["run_id"] for item in history.search("flak")["items"]] == ["run-ci"]
+    assert [item["run_id"] for item in history.search("DBAs")["items"]] == ["run-db"]
+    assert "[" in history.search("postgres")["items"][0]["snippet"]
+    # script bodies aren't indexed, and FTS syntax in the query is just text
+    assert history.search("var")["items"] == []
+    assert history.search('" OR *')["items"] == []
+
+def test_search_pages_by_offset(history):
+    for i in range(3):
+        history.save(f"run-{i}", campaign(f"Webinar {i}"))
+    first = history.search("webinar", limit=2)
+    assert len(first["items"]) == 2 and first["next_offset"] == 2
+    second = history.search("webinar", limit=2, offset=first["next_offset"])
+    assert len(second["items"]) == 1 and second["next_offset"] is None
+
+def test_prune_keeps_only_the_newest_campaigns(tmp_path):
+    history = CampaignHistory(str(tmp_path / "history.db"), max_campaigns=2)
+    for i in range(3):
+        history.save(f"run-{i}", campaign(f"Topic{i}"))
+    assert [item["run_id"] for item in history.list()["items"]] == ["run-2", "run-1"]
+    assert history.get("run-0") is None
+    assert history.search("Topic0")["items"] == []
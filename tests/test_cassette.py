@@ -0,0 +1,107 @@
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+import cassette
+from cassette import Cassette, CassetteMiss
+
+GROQ = "https://api.groq.com/openai/v1/chat/completions"
+
+
+def chat(system, human, model="llama-3.1-8b-instant"):
+    return json.dumps({"model": model, "messages": [{"role": "system", "content": system}, {"role": "user", "content": human}]})
+
+
+def record(store, url, body, text, method="POST"):
+    store.record(method, url, body, 200, "OK", {"Content-Type": "application/json"}, text.encode("utf-8"), 0.01)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return Cassette("test", str(tmp_path))
+
+
+def reloaded(store):
+    replay = Cassette("test", os.path.dirname(store.path))
+    replay.load()
+    return replay
+
+
+def test_recorded_exchange_replays(store):
+    record(store, "https://api.tavily.com/search", {"query": "flaky builds"}, '{"results": []}')
+    entry = reloaded(store).lookup("POST", "https://api.tavily.com/search", {"query": "flaky builds"})
+    assert entry["response"]["text"] == '{"results": []}'
+
+
+def test_secrets_never_reach_the_file(store):
+    record(store, "https://api.telegram.org/botSECRET1/sendMessage?api_key=SECRET2&chat=1", '{"token": "SECRET3", "text": "hi"}', "{}")
+    record(store, "https://hooks.slack.com/services/T0/B0/SECRET4", "{}", "ok")
+    written = open(store.path).read()
+    for secret in ("SECRET1", "SECRET2", "SECRET3", "SECRET4"):
+        assert secret not in written
+    replay = reloaded(store)
+    assert replay.lookup("POST", "https://api.telegram.org/botOTHER/sendMessage?api_key=OTHER&chat=1", '{"token": "x", "text": "hi"}')
+
+
+def test_planner_prompt_matches_on_another_day(store):
+    record(store, GROQ, chat("Parse briefs. Today's date is 2026-01-05", "brief"), '{"plan": 1}')
+    replay = reloaded(store)
+    replay.lookup("POST", GROQ, chat("Parse briefs. Today's date is 2026-03-17", "brief"))
+    assert replay.stats["replayed"] == 1 and replay.stats["fuzzy"] == 0
+
+
+def test_llm_fallback_stays_within_the_same_chain(store):
+    record(store, GROQ, chat("Parse briefs.", "brief A"), '{"plan": 1}')
+    record(store, GROQ, chat("Write content.", "topic A"), '{"content": 1}')
+    replay = reloaded(store)
+    assert replay.lookup("POST", GROQ, chat("Parse briefs.", "brief B"))["response"]["text"] == '{"plan": 1}'
+    with pytest.raises(CassetteMiss):
+        replay.lookup("POST", GROQ, chat("Analyze call logs.", "transcript"))
+    with pytest.raises(CassetteMiss):
+        replay.lookup("POST", GROQ, chat("Parse briefs.", "brief B", model="llama-3.3-70b-versatile"))
+    assert replay.stats["missed"] == 2
+
+
+def test_unknown_route_misses(store):
+    with pytest.raises(CassetteMiss):
+        reloaded(store).lookup("GET", "https://api.unsplash.com/search/photos?query=x", None)
+
+
+class Hello(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"hello": "world"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_requests_round_trip_through_the_transport_hook(tmp_path, monkeypatch):
+    monkeypatch.setattr(HTTPAdapter, "send", HTTPAdapter.send) # restored after the test
+    server = HTTPServer(("127.0.0.1", 0), Hello)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hello?apikey=SECRET"
+
+    recorder = Cassette("live", str(tmp_path))
+    monkeypatch.setattr(cassette, "CASSETTE_MODE", "record")
+    cassette._install_requests(recorder)
+    assert requests.get(url, timeout=5).json() == {"hello": "world"}
+    server.shutdown()
+    server.server_close()
+
+    monkeypatch.setattr(HTTPAdapter, "send", HTTPAdapter.send)
+    player = Cassette("live", str(tmp_path))
+    player.load()
+    monkeypatch.setattr(cassette, "CASSETTE_MODE", "replay")
+    monkeypatch.setattr(cassette, "REPLAY_LATENCY_SCALE", 0)
+    cassette._install_requests(player)
+    assert requests.get(url, timeout=5).json() == {"hello": "world"}
+    assert player.stats["replayed"] == 1
+    assert "SECRET" not in open(recorder.path).read()
@@ -0,0 +1,37 @@
+from foundry_server import ClientChannel
+
+
+def step(node):
+    return {"event": "step", "node": node, "data": "{}"}
+
+
+def events(channel):
+    return [(e["event"], e.get("node"), e.get("coalesced_nodes")) for e in channel.pending]
+
+
+def test_folded_steps_keep_every_node():
+    channel = ClientChannel(None, maxsize=1)
+    for node in ("planner_agent", "research_agent", "strategy_agent"):
+        channel.put(step(node))
+    assert events(channel) == [("step", "strategy_agent", ["planner_agent", "research_agent"])]
+    assert channel.coalesced == 2
+
+
+def test_step_is_not_folded_past_other_events():
+    channel = ClientChannel(None, maxsize=1)
+    channel.put(step("planner_agent"))
+    channel.put({"event": "deferred", "nodes": ["brd_agent"]})
+    channel.put(step("research_agent"))
+    assert events(channel) == [
+        ("step", "planner_agent", None),
+        ("deferred", None, None),
+        ("step", "research_agent", None),
+    ]
+
+
+def test_step_folds_past_heartbeats():
+    channel = ClientChannel(None, maxsize=1)
+    channel.put(step("planner_agent"))
+    channel.put({"event": "ping", "ts": 0})
+    channel.put(step("research_agent"))
+    assert events(channel) == [("step", "research_agent", ["planner_agent"]), ("ping", None, None)]
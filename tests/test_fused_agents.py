@@ -0,0 +1,37 @@
+import foundry_server
+from foundry_server import FusedAgentOutput, CampaignState
+
+BRIEF = 'Launch a webinar about "Agentic-Fix" for VPs of Engineering.'
+
+
+def fused(tag: str) -> FusedAgentOutput:
+    return FusedAgentOutput.model_validate({
+        "research": {
+            "audience_persona": {"pain_point": tag, "motivation": tag, "preferred_channel": tag},
+            "core_messaging": {"value_proposition": tag, "tone_of_voice": tag, "call_to_action": tag},
+        },
+        "strategy_markdown": f"# Strategic Approach {tag}",
+        "content": {
+            "webinar_details": {"title": tag, "abstract": tag},
+            "social_posts": [{"platform": "LinkedIn", "content": tag, "image_prompt": tag}],
+            "webinar_image_prompt": tag,
+        },
+    })
+
+
+def test_same_brief_runs_keep_their_own_fused_output():
+    foundry_server.stash_fused_result("run-a", fused("a"))
+    foundry_server.stash_fused_result("run-b", fused("b"))
+    run_a = CampaignState(initial_prompt=BRIEF, run_id="run-a")
+    run_b = CampaignState(initial_prompt=BRIEF, run_id="run-b")
+
+    assert foundry_server.strategy_agent_node(run_a)["strategy_markdown"].endswith(" a")
+    assert foundry_server.content_agent_node(run_a)["webinar_details"]["title"] == "a"
+    # run-a's content node consumed its own output and left run-b's alone.
+    assert foundry_server.strategy_agent_node(run_b)["strategy_markdown"].endswith(" b")
+    assert foundry_server.content_agent_node(run_b)["webinar_details"]["title"] == "b"
+
+def test_unconsumed_fused_output_is_released_with_the_run():
+    foundry_server.stash_fused_result("run-failed", fused("x"))
+    foundry_server.release_run_scratch("run-failed")
+    assert foundry_server.peek_fused_result("run-failed") is None
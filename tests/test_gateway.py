@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+import gateway
+
+LOCAL = "http://localhost:5173"
+ELSEWHERE = "http://evil.example"
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(gateway.app)
+
+
+def preflight(client, path, origin):
+    return client.options(path, headers={"Origin": origin, "Access-Control-Request-Method": "POST"})
+
+
+def test_foundry_root_routes_keep_foundrys_origins(client):
+    assert preflight(client, "/runs", LOCAL).headers.get("access-control-allow-origin") == LOCAL
+    assert "access-control-allow-origin" not in preflight(client, "/runs", ELSEWHERE).headers
+    assert "access-control-allow-origin" not in preflight(client, "/runs/abc", ELSEWHERE).headers
+
+
+def test_other_services_keep_their_own_policy(client):
+    assert preflight(client, "/generate-prompt", ELSEWHERE).headers.get("access-control-allow-origin") == ELSEWHERE
+
+
+def test_mounted_and_gateway_routes(client):
+    assert "access-control-allow-origin" not in preflight(client, "/foundry/runs", ELSEWHERE).headers
+    assert "access-control-allow-origin" not in preflight(client, "/gateway_stats", ELSEWHERE).headers
+    assert preflight(client, "/sch/call-logs", ELSEWHERE).headers.get("access-control-allow-origin") == ELSEWHERE
@@ -0,0 +1,26 @@
+from html_optimizer import minify_css, minify_html, rewrite_images
+
+UNSPLASH = "https://images.unsplash.com/photo-1?w=1600"
+
+
+def test_space_between_inline_elements_is_kept():
+    html = "<p>\n  <strong>VPs</strong> <em>of Engineering</em>\n</p>"
+    assert minify_html(html) == "<p><strong>VPs</strong> <em>of Engineering</em></p>"
+
+
+def test_whitespace_next_to_block_tags_is_dropped():
+    html = "<!DOCTYPE html>\n<html>\n  <body>\n    <div>\n      <span>hi</span>\n    </div>\n  </body>\n</html>"
+    assert minify_html(html) == "<!DOCTYPE html><html><body><div><span>hi</span></div></body></html>"
+
+
+def test_descendant_pseudo_selector_keeps_its_space():
+    css = ".a :hover { color : red; }\n.b > .c { margin: 0 auto; }"
+    assert minify_css(css) == ".a :hover{color :red}.b>.c{margin:0 auto}"
+
+
+def test_data_src_is_not_rewritten():
+    html = f'<img data-src="{UNSPLASH}" alt="lazy">'
+    rewritten, stats = rewrite_images(html)
+    assert f'data-src="{UNSPLASH}"' in rewritten
+    assert "srcset" not in rewritten
+    assert stats["responsive"] == 0
@@ -0,0 +1,40 @@
+import pytest
+import requests
+import http_pool
+from http_pool import PooledSession, CircuitOpenError
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(http_pool, "BREAKER_COOLDOWN", 0)
+    session = PooledSession(host_limits={})
+    host = session.host_state("api.example.com")
+    host.opened_at = 0.0 # open, and with no cooldown already half-open
+    return session
+
+
+def test_probe_that_raises_unexpectedly_frees_the_probe_slot(session, monkeypatch):
+    def broken(self, method, url, *args, **kwargs):
+        raise ValueError("bad argument")
+
+    monkeypatch.setattr(requests.Session, "request", broken)
+    with pytest.raises(ValueError):
+        session.get("https://api.example.com/x")
+    host = session.host_state("api.example.com")
+    assert not host.probing
+    assert host.allow() # the next request may probe
+
+
+def test_probe_that_fails_keeps_the_breaker_open(session, monkeypatch):
+    def down(self, method, url, *args, **kwargs):
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(requests.Session, "request", down)
+    with pytest.raises(requests.ConnectionError):
+        session.get("https://api.example.com/x")
+    host = session.host_state("api.example.com")
+    assert not host.probing
+    assert host.opened_at is not None
+    monkeypatch.setattr(http_pool, "BREAKER_COOLDOWN", 60)
+    with pytest.raises(CircuitOpenError):
+        session.get("https://api.example.com/x")
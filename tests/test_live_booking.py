@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import pytest
+from fastapi import BackgroundTasks
+import sch
+from sch import LiveCall, MeetingAnalysis, CallLogRequest
+
+ANALYSIS = MeetingAnalysis(meeting_scheduled=True, time="2026-01-05T10:00:00", name="Sam", email="sam@example.com")
+
+
+class SilentSocket:
+    async def send_json(self, message):
+        pass
+
+
+class SlowChain:
+    """Stands in for the log analysis chain; counts calls and takes `delay` seconds."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return ANALYSIS
+
+
+@pytest.fixture
+def booking_api(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def schedule(name, email, start_time):
+        calls.append(email)
+        release.wait(5)
+        return {"status": "scheduled" if api["ok"] else "failed"}
+
+    api = {"ok": True, "calls": calls, "release": release}
+    monkeypatch.setattr(sch, "schedule_calendly_meeting", schedule)
+    sch.live_bookings.clear()
+    sch.live_calls.clear()
+    return api
+
+
+def post_call_logs(call_id):
+    request = CallLogRequest(callId=call_id, logs={"transcript": [{"role": "user", "transcript": "hi"}]}, timestamp="now")
+    return sch.handle_call_logs(request, BackgroundTasks())
+
+
+def open_call(call_id):
+    call = LiveCall(call_id, SilentSocket())
+    sch.live_calls[call_id] = call
+    return call
+
+
+def test_post_call_logs_waits_for_an_in_flight_live_booking(booking_api, monkeypatch):
+    chain = SlowChain()
+    monkeypatch.setattr(sch, "log_analysis_chain", chain)
+
+    async def scenario():
+        call = open_call("call-1")
+        call.analysis = ANALYSIS
+        assert call.maybe_book()
+        post = asyncio.create_task(post_call_logs("call-1"))
+        await asyncio.sleep(0.05)
+        booking_api["release"].set()
+        return await post
+
+    response = asyncio.run(scenario())
+    assert response["status"] == "meeting_already_booked"
+    assert booking_api["calls"] == ["sam@example.com"]
+    assert chain.calls == 0
+
+
+def test_post_call_logs_during_the_hang_up_analysis_books_once(booking_api, monkeypatch):
+    booking_api["release"].set()
+    monkeypatch.setattr(sch, "log_analysis_chain", SlowChain(delay=0.2))
+
+    async def scenario():
+        call = open_call("call-2")
+        call.turns.append({"role": "user", "transcript": "yes, book it"})
+        finish = asyncio.create_task(call.finish()) # hang-up starts the last analysis
+        await asyncio.sleep(0.01)
+        response = await post_call_logs("call-2")
+        await finish
+        return response
+
+    response = asyncio.run(scenario())
+    assert response["status"] == "meeting_already_booked"
+    assert booking_api["calls"] == ["sam@example.com"]
+
+
+def test_live_call_does_not_rebook_what_call_logs_booked(booking_api, monkeypatch):
+    booking_api["release"].set()
+    monkeypatch.setattr(sch, "log_analysis_chain", SlowChain())
+
+    async def scenario():
+        call = open_call("call-3")
+        response = await post_call_logs("call-3") # arrives before the live call ever analyzed
+        call.analysis = ANALYSIS
+        return response, call.maybe_book(), call.booking_task
+
+    response, booked, task = asyncio.run(scenario())
+    assert response["status"] == "meeting_booking_started"
+    assert booked and task is None
+
+
+def test_failed_live_booking_lets_call_logs_book(booking_api, monkeypatch):
+    booking_api["ok"] = False
+    booking_api["release"].set()
+    monkeypatch.setattr(sch, "log_analysis_chain", SlowChain())
+
+    async def scenario():
+        call = open_call("call-4")
+        call.analysis = ANALYSIS
+        call.maybe_book()
+        await call.booking_task
+        return await post_call_logs("call-4")
+
+    assert asyncio.run(scenario())["status"] == "meeting_booking_started"
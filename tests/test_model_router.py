@@ -0,0 +1,130 @@
+import time
+import threading
+import pytest
+import model_router
+from langchain_core.messages import AIMessageChunk
+from model_router import ModelRouter, ModelStats, Hedger, ROUTER_MIN_SAMPLES
+
+ROUTES = {"planner_agent": {"model": "primary", "timeout": 5, "p95_threshold": 1, "fallbacks": ["backup"]}}
+COOLDOWN = 0.2
+
+
+class FakeClient:
+    def __init__(self, model, health):
+        self.model = model
+        self.health = health
+
+    def invoke(self, prompt_value):
+        if self.health[self.model] == "down":
+            raise RuntimeError(f"{self.model} is down")
+        return f"{self.model}:{prompt_value}"
+
+
+@pytest.fixture
+def health(monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_PROBE_COOLDOWN", COOLDOWN)
+    return {"primary": "down", "backup": "up"}
+
+@pytest.fixture
+def router(health):
+    router = ModelRouter(routes=ROUTES)
+    router.client = lambda model, timeout: FakeClient(model, health)
+    for _ in range(ROUTER_MIN_SAMPLES):
+        assert router.invoke("planner_agent", "x") == "backup:x"
+    # The cooldown starts when the router first routes around the primary.
+    assert "primary" in router.plan("planner_agent")["skipped"]
+    return router
+
+
+def test_unhealthy_primary_is_skipped_until_cooldown(router):
+    plan = router.plan("planner_agent")
+    assert plan["order"][0] == "backup"
+    assert "primary" in plan["skipped"]
+    assert router.health()["primary"]["state"] == "open"
+
+def test_primary_comes_back_after_it_recovers(router, health):
+    health["primary"] = "up"
+    assert router.invoke("planner_agent", "x") == "backup:x" # still cooling down
+    time.sleep(COOLDOWN * 1.5)
+    assert router.invoke("planner_agent", "x") == "primary:x" # the probe
+    assert router.health()["primary"]["state"] == "closed"
+    plan = router.plan("planner_agent")
+    assert plan["order"][0] == "primary" and not plan["skipped"]
+    assert router.invoke("planner_agent", "x") == "primary:x"
+
+def test_failed_probe_restarts_the_cooldown(router):
+    time.sleep(COOLDOWN * 1.5)
+    assert router.invoke("planner_agent", "x") == "backup:x" # probe failed, served by fallback
+    assert router.health()["primary"]["state"] == "open"
+    assert router.plan("planner_agent")["order"][0] == "backup"
+
+def test_only_one_probe_at_a_time(router):
+    time.sleep(COOLDOWN * 1.5)
+    first = router.plan("planner_agent")
+    second = router.plan("planner_agent")
+    assert first["probe"] == "primary" and first["order"][0] == "primary"
+    assert second["probe"] is None and second["order"][0] == "backup"
+
+
+class StalledConnection:
+    """Stands in for a leased connection: a stream on it blocks until it answers or is aborted."""
+
+    def __init__(self):
+        self.aborted = threading.Event()
+
+    def abort(self):
+        self.aborted.set()
+
+
+class FakeStreamingLLM:
+    def __init__(self, connection, first_token_after):
+        self.connection = connection
+        self.first_token_after = first_token_after
+
+    def stream(self, prompt_value):
+        if self.connection.aborted.wait(self.first_token_after):
+            raise ConnectionError("connection shut down")
+        yield AIMessageChunk(content="answer")
+
+
+@pytest.fixture
+def leases(monkeypatch):
+    delays = iter([5.0, 0.0]) # the primary stalls before its first byte, the hedge answers at once
+    leased, released = [], []
+
+    def lease(model, temperature=0, timeout=None):
+        connection = StalledConnection()
+        leased.append(connection)
+        return FakeStreamingLLM(connection, next(delays)), connection
+
+    monkeypatch.setattr(model_router, "lease_chat_model", lease)
+    monkeypatch.setattr(model_router, "release_abortable", lambda connection, reusable: released.append((connection, reusable)))
+    monkeypatch.setattr(model_router, "HEDGE_MAX_RATE", 1.0)
+    return leased, released
+
+
+def test_losing_attempt_is_aborted_before_its_first_byte(leases):
+    leased, released = leases
+    stats = ModelStats()
+    for _ in range(ROUTER_MIN_SAMPLES):
+        stats.record_first_token(0.05)
+    decision = {}
+    started = time.perf_counter()
+    result = Hedger().invoke("primary", 0, 5, "x", stats, decision)
+    assert result.content == "answer"
+    assert decision["hedge_winner"] == "hedge"
+    primary, hedge = leased
+    assert primary.aborted.wait(1)
+    assert time.perf_counter() - started < 1
+    deadline = time.monotonic() + 1
+    while len(released) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (hedge, True) in released and (primary, False) in released
+
+
+def test_hedge_is_recorded_against_its_own_call():
+    hedger = Hedger()
+    mine, later = {"hedged": False}, {"hedged": False}
+    hedger.recent.extend([mine, later]) # another call started after ours
+    assert hedger._claim_hedge(mine)
+    assert mine["hedged"] and not later["hedged"]
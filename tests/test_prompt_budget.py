@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+import prompt_budget
+from prompt_budget import count_tokens, compact_value, trim_by_relevance, render_within_budget
+
+
+@pytest.fixture
+def prompt():
+    return ChatPromptTemplate.from_messages([("human", "Write about {topic}.\n---\n{content}\n---\nAudience: {audience}")])
+
+def filler(lines):
+    return "\n".join(f"Unrelated line {i} about shipping schedules and office plants" for i in range(lines))
+
+
+def test_empty_inputs():
+    assert count_tokens("") == 0
+    assert count_tokens(None) == 0
+    assert compact_value(None) == "n/a"
+    assert trim_by_relevance("", "webinar", max_tokens=10) == ""
+
+def test_compact_value_drops_bulky_keys_and_empty_values():
+    value = {"title": "CI", "raw_content": "x" * 1000, "score": 0.9, "tags": [], "url": None}
+    assert compact_value(value) == '{"title":"CI"}'
+    assert compact_value("a  b\n\n\n\nc") == "a b\n\nc"
+
+def test_trim_keeps_relevant_lines_in_order_and_drops_repeats():
+    text = "\n".join(["Menu", "Flaky builds cost hours", "Menu", filler(50), "Agentic-Fix repairs flaky builds"])
+    trimmed = trim_by_relevance(text, "Agentic-Fix flaky builds", max_tokens=20)
+    assert trimmed.splitlines() == ["Menu", "Flaky builds cost hours", "Agentic-Fix repairs flaky builds"]
+
+def test_single_oversized_line_is_cut_rather_than_dropped():
+    line = " ".join(["word"] * 500)
+    trimmed = trim_by_relevance(line, "word", max_tokens=50)
+    assert trimmed
+    assert count_tokens(trimmed) <= 50
+    assert line.startswith(trimmed)
+
+def test_prompt_within_budget_is_left_alone(prompt):
+    value = render_within_budget("test_small", prompt, {"topic": "CI", "content": "Flaky builds", "audience": None})
+    assert "Flaky builds" in value.to_string()
+    assert "Audience: n/a" in value.to_string()
+
+def test_oversized_field_is_trimmed_to_the_budget(prompt):
+    content = filler(400) + "\nAgentic-Fix repairs flaky CI builds"
+    value = render_within_budget("test_trim", prompt, {"topic": "Agentic-Fix CI", "content": content, "audience": "VPs"}, query_field="topic", budget=300)
+    text = value.to_string()
+    assert count_tokens(text) <= 300
+    assert "Agentic-Fix repairs flaky CI builds" in text
+    stats = prompt_budget.prompt_token_stats["test_trim"]
+    assert stats["tokens_after"] == count_tokens(text)
+    assert stats["tokens_before"] > stats["tokens_after"]
+
+def test_kept_fields_are_not_trimmed(prompt):
+    content = filler(400)
+    value = render_within_budget("test_keep", prompt, {"topic": "CI", "content": content, "audience": "VPs"}, budget=300, keep=("content",))
+    assert content in value.to_string()
+
+def test_prompt_is_rendered_in_full_once(prompt, monkeypatch):
+    rendered = []
+    invoke = type(prompt).invoke
+    def counting_invoke(self, inputs, *args, **kwargs):
+        rendered.append(inputs["content"])
+        return invoke(self, inputs, *args, **kwargs)
+    monkeypatch.setattr(type(prompt), "invoke", counting_invoke)
+    render_within_budget("test_once", prompt, {"topic": "CI", "content": filler(400), "audience": "VPs"}, query_field="topic", budget=300)
+    assert len([content for content in rendered if content]) == 1 # plus one render of the empty template
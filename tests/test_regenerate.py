@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import pytest
+import foundry_server
+from foundry_server import CampaignState, NODE_ORDER, node_input_hash, memo_put, regenerate_node
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replaces every agent with a stub that records its call and makes no LLM request."""
+    calls = []
+    outputs = {
+        "planner_agent": lambda state: {"topic": state.topic, "goal": state.goal, "target_audience": state.target_audience},
+        "research_agent": lambda state: {"audience_persona": {"pain_point": "slow releases"}, "core_messaging": state.core_messaging},
+        "strategy_agent": lambda state: {"strategy_markdown": "# New strategy"},
+        "content_agent": lambda state: {"social_posts": state.social_posts, "webinar_image_prompt": state.webinar_image_prompt, "webinar_details": {"pain": state.audience_persona["pain_point"]}},
+        "design_agent": lambda state: {"generated_assets": state.generated_assets},
+        "web_agent": lambda state: {"landing_page_code": f"<h1>{state.audience_persona['pain_point']}</h1>"},
+        "brd_agent": lambda state: {"brd_url": "brd.pdf"},
+        "ops_agent": lambda state: {"automation_status": {"slack": "sent"}},
+    }
+    def stub(node):
+        def run(state):
+            calls.append(node)
+            return outputs[node](state)
+        return run
+    for node in NODE_ORDER:
+        monkeypatch.setitem(foundry_server.NODE_FUNCTIONS, node, stub(node))
+    monkeypatch.setattr(foundry_server, "_node_memo", OrderedDict())
+    return calls
+
+@pytest.fixture
+def state():
+    state = CampaignState(
+        initial_prompt="brief", run_id="run-regen", topic="Agentic-Fix", target_audience="VPs of Engineering", goal="Launch a webinar",
+        audience_persona={"pain_point": "flaky CI"}, core_messaging={"value_proposition": "Green builds"},
+        social_posts=[{"platform": "LinkedIn", "content": "Join us", "image_prompt": "team"}], webinar_image_prompt="a green build", generated_assets={"banner": "banner.png"},
+        strategy_markdown="# Strategy", landing_page_code="<h1>flaky CI</h1>", brd_url="old.pdf", automation_status={"slack": "sent"},
+    )
+    return state.model_copy(update={"node_input_hashes": {node: node_input_hash(node, state) for node in NODE_ORDER}})
+
+
+def test_regenerating_a_leaf_reruns_only_that_node(calls, state):
+    result = regenerate_node(state, "strategy_agent")
+    assert calls == ["strategy_agent"]
+    assert result["ran"] == ["strategy_agent"]
+    assert result["reused"] == [node for node in NODE_ORDER if node != "strategy_agent"]
+    assert result["state"].strategy_markdown == "# New strategy"
+
+def test_regenerating_research_reruns_only_its_dependents(calls, state):
+    result = regenerate_node(state, "research_agent")
+    # design and ops read content's social posts and image prompt, which didn't change
+    assert calls == ["research_agent", "content_agent", "web_agent", "brd_agent"]
+    assert result["reused"] == ["planner_agent", "strategy_agent", "design_agent", "ops_agent"]
+    assert result["state"].landing_page_code == "<h1>slow releases</h1>"
+    assert result["state"].node_input_hashes["web_agent"] == node_input_hash("web_agent", result["state"])
+
+def test_memo_hit_skips_the_agent(calls, state):
+    edited = state.model_copy(update={"audience_persona": {"pain_point": "slow releases"}})
+    memo_put("web_agent", node_input_hash("web_agent", edited), {"landing_page_code": "<h1>from memo</h1>"})
+    result = regenerate_node(edited, "brd_agent")
+    assert "web_agent" not in calls
+    assert result["memo_hits"] == ["web_agent"]
+    assert result["state"].landing_page_code == "<h1>from memo</h1>"
+    assert result["state"].node_input_hashes["web_agent"] == node_input_hash("web_agent", edited)
+
+def test_side_effect_nodes_are_not_rerun_implicitly(calls, state):
+    edited = CampaignState.model_validate({**state.model_dump(), "social_posts": [{"platform": "LinkedIn", "content": "Edited", "image_prompt": "team"}]})
+    result = regenerate_node(edited, "brd_agent")
+    assert "ops_agent" not in calls
+    assert result["skipped"] == ["ops_agent"]
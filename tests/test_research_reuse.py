@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import Future
+import pytest
+import foundry_server
+from research_index import ResearchIndex
+
+TOPIC, AUDIENCE = "Agentic-Fix", "VPs of Engineering"
+PAST = {
+    "audience_persona": {"pain_point": "old", "motivation": "old", "preferred_channel": "old"},
+    "core_messaging": {"value_proposition": "old", "tone_of_voice": "old", "call_to_action": "old"},
+}
+FRESH = {
+    "audience_persona": {"pain_point": "new", "motivation": "new", "preferred_channel": "new"},
+    "core_messaging": {"value_proposition": "new", "tone_of_voice": "new", "call_to_action": "new"},
+}
+
+
+class FakeChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return foundry_server.ResearchOutput.model_validate(FRESH)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ResearchIndex(path=str(tmp_path / "research.db"), capacity=8)
+
+@pytest.fixture
+def node(monkeypatch, index):
+    chain = FakeChain()
+    monkeypatch.setattr(foundry_server, "research_index", index)
+    monkeypatch.setattr(foundry_server, "research_search_only_chain", chain)
+    monkeypatch.setattr(foundry_server, "RESEARCH_REUSE", True)
+    monkeypatch.setattr(foundry_server, "FUSED_AGENTS", False)
+    state = foundry_server.CampaignState(initial_prompt="brief", run_id="run-1", topic=TOPIC, target_audience=AUDIENCE)
+    return chain, state
+
+
+def test_ttl_hides_stale_results(tmp_path):
+    index = ResearchIndex(path=str(tmp_path / "research.db"), capacity=8, ttl=60)
+    index.add(TOPIC, AUDIENCE, PAST)
+    assert index.nearest(TOPIC, "Engineering VPs") is not None
+    index.created[:index.size] = time.time() - 120
+    assert index.nearest(TOPIC, AUDIENCE) is None
+
+def test_similar_run_reuses_past_research(node, index):
+    chain, state = node
+    index.add(TOPIC, AUDIENCE, PAST)
+    update = foundry_server.research_agent_node(state)
+    assert update["research_reuse"]["reused"] is True
+    assert update["audience_persona"]["pain_point"] == "old"
+    assert chain.calls == 0
+
+def test_regenerating_research_does_not_reuse(node, index):
+    chain, state = node
+    index.add(TOPIC, AUDIENCE, PAST)
+    token = foundry_server._regeneration_target.set("research_agent")
+    try:
+        update = foundry_server.research_agent_node(state)
+    finally:
+        foundry_server._regeneration_target.reset(token)
+    assert update["research_reuse"]["reused"] is False
+    assert update["audience_persona"]["pain_point"] == "new"
+    assert chain.calls == 1
+
+def test_reuse_discards_speculation_instead_of_counting_a_hit(node, index):
+    chain, state = node
+    index.add(TOPIC, AUDIENCE, PAST)
+    speculation = Future()
+    speculation.set_result({"search_results": "..."})
+    foundry_server._speculations[state.run_id] = ({"topic": TOPIC, "target_audience": AUDIENCE}, speculation)
+    before = dict(foundry_server.speculation_stats)
+    update = foundry_server.research_agent_node(state)
+    assert update["speculation"]["adopted"] is False
+    assert foundry_server.speculation_stats["hits"] == before["hits"]
+    assert foundry_server.speculation_stats["discarded"] == before["discarded"] + 1
+    assert foundry_server.speculation_stats["wasted_calls"] == before["wasted_calls"] + 1
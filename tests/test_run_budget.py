@@ -0,0 +1,119 @@
+import time
+import asyncio
+import pytest
+import foundry_server
+import run_budget
+from run_budget import RunBudget
+from foundry_server import CampaignState, memoized_node, node_input_hash, DEGRADED_HASH_PREFIX
+
+
+class SlowChain:
+    def __init__(self, seconds, result):
+        self.seconds = seconds
+        self.result = result
+
+    def invoke(self, inputs):
+        time.sleep(self.seconds)
+        return self.result
+
+
+@pytest.fixture
+def budget():
+    def start(total, weights):
+        budget = RunBudget(total, weights)
+        token = run_budget._active_budget.set(budget)
+        started.append(token)
+        return budget
+    started = []
+    yield start
+    for token in reversed(started):
+        run_budget._active_budget.reset(token)
+
+@pytest.fixture
+def state():
+    return CampaignState(
+        initial_prompt="brief", run_id="run-sla", topic="Agentic-Fix", target_audience="VPs of Engineering", goal="Launch a webinar",
+        audience_persona={"pain_point": "flaky CI"}, core_messaging={"value_proposition": "Green builds", "call_to_action": "Save your seat"},
+        webinar_details={"title": "Fix Flaky Builds", "abstract": "How Agentic-Fix repairs CI."},
+    )
+
+
+def test_shares_roll_over_to_later_nodes():
+    budget = RunBudget(10.0, {"a": 1.0, "b": 1.0})
+    budget.start_node("a")
+    assert budget.shares["a"] == pytest.approx(5.0, abs=0.05)
+    budget.finish_node("a")
+    budget.start_node("b")
+    assert budget.shares["b"] == pytest.approx(10.0, abs=0.05)
+
+def test_slow_web_agent_falls_back_to_template_page(monkeypatch, budget, state):
+    monkeypatch.setattr(foundry_server, "web_agent_chain", SlowChain(2, "<html>never</html>"))
+    monkeypatch.setitem(foundry_server.MIN_NODE_SECONDS, "web_agent", 0)
+    budget(0.2, {"web_agent": 1.0})
+    update = memoized_node("web_agent")(state)
+    assert "Fix Flaky Builds" in update["landing_page_code"]
+    assert [d["rule"] for d in update["degradations"]["web_agent"]] == ["template_landing_page"]
+    assert update["node_input_hashes"]["web_agent"].startswith(DEGRADED_HASH_PREFIX)
+    assert foundry_server.memo_get("web_agent", node_input_hash("web_agent", state)) is None
+
+def test_nodes_without_enough_budget_skip_straight_to_fallback(monkeypatch, budget, state):
+    chain = SlowChain(0, "# Real strategy")
+    monkeypatch.setattr(foundry_server, "strategy_agent_chain", chain)
+    budget(0.5, {"strategy_agent": 1.0})
+    update = memoized_node("strategy_agent")(state)
+    assert update["strategy_markdown"].startswith("# Strategic Approach")
+    assert update["degradations"]["strategy_agent"][0]["rule"] == "template_strategy"
+
+def test_deferred_brd_is_memoized_under_its_input_hash(monkeypatch, budget, state, tmp_path):
+    monkeypatch.setattr(foundry_server, "brd_agent_chain", SlowChain(0.3, "# BRD"))
+    monkeypatch.setattr(foundry_server, "save_markdown_as_pdf", lambda markdown, filename: str(tmp_path / "brd.pdf"))
+    run = budget(2.0, {"brd_agent": 1.0}) # under MIN_NODE_SECONDS, so it defers straight away
+    update = memoized_node("brd_agent")(state)
+    assert "brd_url" not in update
+    assert update["degradations"]["brd_agent"][0]["rule"] == "deferred_brd"
+    input_hash = node_input_hash("brd_agent", state)
+    assert run.deferred["brd_agent"][1] == input_hash
+
+    published = []
+    async def apublish(run_id, event):
+        published.append(event)
+    monkeypatch.setattr(foundry_server.run_registry, "apublish", apublish)
+    current = state.model_dump()
+    asyncio.run(foundry_server.publish_deferred("run-sla", current, run))
+
+    assert [e["event"] for e in published] == ["deferred", "step"]
+    assert published[1]["deferred"] is True
+    assert current["brd_url"] == str(tmp_path / "brd.pdf")
+    assert current["node_input_hashes"]["brd_agent"] == input_hash
+    assert foundry_server.memo_get("brd_agent", input_hash)["brd_url"] == str(tmp_path / "brd.pdf")
+
+def test_time_queued_for_a_worker_is_not_charged_to_the_node(monkeypatch, budget):
+    monkeypatch.setattr(run_budget, "RUN_SLA_WORKERS", 1)
+    run = budget(5.0, {"a": 1.0})
+    run_budget.submit(time.sleep, 0.3) # an abandoned call holding the run's only worker
+    run.start_node("a")
+    run.shares["a"] = 0.2
+    run.deadlines["a"] = time.monotonic() + 0.2
+    assert run_budget.call_within("a", lambda: "done") == "done"
+    assert run.shares["a"] > 0.4
+
+def test_deferred_brd_past_the_deadline_publishes_the_fallback(monkeypatch, budget, state):
+    state = state.model_copy(update={"topic": "Agentic-Fix Timeout"})
+    run = budget(0.1, {"brd_agent": 1.0})
+    future = run_budget.submit(time.sleep, 1)
+    input_hash = node_input_hash("brd_agent", state)
+    run.defer("brd_agent", future, input_hash)
+
+    published = []
+    async def apublish(run_id, event):
+        published.append(event)
+    monkeypatch.setattr(foundry_server.run_registry, "apublish", apublish)
+    current = state.model_dump()
+    started = time.monotonic()
+    asyncio.run(foundry_server.publish_deferred("run-sla", current, run))
+
+    assert time.monotonic() - started < 0.5
+    assert [e["event"] for e in published] == ["deferred", "step"]
+    assert current["brd_url"] is None
+    assert [d["rule"] for d in current["degradations"]["brd_agent"]] == ["deferred_timeout"]
+    assert foundry_server.memo_get("brd_agent", input_hash) is None
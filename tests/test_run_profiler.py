@@ -0,0 +1,40 @@
+import json
+import time
+import asyncio
+import xml.etree.ElementTree as ElementTree
+from contextlib import nullcontext
+import foundry_server
+from run_profiler import profiling, span, thread_scope
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_hooks_are_noops_without_a_profiled_run():
+    assert isinstance(span("llm:test", "llm"), nullcontext)
+    assert isinstance(thread_scope("planner_agent"), nullcontext)
+
+def test_profiled_run_writes_svg_and_trace(tmp_path):
+    with profiling("run-prof") as profiler:
+        with thread_scope("planner_agent"), span("planner_agent", "node"):
+            busy(0.1)
+        artifacts = profiler.write(str(tmp_path))
+
+    svg = ElementTree.parse(tmp_path / artifacts["flamegraph"]).getroot()
+    assert svg.tag == "{http://www.w3.org/2000/svg}svg"
+    assert any("planner_agent" in (title.text or "") for title in svg.iter("{http://www.w3.org/2000/svg}title"))
+
+    trace = json.loads((tmp_path / artifacts["timeline"]).read_text())
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [(e["name"], e["cat"]) for e in spans] == [("planner_agent", "node")]
+    assert spans[0]["dur"] >= 100_000
+
+def test_profile_event_leaves_stopping_to_the_context_manager():
+    with profiling("run-prof-event") as profiler:
+        event = asyncio.run(foundry_server.profiler_artifacts(profiler))
+        assert profiler._sampler.is_alive()
+    assert not profiler._sampler.is_alive()
+    assert event["flamegraph_url"] == "/download_profile/run-prof-event_flamegraph.svg"
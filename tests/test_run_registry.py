@@ -0,0 +1,88 @@
+import time
+import asyncio
+import pytest
+from run_registry import RunRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return RunRegistry(str(tmp_path / "runs.db"))
+
+
+def age(registry, run_id, column, seconds):
+    registry._conn().execute(f"UPDATE runs SET {column} = ? WHERE run_id = ?", (time.time() - seconds, run_id))
+
+
+def test_run_with_lapsed_lease_is_failed(registry):
+    live = registry.create_run("live")
+    lost = registry.create_run("lost")
+    registry.claim_run(live, worker_id="a")
+    registry.claim_run(lost, worker_id="b")
+    age(registry, lost, "heartbeat_at", 120)
+
+    assert registry.reap_stale_runs(lease_seconds=60) == [lost]
+    assert registry.get_run(lost)["status"] == "error"
+    assert registry.events_since(lost)[-1]["event"] == "error"
+    assert registry.get_run(live)["status"] == "running"
+    assert registry.heartbeat(lost, worker_id="b") is False
+    assert registry.heartbeat(live, worker_id="a") is True
+
+
+def test_heartbeat_renews_the_lease(registry):
+    run_id = registry.create_run("brief")
+    registry.claim_run(run_id, worker_id="a")
+    age(registry, run_id, "heartbeat_at", 120)
+    registry.heartbeat(run_id, worker_id="a")
+    assert registry.reap_stale_runs(lease_seconds=60) == []
+
+
+def test_old_finished_runs_keep_only_their_terminal_event(registry):
+    old = registry.create_run("old")
+    recent = registry.create_run("recent")
+    for run_id in (old, recent):
+        registry.publish(run_id, {"event": "step", "node": "planner_agent"})
+        registry.publish(run_id, {"event": "done"})
+        registry.finish_run(run_id, "done")
+    age(registry, old, "updated_at", 7200)
+
+    assert registry.prune_events(retention_seconds=3600) == 1
+    assert [e["event"] for e in registry.events_since(old)] == ["done"]
+    assert [e["event"] for e in registry.events_since(recent)] == ["step", "done"]
+
+
+def test_finish_run_leaves_a_reaped_run_alone(registry):
+    run_id = registry.create_run("brief")
+    registry.claim_run(run_id, worker_id="a")
+    age(registry, run_id, "heartbeat_at", 120)
+    registry.reap_stale_runs(lease_seconds=60)
+
+    assert registry.finish_run(run_id, "cancelled") is False
+    assert registry.get_run(run_id)["status"] == "error"
+
+
+def test_run_stopped_for_a_lost_lease_publishes_no_second_error(registry, monkeypatch):
+    import foundry_server
+
+    class Hanging:
+        async def astream(self, initial_input):
+            await asyncio.sleep(60)
+            yield {}
+
+    monkeypatch.setattr(foundry_server, "run_registry", registry)
+    monkeypatch.setattr(foundry_server, "foundry_app", Hanging())
+    run_id = registry.create_run("brief")
+    registry.claim_run(run_id, worker_id="a")
+    age(registry, run_id, "heartbeat_at", 120)
+    registry.reap_stale_runs(lease_seconds=60)
+
+    async def run_and_lose_lease():
+        task = asyncio.create_task(foundry_server._execute_run(run_id, "brief"))
+        await asyncio.sleep(0.05)
+        task.cancel(foundry_server.LEASE_LOST)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(run_and_lose_lease())
+
+    errors = [e for e in registry.events_since(run_id) if e["event"] == "error"]
+    assert [e["data"] for e in errors] == ["Run lost: worker a stopped responding"]
+    assert registry.get_run(run_id)["status"] == "error"
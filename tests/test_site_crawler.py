@@ -0,0 +1,46 @@
+from site_crawler import drop_boilerplate_and_duplicates, rank_paragraphs
+
+
+def page(url, blocks, depth=1):
+    return {"url": url, "blocks": list(blocks), "depth": depth}
+
+
+def unique(name):
+    return f"{name} covers a distinct part of the product with its own wording and examples."
+
+
+def test_chrome_on_most_pages_is_dropped_but_shared_content_is_kept():
+    pages = [
+        page("https://acme.dev/a", ["Sign up free", "Shared pricing table", unique("Alpha")]),
+        page("https://acme.dev/b", ["Sign up free", "Shared pricing table", unique("Bravo")]),
+        page("https://acme.dev/c", ["Sign up free", unique("Charlie")]),
+        page("https://acme.dev/d", [unique("Delta")]),
+    ]
+    kept = drop_boilerplate_and_duplicates(pages)
+    blocks = [b for p in kept for b in p["blocks"]]
+    assert "Sign up free" not in blocks # on 3 of 4 pages
+    assert blocks.count("Shared pricing table") == 2 # on 2 of 4 pages
+
+
+def test_a_block_on_two_of_three_pages_is_content():
+    pages = [
+        page("https://acme.dev/a", ["Integrates with GitHub Actions", unique("Alpha")]),
+        page("https://acme.dev/b", ["Integrates with GitHub Actions", unique("Bravo")]),
+        page("https://acme.dev/c", [unique("Charlie")]),
+    ]
+    blocks = [b for p in drop_boilerplate_and_duplicates(pages) for b in p["blocks"]]
+    assert blocks.count("Integrates with GitHub Actions") == 2
+
+
+def test_ranked_content_fits_without_cutting_a_block():
+    pages = [
+        page("https://acme.dev/pricing", [f"Pricing block {i} " + "x" * 60 for i in range(5)], depth=0),
+        page("https://acme.dev/about", [f"About block {i} " + "y" * 60 for i in range(5)]),
+    ]
+    blocks = {b for p in pages for b in p["blocks"]}
+    for max_chars in (150, 200, 333, 500):
+        content = rank_paragraphs(pages, "pricing", max_chars)
+        assert len(content) <= max_chars
+        lines = [line for line in content.split("\n") if line]
+        assert lines and all(line in blocks or line.startswith("Source: ") for line in lines)
+        assert not lines[-1].startswith("Source: ")
@@ -0,0 +1,70 @@
+import time
+import threading
+import pytest
+import foundry_server
+import run_budget
+from run_budget import RunBudget
+
+BRIEF = 'Launch a webinar about "Agentic-Fix" for VPs of Engineering.'
+TOPIC, AUDIENCE = "Agentic-Fix", "VPs of Engineering"
+
+
+@pytest.fixture
+def speculate(monkeypatch):
+    """Speculation where each run's search returns its own marker; `gate` holds searches back."""
+    gate = threading.Event()
+    gate.set()
+    calls = []
+    def fake_speculation(guess):
+        calls.append(guess)
+        gate.wait()
+        return {"search_results": f"results #{len(calls)}"}
+    monkeypatch.setattr(foundry_server, "SPECULATIVE_RESEARCH", True)
+    monkeypatch.setattr(foundry_server, "_run_speculation", fake_speculation)
+    return gate
+
+def test_same_brief_runs_claim_their_own_speculation(speculate):
+    foundry_server.start_speculative_research("run-a", BRIEF)
+    foundry_server.start_speculative_research("run-b", BRIEF)
+    a = foundry_server.claim_speculative_research("run-a", TOPIC, AUDIENCE)
+    b = foundry_server.claim_speculative_research("run-b", TOPIC, AUDIENCE)
+    assert a["adopted"] and b["adopted"]
+    assert {a["search_results"], b["search_results"]} == {"results #1", "results #2"}
+
+def test_claim_gives_up_after_timeout(speculate, monkeypatch):
+    monkeypatch.setattr(foundry_server, "SPECULATION_TIMEOUT", 0.05)
+    speculate.clear()
+    foundry_server.start_speculative_research("run-slow", BRIEF)
+    result = foundry_server.claim_speculative_research("run-slow", TOPIC, AUDIENCE)
+    speculate.set()
+    assert not result["adopted"]
+    assert "run-slow" not in foundry_server._speculations
+
+def test_unclaimed_speculation_is_evicted_when_the_run_ends(speculate):
+    foundry_server.start_speculative_research("run-failed", BRIEF)
+    foundry_server.release_speculation("run-failed")
+    assert "run-failed" not in foundry_server._speculations
+
+def test_mismatch_is_decided_without_waiting_for_the_search(speculate, monkeypatch):
+    monkeypatch.setattr(foundry_server, "SPECULATION_TIMEOUT", 5)
+    speculate.clear()
+    foundry_server.start_speculative_research("run-miss", BRIEF)
+    started = time.monotonic()
+    result = foundry_server.claim_speculative_research("run-miss", "Kubernetes cost reports", "Finance teams")
+    speculate.set()
+    assert time.monotonic() - started < 1
+    assert result["reason"] == "mismatch"
+
+def test_wait_is_capped_by_the_research_share(speculate, monkeypatch):
+    monkeypatch.setattr(foundry_server, "SPECULATION_TIMEOUT", 5)
+    speculate.clear()
+    foundry_server.start_speculative_research("run-tight", BRIEF)
+    token = run_budget._active_budget.set(RunBudget(0.1, {"research_agent": 1.0}))
+    try:
+        started = time.monotonic()
+        result = foundry_server.claim_speculative_research("run-tight", TOPIC, AUDIENCE)
+    finally:
+        run_budget._active_budget.reset(token)
+        speculate.set()
+    assert time.monotonic() - started < 1
+    assert not result["adopted"]
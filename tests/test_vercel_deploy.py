@@ -0,0 +1,61 @@
+import socket
+import hashlib
+import threading
+import time
+import pytest
+import uvicorn
+import vercel_deploy
+import vercel_stub_server
+from vercel_deploy import DeployIndex, deploy_html
+
+PAGE = "<!DOCTYPE html><html><body><h1>Ship faster</h1></body></html>"
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(vercel_stub_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+
+
+@pytest.fixture
+def stub(stub_url, monkeypatch):
+    monkeypatch.setattr(vercel_deploy, "VERCEL_API_URL", stub_url)
+    vercel_stub_server.files.clear()
+    vercel_stub_server.stats.update(uploads=0, deployments=0)
+    return vercel_stub_server.stats
+
+
+def test_first_deploy_uploads_the_missing_file_and_records_it(stub, tmp_path):
+    index = DeployIndex(str(tmp_path / "deploys.db"))
+    result = deploy_html(index, "launch", PAGE, "test")
+    assert result["success"] and result["uploaded"] and not result["reused"]
+    assert result["url"].startswith("https://launch-")
+    assert stub == {"uploads": 1, "deployments": 1}
+    sha = hashlib.sha1(PAGE.encode("utf-8")).hexdigest()
+    assert index.get("launch", sha)["url"] == result["url"]
+
+
+def test_identical_redeploy_reuses_the_indexed_url_without_api_calls(stub, tmp_path):
+    index = DeployIndex(str(tmp_path / "deploys.db"))
+    first = deploy_html(index, "launch", PAGE, "test")
+    again = deploy_html(index, "launch", PAGE, "test")
+    assert again["reused"] and again["url"] == first["url"]
+    assert stub == {"uploads": 1, "deployments": 1}
+
+
+def test_content_already_on_the_server_is_not_uploaded_again(stub, tmp_path):
+    index = DeployIndex(str(tmp_path / "deploys.db"))
+    deploy_html(index, "launch", PAGE, "test")
+    other = deploy_html(index, "launch-eu", PAGE, "test")
+    assert other["success"] and not other["uploaded"]
+    assert stub == {"uploads": 1, "deployments": 2}
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import requests
+from http_pool import http
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# --- 1. Configuration ---
+# Point VERCEL_API_URL at a local stand-in (see vercel_stub_server.py) to exercise deploys offline.
+VERCEL_API_URL = os.getenv("VERCEL_API_URL", "https://api.vercel.com").rstrip("/")
+DEPLOY_INDEX_PATH = os.getenv("FOUNDRY_DEPLOY_INDEX", os.path.join("campaign_outputs", "deploys.db"))
+MAX_TRACKED_JOBS = 500
+
+
+# --- 2. Local index of what has already been deployed ---
+class DeployIndex:
+    """(project_name, sha1 of index.html) -> deployment, so identical redeploys are free."""
+
+    def __init__(self, path: str = DEPLOY_INDEX_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deploys (
+                project_name TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                url TEXT NOT NULL,
+                deployment_id TEXT,
+                name TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (project_name, sha)
+            )
+            """
+        )
+
+    def get(self, project_name: str, sha: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM deploys WHERE project_name = ? AND sha = ?", (project_name, sha)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put(self, project_name: str, sha: str, url: str, deployment_id: Optional[str], name: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO deploys VALUES (?, ?, ?, ?, ?, ?)",
+                (project_name, sha, url, deployment_id, name, time.time()),
+            )
+
+
+# --- 3. Content-addressed deploy (blocking; always run off the event loop) ---
+_session = http
+
+def _error_body(response: requests.Response) -> Dict[str, Any]:
+    try:
+        return response.json().get("error", {}) or {}
+    except ValueError:
+        return {}
+
+def _error(response: requests.Response) -> Dict[str, Any]:
+    return {"error": _error_body(response).get("message", "Deployment failed"), "status_code": response.status_code}
+
+def deploy_html(index: DeployIndex, project_name: str, html_content: str, token: str) -> Dict[str, Any]:
+    """
+    Deploys index.html by SHA. The file body is uploaded only if Vercel answers
+    the deployment with `missing_files`; an identical page already deployed for
+    this project reuses the stored URL without any API call.
+    """
+    body = html_content.encode("utf-8")
+    sha = hashlib.sha1(body).hexdigest()
+
+    known = index.get(project_name, sha)
+    if known:
+        print(f"--- ♻️ Vercel: {project_name} already deployed with identical content, reusing {known['url']} ---")
+        return {"success": True, "url": known["url"], "id": known["deployment_id"], "name": known["name"], "reused": True}
+
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    deployment_payload = {
+        "name": project_name,
+        "files": [{"file": "index.html", "sha": sha, "size": len(body)}],
+        "projectSettings": {"framework": None},
+    }
+    response = _session.post(f"{VERCEL_API_URL}/v13/deployments", headers=headers, json=deployment_payload, timeout=30)
+    uploaded = False
+    if response.status_code == 400 and _error_body(response).get("code") == "missing_files":
+        print(f"--- ⬆️ Vercel: uploading index.html ({len(body)} bytes, sha {sha[:10]}) ---")
+        upload = _session.post(
+            f"{VERCEL_API_URL}/v2/files",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/octet-stream",
+                "x-vercel-digest": sha,
+            },
+            data=body,
+            timeout=30,
+        )
+        if upload.status_code not in [200, 201]:
+            return _error(upload)
+        uploaded = True
+        response = _session.post(f"{VERCEL_API_URL}/v13/deployments", headers=headers, json=deployment_payload, timeout=30)
+
+    if response.status_code not in [200, 201]:
+        return _error(response)
+
+    data = response.json()
+    deployment_url = data.get("url", "")
+    # Vercel returns URL without protocol
+    if deployment_url and not deployment_url.startswith("http"):
+        deployment_url = f"https://{deployment_url}"
+    index.put(project_name, sha, deployment_url, data.get("id"), data.get("name"))
+    return {"success": True, "url": deployment_url, "id": data.get("id"), "name": data.get("name"), "reused": False, "uploaded": uploaded}
+
+
+# --- 4. Pollable deploy jobs ---
+class DeployJobs:
+    """Runs deploys as background tasks and keeps their status for polling."""
+
+    def __init__(self, index: Optional[DeployIndex] = None):
+        self.index = index or DeployIndex()
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, project_name: str, html_content: str, token: str) -> str:
+        deploy_id = uuid.uuid4().hex
+        job = {"deploy_id": deploy_id, "project_name": project_name, "status": "queued", "submitted_at": time.time()}
+        self.jobs[deploy_id] = job
+        while len(self.jobs) > MAX_TRACKED_JOBS:
+            self.jobs.popitem(last=False)
+        self._tasks[deploy_id] = asyncio.create_task(self._run(job, html_content, token))
+        return deploy_id
+
+    async def _run(self, job: Dict[str, Any], html_content: str, token: str) -> Dict[str, Any]:
+        deploy_id, project_name = job["deploy_id"], job["project_name"]
+        job["status"] = "deploying"
+        try:
+            result = await asyncio.to_thread(deploy_html, self.index, project_name, html_content, token)
+        except Exception as e:
+            print(f"--- ❌ ERROR deploying to Vercel: {e} ---")
+            result = {"error": str(e)}
+        job.update(result)
+        job["status"] = "ready" if result.get("success") else "failed"
+        job["finished_at"] = time.time()
+        self._tasks.pop(deploy_id, None)
+        return job
+
+    async def wait(self, deploy_id: str) -> Optional[Dict[str, Any]]:
+        task = self._tasks.get(deploy_id)
+        if task is not None:
+            return await task
+        return self.jobs.get(deploy_id)
+
+    def status(self, deploy_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(deploy_id)
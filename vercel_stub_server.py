@@ -0,0 +1,40 @@
+import hashlib
+import uuid
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# --- Local Vercel API stand-in ---
+# Implements just enough of /v2/files and /v13/deployments to exercise
+# content-addressed deploys offline:
+#   python vercel_stub_server.py
+#   VERCEL_API_URL=http://localhost:8010 VERCEL_TOKEN=test python foundry_server.py
+app = FastAPI(title="Vercel API stand-in")
+files: dict = {}
+stats = {"uploads": 0, "deployments": 0}
+
+@app.post("/v2/files")
+async def upload_file(request: Request):
+    body = await request.body()
+    digest = request.headers.get("x-vercel-digest", "")
+    if hashlib.sha1(body).hexdigest() != digest:
+        return JSONResponse(status_code=400, content={"error": {"code": "invalid_digest", "message": "SHA does not match body"}})
+    files[digest] = body
+    stats["uploads"] += 1
+    return {"urls": []}
+
+@app.post("/v13/deployments")
+async def create_deployment(payload: dict):
+    missing = [f["sha"] for f in payload.get("files", []) if "sha" in f and f["sha"] not in files]
+    if missing:
+        return JSONResponse(status_code=400, content={"error": {"code": "missing_files", "message": "Missing files", "missing": missing}})
+    stats["deployments"] += 1
+    deployment_id = f"dpl_{uuid.uuid4().hex[:12]}"
+    return {"id": deployment_id, "name": payload.get("name"), "url": f"{payload.get('name')}-{deployment_id[4:]}.vercel.app"}
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="localhost", port=8010)